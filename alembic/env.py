@@ -7,7 +7,7 @@ from sqlalchemy import pool
 
 from alembic import context
 from app.models import Base
-from app.models import User, Task
+from app.models import User, Task, TASK_TRIGRAM_INDEXES
 
 url_tokens = {
     "DB_USER": os.getenv("DB_USER", ""),
@@ -31,6 +31,11 @@ if config.config_file_name is not None:
 target_metadata = Base.metadata
 
 
+# The trigram indexes are created by raw DDL where pg_trgm is available, they are not part of the metadata
+def include_object(object, name, type_, reflected, compare_to):
+    return not (type_ == "index" and name in TASK_TRIGRAM_INDEXES)
+
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -53,6 +58,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -76,7 +82,7 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection, target_metadata=target_metadata, include_object=include_object
         )
 
         with context.begin_transaction():
@@ -0,0 +1,85 @@
+"""Task counters as append-only deltas
+
+Revision ID: 2c8e5f7a9b13
+Revises: 9d3f6a2b5c18
+Create Date: 2026-10-18 10:47:03.915226
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2c8e5f7a9b13'
+down_revision: Union[str, None] = '9d3f6a2b5c18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # The existing counters become the first delta of each user and status
+    op.drop_constraint('task_counters_pkey', 'task_counters', type_='primary')
+    op.execute("ALTER TABLE task_counters ADD COLUMN id BIGSERIAL PRIMARY KEY")
+    op.create_index('ix_task_counters_user_id_status', 'task_counters', ['user_id', 'status'], unique=False)
+    # Same function as in app.models
+    op.execute("""
+    CREATE OR REPLACE FUNCTION count_task_changes() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            INSERT INTO task_counters (user_id, status, count)
+            SELECT user_id, status, -count(*) FROM old_tasks
+            WHERE EXISTS (SELECT 1 FROM users WHERE users.id = old_tasks.user_id)
+            GROUP BY user_id, status;
+        ELSIF TG_OP = 'INSERT' THEN
+            INSERT INTO task_counters (user_id, status, count)
+            SELECT user_id, status, count(*) FROM new_tasks GROUP BY user_id, status;
+        ELSE
+            INSERT INTO task_counters (user_id, status, count)
+            SELECT user_id, status, sum(delta) FROM (
+                SELECT user_id, status, 1 AS delta FROM new_tasks
+                UNION ALL
+                SELECT user_id, status, -1 AS delta FROM old_tasks
+            ) changes
+            GROUP BY user_id, status HAVING sum(delta) <> 0;
+        END IF;
+        RETURN NULL;
+    END $$
+    """)
+
+
+def downgrade() -> None:
+    # Fold the deltas back into one counter per user and status, with writes blocked meanwhile
+    op.execute("LOCK TABLE tasks IN SHARE MODE")
+    op.execute("""
+    CREATE OR REPLACE FUNCTION count_task_changes() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            UPDATE task_counters SET count = task_counters.count - removed.count
+            FROM (SELECT user_id, status, count(*) AS count FROM old_tasks GROUP BY user_id, status) removed
+            WHERE task_counters.user_id = removed.user_id AND task_counters.status = removed.status;
+        ELSIF TG_OP = 'INSERT' THEN
+            INSERT INTO task_counters (user_id, status, count)
+            SELECT user_id, status, count(*) FROM new_tasks GROUP BY user_id, status ORDER BY user_id, status
+            ON CONFLICT (user_id, status) DO UPDATE SET count = task_counters.count + excluded.count;
+        ELSE
+            INSERT INTO task_counters (user_id, status, count)
+            SELECT user_id, status, sum(delta) FROM (
+                SELECT user_id, status, 1 AS delta FROM new_tasks
+                UNION ALL
+                SELECT user_id, status, -1 AS delta FROM old_tasks
+            ) changes
+            GROUP BY user_id, status HAVING sum(delta) <> 0 ORDER BY user_id, status
+            ON CONFLICT (user_id, status) DO UPDATE SET count = task_counters.count + excluded.count;
+        END IF;
+        RETURN NULL;
+    END $$
+    """)
+    op.execute("""
+    WITH folded AS (DELETE FROM task_counters RETURNING user_id, status, count)
+    INSERT INTO task_counters (user_id, status, count)
+    SELECT user_id, status, sum(count) FROM folded GROUP BY user_id, status
+    """)
+    op.drop_index('ix_task_counters_user_id_status', table_name='task_counters')
+    op.drop_column('task_counters', 'id')
+    op.create_primary_key('task_counters_pkey', 'task_counters', ['user_id', 'status'])
@@ -0,0 +1,33 @@
+"""Task access path indexes
+
+Revision ID: 3f9a1c2d7b4e
+Revises: be7e1e0c74c9
+Create Date: 2026-10-17 10:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9a1c2d7b4e'
+down_revision: Union[str, None] = 'be7e1e0c74c9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Composite indexes matching the list endpoints: filter by user or status, ordered by id
+    op.create_index('ix_tasks_user_id_id', 'tasks', ['user_id', 'id'], unique=False)
+    op.create_index('ix_tasks_status_id', 'tasks', ['status', 'id'], unique=False)
+    # The primary keys are already indexed
+    op.drop_index('ix_tasks_id', table_name='tasks')
+    op.drop_index('ix_users_id', table_name='users')
+
+
+def downgrade() -> None:
+    op.create_index('ix_users_id', 'users', ['id'], unique=False)
+    op.create_index('ix_tasks_id', 'tasks', ['id'], unique=False)
+    op.drop_index('ix_tasks_status_id', table_name='tasks')
+    op.drop_index('ix_tasks_user_id_id', table_name='tasks')
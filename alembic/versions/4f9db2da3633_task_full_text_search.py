@@ -0,0 +1,42 @@
+"""Task full-text search
+
+Revision ID: 4f9db2da3633
+Revises: d2a7c5e19b36
+Create Date: 2026-10-17 17:12:48.305127
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4f9db2da3633'
+down_revision: Union[str, None] = 'd2a7c5e19b36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('tasks', sa.Column('search_vector', postgresql.TSVECTOR(), sa.Computed("setweight(to_tsvector('english', coalesce(title, '')), 'A') || setweight(to_tsvector('english', coalesce(description, '')), 'B')", persisted=True), nullable=True))
+    op.create_index('ix_tasks_search_vector', 'tasks', ['search_vector'], unique=False, postgresql_using='gin')
+    # Trigram indexes only where the pg_trgm extension is available, like in app.models
+    op.execute("""
+    DO $$
+    BEGIN
+        IF EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm') THEN
+            CREATE EXTENSION IF NOT EXISTS pg_trgm;
+            CREATE INDEX ix_tasks_title_trgm ON tasks USING gin (title gin_trgm_ops);
+            CREATE INDEX ix_tasks_description_trgm ON tasks USING gin (description gin_trgm_ops);
+        END IF;
+    END $$
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_tasks_description_trgm")
+    op.execute("DROP INDEX IF EXISTS ix_tasks_title_trgm")
+    op.drop_index('ix_tasks_search_vector', table_name='tasks', postgresql_using='gin')
+    op.drop_column('tasks', 'search_vector')
@@ -0,0 +1,25 @@
+"""Index tombstones by deletion time for pruning
+
+Revision ID: 5a2d8e4f1c73
+Revises: 7e4b1d9c2f60
+Create Date: 2026-10-20 10:12:47.551093
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5a2d8e4f1c73'
+down_revision: Union[str, None] = '7e4b1d9c2f60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_task_tombstones_deleted_at', 'task_tombstones', ['deleted_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_task_tombstones_deleted_at', table_name='task_tombstones')
@@ -0,0 +1,76 @@
+"""Per-user task counters
+
+Revision ID: 6b1e0d4c9a27
+Revises: 4f9db2da3633
+Create Date: 2026-10-17 18:05:11.482310
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6b1e0d4c9a27'
+down_revision: Union[str, None] = '4f9db2da3633'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('task_counters',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('status', postgresql.ENUM('NEW', 'IN_PROGRESS', 'COMPLETED', name='status_task', create_type=False), nullable=False),
+    sa.Column('count', sa.BigInteger(), server_default='0', nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'status')
+    )
+    # Same function and triggers as in app.models
+    op.execute("""
+    CREATE OR REPLACE FUNCTION count_task_changes() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            UPDATE task_counters SET count = task_counters.count - removed.count
+            FROM (SELECT user_id, status, count(*) AS count FROM old_tasks GROUP BY user_id, status) removed
+            WHERE task_counters.user_id = removed.user_id AND task_counters.status = removed.status;
+        ELSIF TG_OP = 'INSERT' THEN
+            INSERT INTO task_counters (user_id, status, count)
+            SELECT user_id, status, count(*) FROM new_tasks GROUP BY user_id, status ORDER BY user_id, status
+            ON CONFLICT (user_id, status) DO UPDATE SET count = task_counters.count + excluded.count;
+        ELSE
+            INSERT INTO task_counters (user_id, status, count)
+            SELECT user_id, status, sum(delta) FROM (
+                SELECT user_id, status, 1 AS delta FROM new_tasks
+                UNION ALL
+                SELECT user_id, status, -1 AS delta FROM old_tasks
+            ) changes
+            GROUP BY user_id, status HAVING sum(delta) <> 0 ORDER BY user_id, status
+            ON CONFLICT (user_id, status) DO UPDATE SET count = task_counters.count + excluded.count;
+        END IF;
+        RETURN NULL;
+    END $$
+    """)
+    # Block writes while the existing tasks are counted, so none is missed before the triggers exist
+    op.execute("LOCK TABLE tasks IN SHARE MODE")
+    op.execute("""
+    CREATE TRIGGER tasks_count_inserts AFTER INSERT ON tasks
+        REFERENCING NEW TABLE AS new_tasks FOR EACH STATEMENT EXECUTE FUNCTION count_task_changes();
+    CREATE TRIGGER tasks_count_updates AFTER UPDATE ON tasks
+        REFERENCING OLD TABLE AS old_tasks NEW TABLE AS new_tasks FOR EACH STATEMENT EXECUTE FUNCTION count_task_changes();
+    CREATE TRIGGER tasks_count_deletes AFTER DELETE ON tasks
+        REFERENCING OLD TABLE AS old_tasks FOR EACH STATEMENT EXECUTE FUNCTION count_task_changes();
+    """)
+    op.execute("""
+    INSERT INTO task_counters (user_id, status, count)
+    SELECT user_id, status, count(*) FROM tasks GROUP BY user_id, status
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS tasks_count_deletes ON tasks")
+    op.execute("DROP TRIGGER IF EXISTS tasks_count_updates ON tasks")
+    op.execute("DROP TRIGGER IF EXISTS tasks_count_inserts ON tasks")
+    op.execute("DROP FUNCTION IF EXISTS count_task_changes()")
+    op.drop_table('task_counters')
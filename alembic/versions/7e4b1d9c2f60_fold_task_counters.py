@@ -0,0 +1,123 @@
+"""Fold task counter deltas as they pile up
+
+Revision ID: 7e4b1d9c2f60
+Revises: 2c8e5f7a9b13
+Create Date: 2026-10-19 09:31:26.402815
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7e4b1d9c2f60'
+down_revision: Union[str, None] = '2c8e5f7a9b13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Same functions as in app.models
+    op.execute("""
+    CREATE OR REPLACE FUNCTION fold_task_counters(fold_user_id integer, fold_status status_task) RETURNS void
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        IF (SELECT count(*) FROM (
+            SELECT 1 FROM task_counters WHERE user_id = fold_user_id AND status = fold_status LIMIT 32
+        ) deltas) < 32 THEN
+            RETURN;
+        END IF;
+        WITH folded AS (
+            DELETE FROM task_counters WHERE id IN (
+                SELECT id FROM task_counters WHERE user_id = fold_user_id AND status = fold_status
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING count
+        )
+        INSERT INTO task_counters (user_id, status, count)
+        SELECT fold_user_id, fold_status, sum(count) FROM folded HAVING sum(count) <> 0;
+    END $$;
+
+    CREATE OR REPLACE FUNCTION count_task_changes() RETURNS trigger LANGUAGE plpgsql AS $$
+    DECLARE
+        appended record;
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            FOR appended IN
+                WITH deltas AS (
+                    INSERT INTO task_counters (user_id, status, count)
+                    SELECT user_id, status, -count(*) FROM old_tasks
+                    WHERE EXISTS (SELECT 1 FROM users WHERE users.id = old_tasks.user_id)
+                    GROUP BY user_id, status
+                    RETURNING user_id, status
+                )
+                SELECT user_id, status FROM deltas
+            LOOP
+                PERFORM fold_task_counters(appended.user_id, appended.status);
+            END LOOP;
+        ELSIF TG_OP = 'INSERT' THEN
+            FOR appended IN
+                WITH deltas AS (
+                    INSERT INTO task_counters (user_id, status, count)
+                    SELECT user_id, status, count(*) FROM new_tasks GROUP BY user_id, status
+                    RETURNING user_id, status
+                )
+                SELECT user_id, status FROM deltas
+            LOOP
+                PERFORM fold_task_counters(appended.user_id, appended.status);
+            END LOOP;
+        ELSE
+            FOR appended IN
+                WITH deltas AS (
+                    INSERT INTO task_counters (user_id, status, count)
+                    SELECT user_id, status, sum(delta) FROM (
+                        SELECT user_id, status, 1 AS delta FROM new_tasks
+                        UNION ALL
+                        SELECT user_id, status, -1 AS delta FROM old_tasks
+                    ) changes
+                    GROUP BY user_id, status HAVING sum(delta) <> 0
+                    RETURNING user_id, status
+                )
+                SELECT user_id, status FROM deltas
+            LOOP
+                PERFORM fold_task_counters(appended.user_id, appended.status);
+            END LOOP;
+        END IF;
+        RETURN NULL;
+    END $$
+    """)
+    # Fold the deltas appended so far
+    op.execute("""
+    WITH folded AS (DELETE FROM task_counters RETURNING user_id, status, count)
+    INSERT INTO task_counters (user_id, status, count)
+    SELECT user_id, status, sum(count) FROM folded GROUP BY user_id, status HAVING sum(count) <> 0
+    """)
+
+
+def downgrade() -> None:
+    # Deltas are appended without folding again
+    op.execute("""
+    CREATE OR REPLACE FUNCTION count_task_changes() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            INSERT INTO task_counters (user_id, status, count)
+            SELECT user_id, status, -count(*) FROM old_tasks
+            WHERE EXISTS (SELECT 1 FROM users WHERE users.id = old_tasks.user_id)
+            GROUP BY user_id, status;
+        ELSIF TG_OP = 'INSERT' THEN
+            INSERT INTO task_counters (user_id, status, count)
+            SELECT user_id, status, count(*) FROM new_tasks GROUP BY user_id, status;
+        ELSE
+            INSERT INTO task_counters (user_id, status, count)
+            SELECT user_id, status, sum(delta) FROM (
+                SELECT user_id, status, 1 AS delta FROM new_tasks
+                UNION ALL
+                SELECT user_id, status, -1 AS delta FROM old_tasks
+            ) changes
+            GROUP BY user_id, status HAVING sum(delta) <> 0;
+        END IF;
+        RETURN NULL;
+    END $$
+    """)
+    op.execute("DROP FUNCTION fold_task_counters(integer, status_task)")
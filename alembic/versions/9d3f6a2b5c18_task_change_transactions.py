@@ -0,0 +1,37 @@
+"""Transaction ids of task changes
+
+Revision ID: 9d3f6a2b5c18
+Revises: 6b1e0d4c9a27
+Create Date: 2026-10-18 09:12:40.218734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d3f6a2b5c18'
+down_revision: Union[str, None] = '6b1e0d4c9a27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing rows all get the id of this transaction, their sequence numbers keep them in order
+    op.add_column('tasks', sa.Column('change_xid', sa.BigInteger(), server_default=sa.text('pg_current_xact_id()::text::bigint'), nullable=False))
+    op.add_column('task_tombstones', sa.Column('change_xid', sa.BigInteger(), server_default=sa.text('pg_current_xact_id()::text::bigint'), nullable=False))
+    op.create_index('ix_tasks_user_id_change_xid_change_seq', 'tasks', ['user_id', 'change_xid', 'change_seq'], unique=False)
+    op.create_index('ix_task_tombstones_user_id_change_xid_change_seq', 'task_tombstones', ['user_id', 'change_xid', 'change_seq'], unique=False)
+    op.drop_index('ix_tasks_user_id_change_seq', table_name='tasks')
+    op.drop_index('ix_task_tombstones_user_id_change_seq', table_name='task_tombstones')
+
+
+def downgrade() -> None:
+    op.create_index('ix_task_tombstones_user_id_change_seq', 'task_tombstones', ['user_id', 'change_seq'], unique=False)
+    op.create_index('ix_tasks_user_id_change_seq', 'tasks', ['user_id', 'change_seq'], unique=False)
+    op.drop_index('ix_task_tombstones_user_id_change_xid_change_seq', table_name='task_tombstones')
+    op.drop_index('ix_tasks_user_id_change_xid_change_seq', table_name='tasks')
+    op.drop_column('task_tombstones', 'change_xid')
+    op.drop_column('tasks', 'change_xid')
@@ -0,0 +1,42 @@
+"""Task change feed
+
+Revision ID: d2a7c5e19b36
+Revises: 8c4e2b7f1a90
+Create Date: 2026-10-17 15:02:37.554890
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2a7c5e19b36'
+down_revision: Union[str, None] = '8c4e2b7f1a90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute(sa.schema.CreateSequence(sa.Sequence('task_change_seq')))
+    # Existing tasks get their sequence numbers from the server default
+    op.add_column('tasks', sa.Column('change_seq', sa.BigInteger(), server_default=sa.text("nextval('task_change_seq')"), nullable=False))
+    op.create_index('ix_tasks_user_id_change_seq', 'tasks', ['user_id', 'change_seq'], unique=False)
+    op.create_table('task_tombstones',
+    sa.Column('task_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('change_seq', sa.BigInteger(), server_default=sa.text("nextval('task_change_seq')"), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('task_id')
+    )
+    op.create_index('ix_task_tombstones_user_id_change_seq', 'task_tombstones', ['user_id', 'change_seq'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_task_tombstones_user_id_change_seq', table_name='task_tombstones')
+    op.drop_table('task_tombstones')
+    op.drop_index('ix_tasks_user_id_change_seq', table_name='tasks')
+    op.drop_column('tasks', 'change_seq')
+    op.execute(sa.schema.DropSequence(sa.Sequence('task_change_seq')))
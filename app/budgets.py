@@ -0,0 +1,141 @@
+import logging
+from contextlib import contextmanager
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.instrumentation import current_trace
+
+logger = logging.getLogger(__name__)
+
+# Most SQL statements each route may execute before its response starts, by "METHOD path" of the route.
+# They count the user lookup of authenticated routes, which the identity cache usually saves, and assume
+# the in-memory event broker (the postgres broker adds a pg_notify per 200 changed tasks). A route that
+# goes over its budget most likely loads rows one by one (N+1): fix the query, or raise the budget with
+# the reason next to it. None marks routes whose statements grow with the request.
+QUERY_BUDGETS: dict[str, Optional[int]] = {
+    # auth/routes.py
+    "POST /auth/token": 3,  # The user lookup, then saving the password if it is rehashed
+    "POST /auth/signup": 3,
+    # app/main.py
+    "GET /tasks/": 3,
+    "GET /tasks/all": 3,
+    "GET /tasks/{task_id}": 3,
+    "POST /tasks/": 3,
+    "PUT /tasks/{task_id}": 4,
+    "DELETE /tasks/{task_id}": 4,
+    "PUT /tasks/{task_id}/complete": 4,
+    "GET /metrics/pool": 0,
+    "GET /metrics": 0,
+    # app/bulk.py
+    "POST /tasks/bulk": 2,
+    "PUT /tasks/bulk": 3,
+    "PUT /tasks/bulk/complete": 3,
+    "POST /tasks/bulk/delete": 3,
+    # app/counters.py
+    "GET /tasks/summary": 2,
+    # app/sync.py
+    "GET /tasks/changes": 4,  # The oldest running transaction, then tasks and tombstones
+    "GET /tasks/events": 1,
+    # app/transfer.py
+    "GET /tasks/export": 2,
+    "POST /tasks/import": None,  # Ids drawn and a COPY for each chunk of the body
+    "GET /tasks/import/{import_id}": 1,
+}
+
+# What the middleware does with a request over its budget
+QUERY_BUDGET_MODES = ("off", "warn", "raise")
+
+
+class QueryBudgetExceeded(AssertionError):
+    """
+    Raised when a request or a block of code executes more SQL statements than its budget.
+    """
+
+
+def route_key(method: str, path: str) -> str:
+    return f"{method} {path}"
+
+
+def check_budget(name: str, statements: list[str] | int, budget: int):
+    count = statements if isinstance(statements, int) else len(statements)
+    if count <= budget:
+        return
+    message = f"{name} executed {count} SQL statements, over its budget of {budget}"
+    if not isinstance(statements, int):
+        message += ":\n" + "\n".join(f"  {statement}" for statement in statements)
+    raise QueryBudgetExceeded(message)
+
+
+@contextmanager
+def query_budget(budget: int, name: str = "Block"):
+    """
+    Context manager failing with `QueryBudgetExceeded` when the statements executed inside
+    it, on any engine and in any thread, are more than `budget`.
+
+    Yields the list of the statements, filled in as they run.
+
+        with query_budget(2):
+            client.get(f"/tasks/{task_id}", headers=headers)
+    """
+    statements = []
+
+    def record_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(Engine, "before_cursor_execute", record_statement)
+    try:
+        yield statements
+    finally:
+        event.remove(Engine, "before_cursor_execute", record_statement)
+    check_budget(name, statements, budget)
+
+
+class QueryBudgetMiddleware:
+    """
+    Development guard comparing the SQL statements of each request with the budget of its
+    route in `QUERY_BUDGETS`, once the response starts.
+
+    With `mode` "warn" a request over its budget is logged, with "raise" it fails with
+    `QueryBudgetExceeded` (a 500, and a failed test under the test client). The statements
+    are counted by the request trace, so the middleware must run inside `InstrumentationMiddleware`.
+    """
+
+    def __init__(self, app: ASGIApp, mode: str, budgets: dict[str, Optional[int]] = QUERY_BUDGETS):
+        if mode not in QUERY_BUDGET_MODES:
+            raise ValueError(f"Unknown query budget mode {mode!r}, expected one of {', '.join(QUERY_BUDGET_MODES)}")
+        self.app = app
+        self.mode = mode
+        self.budgets = budgets
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or self.mode == "off":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_within_budget(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                self.check(scope)
+            await send(message)
+
+        await self.app(scope, receive, send_within_budget)
+
+    def check(self, scope: Scope):
+        trace = current_trace.get()
+        route = scope.get("route")
+        # Unmatched paths, and routes without SQL of their own like the OpenAPI docs
+        if trace is None or route is None:
+            return
+        key = route_key(scope["method"], route.path)
+        budget = self.budgets.get(key)
+        if budget is None:
+            return
+
+        try:
+            check_budget(key, trace.statements, budget)
+        except QueryBudgetExceeded as error:
+            if self.mode == "raise":
+                raise
+            logger.warning("%s", error)
@@ -0,0 +1,123 @@
+from typing import Any, Dict, List
+
+from fastapi import APIRouter, Body, Depends, HTTPException, Query
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app import crud
+from app.config import settings
+from app.database import run_db
+from app.dependencies import get_db
+from app.models import TaskStatusEnum
+from app.responses import ModelJSONResponse
+from app.schemas import BulkCreateResponse, BulkResultResponse, TaskBulkUpdate, TaskCreate, TaskSelection
+from auth.cache import UserIdentity
+from auth.dependencies import get_current_user
+
+router = APIRouter()
+
+
+# Validate every item up front, returning the valid tasks and the errors of the invalid ones
+def validate_items(items: List[Dict[str, Any]]):
+    tasks, errors = [], []
+    for index, item in enumerate(items):
+        try:
+            tasks.append(TaskCreate.model_validate(item))
+        except ValidationError as e:
+            errors.append({"index": index, "errors": e.errors(include_url=False, include_context=False)})
+    return tasks, errors
+
+
+# Endpoint to create many tasks at once
+@router.post("/bulk", response_model=BulkCreateResponse, status_code=201)
+async def create_tasks_bulk(
+        tasks: List[Dict[str, Any]] = Body(..., max_length=settings.bulk_max_items),
+        atomic: bool = Query(True),  # Reject the whole request if any task is invalid
+        session: Session | AsyncSession = Depends(get_db),
+        current_user: UserIdentity = Depends(get_current_user),
+):
+    """
+    Create many tasks with a single INSERT statement.
+
+    **Request Body:** a list of tasks, each with the same fields as `POST /tasks/`
+    (at most `BULK_MAX_ITEMS`, 1000 by default).
+
+    - **atomic**: When true (default) nothing is created if any task is invalid and the
+      errors of all invalid tasks are returned with status 422. When false the valid tasks
+      are created and the invalid ones are reported in `errors` by their position.
+    """
+    valid_tasks, errors = validate_items(tasks)
+
+    if errors and atomic:
+        raise HTTPException(status_code=422, detail=errors)
+
+    created = await run_db(session, crud.bulk_create_tasks, current_user.id, valid_tasks)
+
+    return ModelJSONResponse(BulkCreateResponse, {"created": created, "errors": errors}, status_code=201)
+
+
+# Endpoint to update many tasks at once. Only the owner's tasks are changed
+@router.put("/bulk", response_model=BulkResultResponse, status_code=200)
+async def update_tasks_bulk(
+        task_update: TaskBulkUpdate,
+        session: Session | AsyncSession = Depends(get_db),
+        current_user: UserIdentity = Depends(get_current_user),
+):
+    """
+    Apply the same changes to many tasks with a single UPDATE statement.
+
+    - **ids**: IDs of the tasks to update.
+    - **status**: Update only tasks with this status. Without `ids`, all own tasks with this status are updated.
+    - **changes**: Fields to set (`title`, `description`, `status`). Fields that are not sent are left unchanged.
+
+    Returns the result for every requested id: `updated`, `not_found`, `forbidden` (task of another user)
+    or `skipped` (own task not matching `status`).
+    """
+    values = task_update.changes.model_dump(exclude_unset=True)
+    if values.get("title", "") is None:
+        raise HTTPException(status_code=422, detail="Title can not be empty")
+    if not values:
+        raise HTTPException(status_code=422, detail="No changes given")
+
+    selection = TaskSelection(ids=task_update.ids, status=task_update.status)
+    results = await run_db(session, crud.bulk_update_tasks, current_user.id, selection, values, "updated")
+
+    return ModelJSONResponse(BulkResultResponse, {"results": results})
+
+
+# Endpoint to mark many tasks as completed at once. Only the owner's tasks are changed
+@router.put("/bulk/complete", response_model=BulkResultResponse, status_code=200)
+async def complete_tasks_bulk(
+        selection: TaskSelection,
+        session: Session | AsyncSession = Depends(get_db),
+        current_user: UserIdentity = Depends(get_current_user),
+):
+    """
+    Mark many tasks completed with a single UPDATE statement.
+
+    - **ids**: IDs of the tasks to complete.
+    - **status**: Complete only tasks with this status. Without `ids`, all own tasks with this status are completed.
+    """
+    values = {"status": TaskStatusEnum.COMPLETED}
+    results = await run_db(session, crud.bulk_update_tasks, current_user.id, selection, values, "completed")
+
+    return ModelJSONResponse(BulkResultResponse, {"results": results})
+
+
+# Endpoint to delete many tasks at once. Only the owner's tasks are deleted
+@router.post("/bulk/delete", response_model=BulkResultResponse, status_code=200)
+async def delete_tasks_bulk(
+        selection: TaskSelection,
+        session: Session | AsyncSession = Depends(get_db),
+        current_user: UserIdentity = Depends(get_current_user),
+):
+    """
+    Delete many tasks with a single DELETE statement.
+
+    - **ids**: IDs of the tasks to delete.
+    - **status**: Delete only tasks with this status. Without `ids`, all own tasks with this status are deleted.
+    """
+    results = await run_db(session, crud.bulk_delete_tasks, current_user.id, selection)
+
+    return ModelJSONResponse(BulkResultResponse, {"results": results})
@@ -0,0 +1,180 @@
+import zlib
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Optional encoders, used only when their package is installed
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class GzipEncoder:
+    def __init__(self):
+        # wbits 31: zlib stream with a gzip header and trailer
+        self._compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+
+    # Compress a chunk and flush it, so that a streamed chunk reaches the client right away
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class BrotliEncoder:
+    def __init__(self):
+        self._compressor = brotli.Compressor(quality=4)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class ZstdEncoder:
+    def __init__(self):
+        self._compressor = zstandard.ZstdCompressor(level=3).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH)
+
+
+# Encoders by Content-Encoding token, only those whose package is available
+ENCODERS = {"gzip": GzipEncoder}
+if brotli is not None:
+    ENCODERS["br"] = BrotliEncoder
+if zstandard is not None:
+    ENCODERS["zstd"] = ZstdEncoder
+
+
+def parse_accept_encoding(header: str) -> dict[str, float]:
+    """
+    Map every coding of an Accept-Encoding header to its quality value.
+    """
+    accepted = {}
+    for part in header.split(","):
+        coding, *params = [item.strip() for item in part.split(";")]
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[coding.lower()] = quality
+    return accepted
+
+
+def choose_encoding(header: str, preferred: list[str]) -> Optional[str]:
+    """
+    Pick the coding to answer an Accept-Encoding header with: the highest quality value
+    among the available encodings, ties going to the earlier one in `preferred`.
+    """
+    accepted = parse_accept_encoding(header)
+    best, best_quality = None, 0.0
+    for coding in preferred:
+        quality = accepted.get(coding, accepted.get("*", 0.0))
+        if coding in ENCODERS and quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+class CompressionMiddleware:
+    """
+    Compress response bodies with the best encoding the client accepts.
+
+    Only responses whose media type is in `content_types` are compressed, and only when the
+    body is at least `minimum_size` bytes; smaller ones are not worth the CPU. Streamed
+    responses are compressed chunk by chunk, each chunk flushed as it is sent. Responses that
+    already have a Content-Encoding are left alone.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int, content_types: list[str], encodings: list[str]):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.content_types = {content_type.strip().lower() for content_type in content_types}
+        self.encodings = [encoding.strip().lower() for encoding in encodings]
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""), self.encodings)
+        responder = CompressionResponder(self, encoding, send)
+        await self.app(scope, receive, responder.send)
+
+
+class CompressionResponder:
+    def __init__(self, middleware: CompressionMiddleware, encoding: Optional[str], send: Send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self._send = send
+        self.start_message: Optional[Message] = None
+        self.encoder = None
+        self.passthrough = False
+
+    def compressible(self, headers: Headers) -> bool:
+        media_type = headers.get("content-type", "").split(";")[0].strip().lower()
+        return media_type in self.middleware.content_types
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            # Held back until the first body chunk tells whether the response gets compressed
+            self.start_message = message
+            headers = Headers(raw=message["headers"])
+            if not self.compressible(headers):
+                self.passthrough = True
+            else:
+                # The body depends on Accept-Encoding even when it ends up sent as is
+                MutableHeaders(raw=message["headers"]).add_vary_header("Accept-Encoding")
+                self.passthrough = self.encoding is None or "content-encoding" in headers
+            return
+
+        if message["type"] != "http.response.body":
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.start_message is not None:
+            start, self.start_message = self.start_message, None
+            # Bodies sent at once are compressed from minimum_size on, streamed bodies always
+            if not self.passthrough and (more_body or len(body) >= self.middleware.minimum_size):
+                self.encoder = ENCODERS[self.encoding]()
+                headers = MutableHeaders(raw=start["headers"])
+                headers["Content-Encoding"] = self.encoding
+                if more_body:
+                    if "content-length" in headers:
+                        del headers["Content-Length"]
+                else:
+                    body = self.encoder.compress(body) + self.encoder.finish()
+                    headers["Content-Length"] = str(len(body))
+                    await self._send(start)
+                    await self._send({**message, "body": body})
+                    return
+            await self._send(start)
+
+        if self.encoder is not None:
+            body = self.encoder.compress(body) if body else b""
+            if not more_body:
+                body += self.encoder.finish()
+            message = {**message, "body": body}
+
+        await self._send(message)
@@ -20,6 +20,80 @@ class Settings(BaseSettings):
     algorithm: str
     access_token_expire_minutes: int
 
+    # Cache of authenticated user identities, so requests don't look up the user every time
+    user_cache_size: int = 10000  # 0 disables the cache
+    user_cache_ttl_seconds: float = 60
+    # Take the user id from the token's "uid" claim and skip the user lookup entirely.
+    # A deleted user's tokens then keep working until they expire
+    trust_token_user_id: bool = False
+
+    # Password hashing. Hashes are computed in a pool of worker processes
+    bcrypt_rounds: int = 12  # Stored hashes with other rounds are rehashed on the next login
+    password_hash_workers: int = 0  # Number of worker processes, 0 for one per CPU core
+    password_hash_queue_size: int = 64  # Hashing jobs allowed to wait for a worker before answering 503
+    password_hash_retry_after: int = 1  # Seconds sent in Retry-After when the queue is full
+
+    # Use the asyncpg engine and async sessions instead of psycopg2 on the threadpool
+    db_async: bool = False
+
+    # Connection pool of the application engines
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30  # Seconds to wait for a connection before giving up
+    db_pool_recycle: int = -1  # Seconds after which connections are replaced, -1 to keep them forever
+    db_pool_pre_ping: bool = False  # Test connections for liveness on checkout
+    db_external_pooler: bool = False  # Don't pool in the application (NullPool), e.g. behind PgBouncer
+
+    # Read replicas serving the read-only task endpoints, as comma-separated postgresql:// URLs, empty for none.
+    # Replicas failing their health check are skipped, and reads go to the primary when none is healthy
+    db_replica_urls: str = ""
+    db_replica_check_interval: float = 5  # Seconds between health checks of the replicas
+    db_replica_connect_timeout: int = 2  # Seconds to wait for a replica connection before falling back
+    # Seconds a user's reads stay on the primary after their own write, so replication lag never hides it
+    read_your_writes_seconds: float = 5
+
+    # Task change events pushed to clients: "memory" for a single worker, "postgres" (LISTEN/NOTIFY) for several
+    event_broker: str = "memory"
+    events_channel: str = "task_events"
+    events_queue_size: int = 1000  # Events buffered per connected client before it is told to resync
+    events_keepalive_seconds: float = 15
+
+    # Days tombstones of deleted tasks are kept for delta sync. Older sync tokens may have missed
+    # pruned deletions, so they are answered 410 and the client starts a full sync
+    sync_retention_days: float = 30
+    tombstone_prune_interval: float = 3600  # Seconds between prunings of old tombstones, 0 to never prune
+
+    # Maximum number of tasks accepted by a single bulk request
+    bulk_max_items: int = 1000
+
+    # Renderer of JSON responses without a response model: "orjson" (fast) or "json" (standard library)
+    json_renderer: str = "orjson"
+
+    # Response compression. Encodings in order of preference, br and zstd only when brotli/zstandard
+    # are installed. Never list text/event-stream: compressed events would be held back by proxies
+    compression_enabled: bool = True
+    compression_minimum_size: int = 1024  # Smaller bodies are sent as is
+    compression_encodings: str = "zstd,br,gzip"
+    compression_content_types: str = "application/json,application/x-ndjson,text/csv,text/plain"
+
+    # Request instrumentation. Stage timings and SQL counts of every request are kept as metrics (GET /metrics),
+    # and sent to the client in a Server-Timing header
+    server_timing_enabled: bool = True
+    # Answer requests sent with an "X-Profile" header with the profile of the request. Never enable it in production
+    profiling_enabled: bool = False
+    profiling_interval: float = 0.001  # Seconds between the samples of the profiler (pyinstrument only)
+    # Compare the SQL statements of each request with the budget of its route (app/budgets.py):
+    # "off", "warn" to log requests over budget, or "raise" to fail them. Meant for development and tests
+    query_budget_mode: str = "off"
+
+    # Rows fetched per round-trip from the server-side cursor of streamed exports
+    export_batch_size: int = 1000
+
+    # Rows validated, copied into the database and committed at a time by streamed imports
+    import_chunk_size: int = 5000
+    # Rejected rows whose errors are reported in the response of an import
+    import_max_errors: int = 1000
+
     class Config:
         env_file = ".env"
 
@@ -0,0 +1,129 @@
+import argparse
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import delete, func, insert, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal, run_db
+from app.models import Task, TaskCounter, TaskStatusEnum
+from app.replicas import get_read_db
+from app.responses import ModelJSONResponse
+from app.schemas import TaskSummary
+from auth.cache import UserIdentity
+from auth.dependencies import get_current_user
+
+router = APIRouter()
+
+
+# Sum the counter deltas of a user by status, with zero for the statuses without tasks. Writes fold the
+# deltas as they pile up, so this reads a few rows per status whatever the number of writes
+def fetch_task_counts(session: Session, user_id: int) -> dict:
+    rows = session.execute(
+        select(TaskCounter.status, func.sum(TaskCounter.count))
+        .where(TaskCounter.user_id == user_id)
+        .group_by(TaskCounter.status)
+    ).all()
+    counts = dict.fromkeys(TaskStatusEnum, 0)
+    counts.update(rows)
+    return counts
+
+
+def rebuild_task_counters(session: Session) -> int:
+    """
+    Recount the tasks of every user and status and replace the stored deltas with one counter
+    each, then commit.
+
+    Writes to tasks are blocked (reads are not) until the new counters are committed, so no
+    change slips in between counting and storing. Returns the number of counters that were wrong.
+    """
+    session.execute(text(f"LOCK TABLE {Task.__tablename__} IN SHARE MODE"))
+
+    actual = {
+        (user_id, status): count
+        for user_id, status, count in session.execute(
+            select(Task.user_id, Task.status, func.count()).group_by(Task.user_id, Task.status)
+        )
+    }
+    stored = {
+        (user_id, status): count
+        for user_id, status, count in session.execute(
+            select(TaskCounter.user_id, TaskCounter.status, func.sum(TaskCounter.count))
+            .group_by(TaskCounter.user_id, TaskCounter.status)
+            .having(func.sum(TaskCounter.count) != 0)
+        )
+    }
+    wrong = sum(1 for key in actual.keys() | stored.keys() if actual.get(key, 0) != stored.get(key, 0))
+
+    session.execute(delete(TaskCounter))
+    if actual:
+        session.execute(
+            insert(TaskCounter),
+            [{"user_id": user_id, "status": status, "count": count} for (user_id, status), count in actual.items()],
+        )
+    session.commit()
+
+    return wrong
+
+
+def compact_task_counters(session: Session) -> int:
+    """
+    Fold the counter deltas into one row per user and status, then commit. Returns the number of
+    rows removed.
+
+    Writers are not blocked: deltas committed while this runs are not seen by the DELETE and stay
+    as they are. Writes already fold the deltas of their user and status as they pile up, this
+    folds the remaining ones of every user at once.
+    """
+    before = session.scalar(select(func.count()).select_from(TaskCounter))
+    session.execute(text(f"""
+        WITH folded AS (DELETE FROM {TaskCounter.__tablename__} RETURNING user_id, status, count)
+        INSERT INTO {TaskCounter.__tablename__} (user_id, status, count)
+        SELECT user_id, status, sum(count) FROM folded GROUP BY user_id, status HAVING sum(count) <> 0
+    """))
+    after = session.scalar(select(func.count()).select_from(TaskCounter))
+    session.commit()
+
+    return before - after
+
+
+# Endpoint to get the number of tasks in each status
+@router.get("/summary", response_model=TaskSummary, status_code=200)
+async def read_task_summary(
+        session: Session | AsyncSession = Depends(get_read_db),
+        current_user: UserIdentity = Depends(get_current_user),
+        user_id: Optional[int] = Query(None),  # Optional user, the current user by default
+):
+    """
+    Retrieve how many tasks a user has in each status.
+
+    - **user_id**: Optional user to summarize, the current user by default.
+
+    The counts are kept up to date by every write, so the summary only sums the user's few counter rows.
+    """
+    user_id = current_user.id if user_id is None else user_id
+    counts = await run_db(session, fetch_task_counts, user_id)
+
+    return ModelJSONResponse(TaskSummary, {"user_id": user_id, "counts": counts, "total": sum(counts.values())})
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m app.counters", description="Maintain the per-user task counters.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("rebuild", help="Recount all tasks and fix the stored counters, blocking task writes")
+    commands.add_parser("compact", help="Fold the counter deltas into one row per user and status")
+    args = parser.parse_args()
+
+    with SessionLocal() as session:
+        if args.command == "rebuild":
+            wrong = rebuild_task_counters(session)
+            print(f"Task counters rebuilt, {wrong} were wrong")
+        else:
+            removed = compact_task_counters(session)
+            print(f"Task counters compacted, {removed} rows removed")
+
+
+if __name__ == "__main__":
+    main()
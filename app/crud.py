@@ -0,0 +1,338 @@
+import io
+from datetime import datetime
+
+from fastapi import HTTPException
+from sqlalchemy import Integer, any_, bindparam, delete, func, insert, text, tuple_, update
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.future import select
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
+from sqlalchemy.util import await_only
+
+from app import loaders
+from app.etags import etag_matches, task_etag
+from app.events import publish_task_events
+from app.models import Task, TaskTombstone, TaskStatusEnum
+from app.schemas import TaskCreate, TaskSelection, TaskUpdate
+
+# Synchronous data access functions. Endpoints call them through app.database.run_db,
+# so they work with both the sync and the async engine. The session is always the first argument.
+
+
+def fetch_rows(session: Session, query):
+    return session.execute(query).all()
+
+
+# Add an object, commit and reload it with the values generated by the database
+def save(session: Session, obj):
+    session.add(obj)
+    session.commit()
+    session.refresh(obj)
+    return obj
+
+
+def create_task(session: Session, user_id: int, task_create: TaskCreate):
+    task = Task(
+        title=task_create.title,
+        description=task_create.description,
+        user_id=user_id,
+        status=task_create.status,
+    )
+
+    session.add(task)
+    session.flush()  # Get the id for the event
+    publish_task_events(session, user_id, "created", [task.id])
+    session.commit()
+    session.refresh(task)  # Refresh the task to get the values generated by the database
+
+    return task
+
+
+def get_task_or_404(session: Session, task_id: int):
+    query = select(Task).where(Task.id == task_id).options(*loaders.TASK_ONLY)
+    result = session.execute(query)
+    task = result.scalar_one_or_none()
+
+    if task is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+
+    return task
+
+
+# Get only the version of a task, None if it doesn't exist
+def get_task_version(session: Session, task_id: int):
+    return session.execute(select(Task.version).where(Task.id == task_id)).scalar_one_or_none()
+
+
+# Times a write to a task is applied again when another request changed the task in the meantime
+CONFLICT_RETRIES = 3
+
+
+def commit_with_retries(session: Session, write):
+    """
+    Run `write()`, which reads a task and changes it, then commit and return its result.
+
+    The task's version guards the write, so when another request changed or deleted the task
+    between the read and the commit, the transaction is rolled back and `write()` runs again
+    on a fresh read. A task that keeps changing gives 409.
+    """
+    for _ in range(CONFLICT_RETRIES):
+        result = write()
+        try:
+            session.commit()
+        except StaleDataError:
+            session.rollback()
+            continue
+        return result
+
+    raise HTTPException(status_code=409, detail="Task is being modified by another request, try again")
+
+
+# Get a task that must belong to the given user, 403 otherwise
+def get_owned_task_or_403(session: Session, task_id: int, user_id: int, action: str):
+    task = get_task_or_404(session, task_id)
+
+    if task.user_id != user_id:
+        raise HTTPException(status_code=403, detail=f"You do not have permission to {action} this task.")
+
+    return task
+
+
+def update_task(session: Session, task_id: int, user_id: int, task_update: TaskUpdate, if_match: str | None = None):
+    def write():
+        task = get_owned_task_or_403(session, task_id, user_id, "update")
+
+        # Optimistic concurrency: the client's copy must still be the current version. After a
+        # conflict the task is read again, so a client that sent If-Match gets 412 at this point
+        if if_match is not None and not etag_matches(if_match, task_etag(task.id, task.version)):
+            raise HTTPException(status_code=412, detail="Task has been modified")
+
+        # Update the task with the provided data
+        if task_update.title is not None:
+            task.title = task_update.title
+        task.description = task_update.description
+        task.status = task_update.status
+        publish_task_events(session, user_id, "updated", [task.id])
+        return task
+
+    task = commit_with_retries(session, write)
+    session.refresh(task)  # Refresh the task to get the updated values
+
+    return task
+
+
+# Record deleted tasks for delta sync, in the same transaction as the deletion
+def add_tombstones(session: Session, user_id: int, task_ids):
+    if task_ids:
+        session.execute(insert(TaskTombstone).values([{"task_id": task_id, "user_id": user_id} for task_id in task_ids]))
+
+
+# Delete the tombstones of tasks deleted before `before`, returns the number deleted
+def prune_tombstones(session: Session, before: datetime) -> int:
+    result = session.execute(delete(TaskTombstone).where(TaskTombstone.deleted_at < before))
+    session.commit()
+    return result.rowcount
+
+
+def delete_task(session: Session, task_id: int, user_id: int):
+    def write():
+        task = get_owned_task_or_403(session, task_id, user_id, "delete")
+
+        session.delete(task)
+        add_tombstones(session, user_id, [task_id])
+        publish_task_events(session, user_id, "deleted", [task_id])
+
+    commit_with_retries(session, write)
+
+
+def complete_task(session: Session, task_id: int, user_id: int):
+    def write():
+        task = get_owned_task_or_403(session, task_id, user_id, "change status of")
+
+        task.status = TaskStatusEnum.COMPLETED
+        publish_task_events(session, user_id, "updated", [task.id])
+        return task
+
+    task = commit_with_retries(session, write)
+    session.refresh(task)
+    return task
+
+
+# Insert tasks for a user with a single multi-row INSERT ... RETURNING, in the order given
+def bulk_create_tasks(session: Session, user_id: int, tasks: list[TaskCreate]):
+    if not tasks:
+        return []
+
+    rows = [
+        {"title": task.title, "description": task.description, "status": task.status, "user_id": user_id}
+        for task in tasks
+    ]
+    # Plain rows rather than Task objects, which the commit would expire and reload one by one.
+    # Nulls are rendered, otherwise the ORM leaves them out and splits the rows into one INSERT per shape
+    created = session.execute(
+        insert(Task)
+        .returning(Task.id, Task.title, Task.description, Task.status, Task.user_id, sort_by_parameter_order=True)
+        .execution_options(render_nulls=True),
+        rows,
+    ).all()
+    publish_task_events(session, user_id, "created", [task.id for task in created])
+    session.commit()
+
+    return created
+
+
+# Columns written by copy_tasks, every other column gets its server default
+COPY_COLUMNS = ("id", "title", "description", "status", "user_id")
+
+
+# Escape a value for the text format of COPY, None is NULL
+def copy_text(value) -> str:
+    if value is None:
+        return "\\N"
+    return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+def copy_tasks(session: Session, user_id: int, tasks: list[TaskCreate]):
+    """
+    Insert tasks with COPY, without committing, and return their ids.
+
+    The ids are drawn from the id sequence beforehand, in one statement, so the created
+    tasks can be announced to subscribers. COPY goes through the driver connection:
+    `copy_expert` with psycopg2 and `copy_records_to_table` with asyncpg.
+    """
+    if not tasks:
+        return []
+
+    ids = session.scalars(
+        select(func.nextval(func.pg_get_serial_sequence(Task.__tablename__, "id")))
+        .select_from(func.generate_series(1, len(tasks)))
+    ).all()
+    records = [(task_id, task.title, task.description, task.status.name, user_id) for task_id, task in zip(ids, tasks)]
+
+    driver_connection = session.connection().connection.driver_connection
+    if hasattr(driver_connection, "copy_records_to_table"):
+        # asyncpg, the sync session runs inside AsyncSession.run_sync so the coroutine can be awaited
+        await_only(driver_connection.copy_records_to_table(Task.__tablename__, records=records, columns=COPY_COLUMNS))
+    else:
+        data = "".join("\t".join(copy_text(value) for value in record) + "\n" for record in records)
+        with driver_connection.cursor() as cursor:
+            cursor.copy_expert(f"COPY {Task.__tablename__} ({', '.join(COPY_COLUMNS)}) FROM STDIN", io.StringIO(data))
+
+    publish_task_events(session, user_id, "created", ids)
+    return ids
+
+
+# WHERE clause of a bulk operation. Ownership is part of the statement itself
+def selection_filters(user_id: int, selection: TaskSelection):
+    filters = [Task.user_id == user_id]
+    if selection.ids is not None:
+        filters.append(Task.id == any_(bindparam("ids", selection.ids, type_=ARRAY(Integer))))
+    if selection.status is not None:
+        filters.append(Task.status == selection.status)
+    return filters
+
+
+def bulk_results(session: Session, user_id: int, selection: TaskSelection, affected_ids, outcome: str):
+    """
+    Build the per-id results of a bulk operation.
+
+    Requested ids that were not affected are looked up once to tell apart tasks that
+    don't exist, tasks of other users and own tasks that didn't match the status filter.
+    """
+    if selection.ids is None:
+        return [{"id": task_id, "result": outcome} for task_id in sorted(affected_ids)]
+
+    affected = set(affected_ids)
+    missing = [task_id for task_id in dict.fromkeys(selection.ids) if task_id not in affected]
+    owners = {}
+    if missing:
+        query = select(Task.id, Task.user_id).where(Task.id == any_(bindparam("ids", missing, type_=ARRAY(Integer))))
+        owners = dict(session.execute(query).all())
+
+    results = []
+    for task_id in dict.fromkeys(selection.ids):
+        if task_id in affected:
+            result = outcome
+        elif task_id not in owners:
+            result = "not_found"
+        elif owners[task_id] != user_id:
+            result = "forbidden"
+        else:
+            result = "skipped"
+        results.append({"id": task_id, "result": result})
+
+    return results
+
+
+# Apply the same changes to all selected tasks of a user with a single UPDATE
+def bulk_update_tasks(session: Session, user_id: int, selection: TaskSelection, values: dict, outcome: str):
+    statement = (
+        update(Task)
+        .where(*selection_filters(user_id, selection))
+        .values(**values, version=Task.version + 1)
+        .returning(Task.id)
+    )
+    affected_ids = session.execute(statement, execution_options={"synchronize_session": False}).scalars().all()
+    publish_task_events(session, user_id, "updated", affected_ids)
+    results = bulk_results(session, user_id, selection, affected_ids, outcome)
+    session.commit()
+
+    return results
+
+
+# Delete all selected tasks of a user with a single DELETE
+def bulk_delete_tasks(session: Session, user_id: int, selection: TaskSelection):
+    statement = delete(Task).where(*selection_filters(user_id, selection)).returning(Task.id)
+    affected_ids = session.execute(statement, execution_options={"synchronize_session": False}).scalars().all()
+    add_tombstones(session, user_id, affected_ids)
+    publish_task_events(session, user_id, "deleted", affected_ids)
+    results = bulk_results(session, user_id, selection, affected_ids, "deleted")
+    session.commit()
+
+    return results
+
+
+def fetch_changes(session: Session, user_id: int, since: tuple[int, int], limit: int):
+    """
+    Fetch up to `limit` changes of a user's tasks after the position `since`, oldest first.
+
+    Changes are ordered by the id of their transaction, then by sequence number. Only the changes
+    of transactions older than every transaction still running are returned: a change can no longer
+    commit at an earlier position than those, so a sync token never skips one. Returns the changed
+    tasks, the deleted task ids, the position of the last change returned and whether more changes
+    follow. Both tables are read through their (user_id, change_xid, change_seq) index, so the cost
+    depends on the number of changes only.
+    """
+    horizon = session.scalar(text("SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint"))
+
+    tasks = session.execute(
+        select(Task)
+        .where(Task.user_id == user_id, tuple_(Task.change_xid, Task.change_seq) > since, Task.change_xid < horizon)
+        .order_by(Task.change_xid, Task.change_seq)
+        .limit(limit + 1)
+    ).scalars().all()
+    tombstones = session.execute(
+        select(TaskTombstone.task_id, TaskTombstone.change_xid, TaskTombstone.change_seq)
+        .where(
+            TaskTombstone.user_id == user_id,
+            tuple_(TaskTombstone.change_xid, TaskTombstone.change_seq) > since,
+            TaskTombstone.change_xid < horizon,
+        )
+        .order_by(TaskTombstone.change_xid, TaskTombstone.change_seq)
+        .limit(limit + 1)
+    ).all()
+
+    # Merge both feeds by position and keep the oldest `limit` changes
+    changes = sorted(
+        [((task.change_xid, task.change_seq), task) for task in tasks]
+        + [((row.change_xid, row.change_seq), row) for row in tombstones],
+        key=lambda change: change[0],
+    )
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+
+    changed = [change for _, change in changes if isinstance(change, Task)]
+    deleted = [change.task_id for _, change in changes if not isinstance(change, Task)]
+    last_position = changes[-1][0] if changes else since
+
+    return changed, deleted, last_position, has_more
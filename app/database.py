@@ -1,15 +1,26 @@
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base, sessionmaker, Session
 from app.config import settings
+from app.pool import TimedAsyncAdaptedQueuePool, TimedQueuePool, engine_options
 
-SQLALCHEMY_DATABASE_URL = f"postgresql+psycopg2://{settings.db_user}:{settings.db_password}@{settings.db_host}/{settings.db_name}"
+SQLALCHEMY_DATABASE_URL = f"postgresql+psycopg2://{settings.db_user}:{settings.db_password}@{settings.db_host}:{settings.db_port}/{settings.db_name}"
+ASYNC_SQLALCHEMY_DATABASE_URL = f"postgresql+asyncpg://{settings.db_user}:{settings.db_password}@{settings.db_host}:{settings.db_port}/{settings.db_name}"
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **engine_options(TimedQueuePool))
 
 SessionLocal = sessionmaker(
     autocommit=False, autoflush=False, bind=engine
 )
 
+async_engine = create_async_engine(ASYNC_SQLALCHEMY_DATABASE_URL, **engine_options(TimedAsyncAdaptedQueuePool))
+
+# Objects are not expired on commit, so they can be serialized without lazy loads outside the greenlet
+AsyncSessionLocal = async_sessionmaker(
+    autoflush=False, expire_on_commit=False, bind=async_engine
+)
+
 Base = declarative_base()
 
 class SessionManager:
@@ -27,3 +38,33 @@ class SessionManager:
                 self.db.rollback()
         finally:
             self.db.close()
+
+
+class AsyncSessionManager:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def __aenter__(self):
+        return self.db
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        try:
+            if exc_type is None:
+                await self.db.commit()
+            else:
+                await self.db.rollback()
+        finally:
+            await self.db.close()
+
+
+async def run_db(db: Session | AsyncSession, fn, *args, **kwargs):
+    """
+    Run a synchronous database function with either kind of session.
+
+    `fn` receives a regular `Session` as its first argument. With an `AsyncSession`
+    it runs on the event loop through `run_sync`, with a sync session it runs on
+    the threadpool, so the same data access code serves both engines.
+    """
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args, **kwargs)
+    return await run_in_threadpool(fn, db, *args, **kwargs)
@@ -1,7 +1,8 @@
-from .database import SessionLocal, SessionManager
+from .config import settings
+from .database import AsyncSessionLocal, AsyncSessionManager, SessionLocal, SessionManager
 
 
-def get_db():
+def get_sync_db():
     """
     Dependency that provides a database session to FastAPI endpoints.
 
@@ -12,3 +13,26 @@ def get_db():
     db = SessionLocal()
     with SessionManager(db) as session:
         yield session
+
+
+async def get_async_db():
+    """
+    Async counterpart of `get_sync_db`, yielding an `AsyncSession` bound to the asyncpg engine.
+    """
+    db = AsyncSessionLocal()
+    async with AsyncSessionManager(db) as session:
+        yield session
+
+
+# The session dependency used by all endpoints, picked by the `db_async` setting
+get_db = get_async_db if settings.db_async else get_sync_db
+
+
+def get_sessionmaker():
+    """
+    Dependency that provides the session factory itself.
+
+    The session yielded by `get_db` is closed before the response is sent, so responses
+    streamed after the endpoint returns open their own session from this factory.
+    """
+    return AsyncSessionLocal if settings.db_async else SessionLocal
@@ -0,0 +1,39 @@
+import hashlib
+
+from fastapi import Response
+
+
+# Weak ETag of a single task, it changes whenever the task's version is bumped
+def task_etag(task_id: int, version: int) -> str:
+    return f'W/"{task_id}-{version}"'
+
+
+# Weak ETag of a page of tasks, built from the (id, version) pairs on the page and the total
+def page_etag(total: int, rows) -> str:
+    digest = hashlib.md5(",".join(f"{row.id}:{row.version}" for row in rows).encode()).hexdigest()
+    return f'W/"{total}-{digest}"'
+
+
+def parse_etags(header: str) -> list[str]:
+    """
+    Split an If-None-Match / If-Match header into its entity tags, without the weak prefix.
+
+    Tags are compared with the weak comparison, so W/"x" and "x" are the same tag.
+    """
+    tags = []
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag:
+            tags.append(tag)
+    return tags
+
+
+def etag_matches(header: str, etag: str) -> bool:
+    tags = parse_etags(header)
+    return "*" in tags or parse_etags(etag)[0] in tags
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
@@ -0,0 +1,197 @@
+import asyncio
+import json
+import logging
+import select as selectors
+import threading
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+
+import psycopg2
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.writes import record_write
+
+logger = logging.getLogger(__name__)
+
+# Task ids per event, keeps Postgres notification payloads well below their 8000 byte limit
+EVENT_CHUNK_SIZE = 200
+
+
+@dataclass(eq=False)
+class Subscription:
+    """
+    Events of one user delivered to one listener, on the listener's event loop.
+    """
+
+    user_id: int
+    loop: asyncio.AbstractEventLoop
+    queue: asyncio.Queue = field(default_factory=lambda: asyncio.Queue(maxsize=settings.events_queue_size))
+    # Set when events had to be dropped because the listener was too slow
+    overflowed: bool = False
+
+    def put(self, task_event: dict):
+        try:
+            self.queue.put_nowait(task_event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def get(self) -> dict:
+        return await self.queue.get()
+
+
+class Broker(ABC):
+    """
+    Fans out task change events to the subscriptions of the affected user.
+
+    Write paths call `stage()` inside their transaction, and the event reaches the
+    subscribers only once that transaction commits. How events travel from the
+    writer to the subscribers is up to the backend.
+    """
+
+    def __init__(self):
+        self._subscriptions: dict[int, set[Subscription]] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id: int) -> Subscription:
+        subscription = Subscription(user_id, asyncio.get_running_loop())
+        with self._lock:
+            self._subscriptions.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.user_id, set())
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                self._subscriptions.pop(subscription.user_id, None)
+
+    # Deliver an event to the subscriptions of this process. Safe to call from any thread
+    def dispatch(self, user_id: int, task_event: dict):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(user_id, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put, task_event)
+            except RuntimeError:
+                # The listener's event loop is gone
+                self.unsubscribe(subscription)
+
+    # Send an event with the session's transaction
+    @abstractmethod
+    def stage(self, session: Session, user_id: int, task_event: dict):
+        ...
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+
+class InMemoryBroker(Broker):
+    """
+    Delivers events to subscribers in the same process only, suitable for a single worker.
+    """
+
+    def stage(self, session: Session, user_id: int, task_event: dict):
+        session.info.setdefault("task_events", []).append((user_id, task_event))
+
+
+@event.listens_for(Session, "after_commit")
+def dispatch_staged_events(session):
+    for user_id, task_event in session.info.pop("task_events", []):
+        broker.dispatch(user_id, task_event)
+
+
+@event.listens_for(Session, "after_rollback")
+def discard_staged_events(session):
+    session.info.pop("task_events", None)
+
+
+class PostgresBroker(Broker):
+    """
+    Delivers events through Postgres LISTEN/NOTIFY, so subscribers connected to any worker receive them.
+
+    NOTIFY is transactional, so events are sent with the writer's transaction. Every
+    process keeps one connection listening on the channel and dispatches what it
+    receives to its own subscribers.
+    """
+
+    def __init__(self, connect_args: dict, channel: str):
+        super().__init__()
+        self.connect_args = connect_args
+        self.channel = channel
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def stage(self, session: Session, user_id: int, task_event: dict):
+        payload = json.dumps({"user_id": user_id, "event": task_event}, separators=(",", ":"))
+        session.execute(select(func.pg_notify(self.channel, payload)))
+
+    def start(self):
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._listen, name="task-events-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _listen(self):
+        while not self._stopped.is_set():
+            try:
+                connection = psycopg2.connect(**self.connect_args)
+                connection.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                with connection.cursor() as cursor:
+                    cursor.execute(f'LISTEN "{self.channel}"')
+                try:
+                    while not self._stopped.is_set():
+                        if selectors.select([connection], [], [], 1.0) == ([], [], []):
+                            continue
+                        connection.poll()
+                        while connection.notifies:
+                            self._dispatch_notification(connection.notifies.pop(0).payload)
+                finally:
+                    connection.close()
+            # Whatever goes wrong with the connection, including the socket failing under select(),
+            # the thread must keep listening or events stop for the whole process
+            except Exception:
+                logger.exception("Task events listener lost its connection, reconnecting")
+                self._stopped.wait(1.0)
+
+    # A malformed notification is skipped, the others are still delivered
+    def _dispatch_notification(self, payload: str):
+        try:
+            message = json.loads(payload)
+            self.dispatch(message["user_id"], message["event"])
+        except Exception:
+            logger.exception("Skipping task event notification %r", payload)
+
+
+def create_broker() -> Broker:
+    if settings.event_broker == "postgres":
+        connect_args = {
+            "dbname": settings.db_name,
+            "user": settings.db_user,
+            "password": settings.db_password,
+            "host": settings.db_host,
+            "port": settings.db_port,
+        }
+        return PostgresBroker(connect_args, settings.events_channel)
+    return InMemoryBroker()
+
+
+broker = create_broker()
+
+
+# Stage one event per chunk of task ids, for the user owning the tasks. Every write of a
+# user's tasks goes through here, so it is also where the write is recorded for read-your-writes
+def publish_task_events(session: Session, user_id: int, event_type: str, task_ids):
+    record_write(session)
+    task_ids = list(task_ids)
+    for start in range(0, len(task_ids), EVENT_CHUNK_SIZE):
+        broker.stage(session, user_id, {"type": event_type, "task_ids": task_ids[start:start + EVENT_CHUNK_SIZE]})
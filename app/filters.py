@@ -0,0 +1,63 @@
+import enum
+from typing import List, Optional
+
+from app.models import Task, TaskStatusEnum
+from app.pagination import paginate_by_id, paginate_by_rank
+from app.search import search_filter
+
+# Filters and orderings of the task list endpoints. Each of them is served by an index:
+#   user_id (+ id range)     ix_tasks_user_id_id, in either direction
+#   status (+ id range)      ix_tasks_status_id, several statuses through = ANY
+#   id range / no filter     the primary key, in either direction
+#   q                        ix_tasks_search_vector and the trigram indexes, see app.search
+# Other filters of a combination are checked on the rows read through that index.
+# tests/test_query_plans.py checks every combination against a seeded table.
+
+
+class TaskSort(str, enum.Enum):
+    ID = "id"
+    ID_DESC = "-id"
+
+
+def task_filters(
+        user_id: Optional[int] = None,
+        statuses: Optional[List[TaskStatusEnum]] = None,
+        min_id: Optional[int] = None,
+        max_id: Optional[int] = None,
+        q: Optional[str] = None,
+) -> list:
+    """
+    Build the WHERE clause of a task list from the given filters, None meaning no filter.
+    """
+    filters = []
+
+    # Add owner filter if provided
+    if user_id is not None:
+        filters.append(Task.user_id == user_id)
+
+    # Add status filter if provided, with a single status the (status, id) index also gives the order
+    if statuses:
+        statuses = list(dict.fromkeys(statuses))
+        filters.append(Task.status == statuses[0] if len(statuses) == 1 else Task.status.in_(statuses))
+
+    # Add id range if provided, both ends are inclusive
+    if min_id is not None:
+        filters.append(Task.id >= min_id)
+    if max_id is not None:
+        filters.append(Task.id <= max_id)
+
+    # Add search filter if provided
+    if q:
+        filters.append(search_filter(q))
+
+    return filters
+
+
+def paginate_tasks(query, page: int, size: int, cursor: Optional[str], sort: TaskSort = TaskSort.ID, rank=None):
+    """
+    Order and paginate a task query: by descending `rank` then id when a rank is given,
+    by id in the direction of `sort` otherwise. Both orders are keyset compatible.
+    """
+    if rank is not None:
+        return paginate_by_rank(query.add_columns(rank.label("rank")), rank, Task.id, page, size, cursor)
+    return paginate_by_id(query, Task.id, page, size, cursor, descending=sort is TaskSort.ID_DESC)
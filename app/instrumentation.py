@@ -0,0 +1,225 @@
+import cProfile
+import io
+import pstats
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.metrics import Counter, Histogram
+
+# Optional sampling profiler, used only when its package is installed
+try:
+    from pyinstrument import Profiler
+except ImportError:
+    Profiler = None
+
+# Stages of the request path that are timed, with the histogram of each
+STAGES = {
+    "jwt": Histogram("request_jwt_decode_seconds", "Time spent decoding the JWT of a request"),
+    "user_query": Histogram("request_user_query_seconds", "Time spent loading the authenticated user"),
+    "task_query": Histogram("request_task_query_seconds", "Time spent querying tasks in the read endpoints"),
+    "response_build": Histogram("request_response_build_seconds", "Time spent building and rendering task lists"),
+    "response_model": Histogram(
+        "request_response_model_seconds", "Time spent validating and rendering response models (ModelJSONResponse)"
+    ),
+}
+
+http_requests = Counter("http_requests_total", "HTTP requests served")
+request_duration = Histogram("http_request_duration_seconds", "Time until the response of a request starts")
+request_db_time = Histogram("request_db_seconds", "Time spent executing SQL statements per request")
+request_statements = Histogram(
+    "request_sql_statements", "SQL statements executed per request", buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 500)
+)
+request_rows = Histogram(
+    "request_sql_rows", "Rows returned or affected by SQL statements per request",
+    buckets=(0, 1, 10, 100, 1000, 10000, 100000, 1000000),
+)
+
+# Header asking for the profile of a request, honoured when profiling is enabled
+PROFILE_HEADER = "x-profile"
+
+
+@dataclass
+class RequestTrace:
+    """
+    Timings and SQL counts of one request.
+
+    The trace is shared by everything running for the request, including dependencies and
+    sync sessions on the threadpool, which see it through a copy of the request's context.
+    """
+
+    start: float = field(default_factory=time.perf_counter)
+    stages: dict[str, float] = field(default_factory=dict)
+    statements: int = 0
+    rows: int = 0
+    db_time: float = 0.0
+
+    def add(self, stage: str, duration: float):
+        self.stages[stage] = self.stages.get(stage, 0.0) + duration
+
+    def server_timing(self, total: float) -> str:
+        metrics = [f"{stage};dur={duration * 1000:.3f}" for stage, duration in self.stages.items()]
+        metrics.append(f'db;dur={self.db_time * 1000:.3f};desc="{self.statements} statements, {self.rows} rows"')
+        metrics.append(f"total;dur={total * 1000:.3f}")
+        return ", ".join(metrics)
+
+
+current_trace: ContextVar[Optional[RequestTrace]] = ContextVar("current_trace", default=None)
+
+
+@contextmanager
+def span(stage: str):
+    """
+    Time a stage of the request, adding it to the stage's histogram and to the current trace.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start
+        STAGES[stage].observe(duration)
+        trace = current_trace.get()
+        if trace is not None:
+            trace.add(stage, duration)
+
+
+# Count and time the statements of the current request, on every engine, sync or async
+@event.listens_for(Engine, "before_cursor_execute")
+def start_statement(conn, cursor, statement, parameters, context, executemany):
+    if current_trace.get() is not None:
+        conn.info.setdefault("statement_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def end_statement(conn, cursor, statement, parameters, context, executemany):
+    trace = current_trace.get()
+    starts = conn.info.get("statement_start")
+    if trace is None or not starts:
+        return
+    trace.db_time += time.perf_counter() - starts.pop()
+    trace.statements += 1
+    # Rows returned by a query or affected by a write, unknown (-1) for server-side cursors
+    trace.rows += max(cursor.rowcount, 0)
+
+
+# A failed statement never reaches after_cursor_execute, drop its start so it doesn't stay on the pooled connection
+@event.listens_for(Engine, "handle_error")
+def discard_failed_statement(exception_context):
+    connection = exception_context.connection
+    starts = connection.info.get("statement_start") if connection is not None else None
+    if starts:
+        starts.pop()
+
+
+class RequestProfiler:
+    """
+    Profile of a single request: sampled by pyinstrument when it is installed, otherwise
+    traced by cProfile, which is slower but always available.
+
+    Only the event loop thread is profiled, so the work of sync sessions on the threadpool
+    shows up as time waiting for it.
+    """
+
+    def __init__(self, interval: float):
+        if Profiler is not None:
+            self.profiler = Profiler(interval=interval, async_mode="enabled")
+        else:
+            self.profiler = cProfile.Profile()
+
+    def start(self):
+        if Profiler is not None:
+            self.profiler.start()
+        else:
+            self.profiler.enable()
+
+    def stop(self):
+        if Profiler is not None:
+            self.profiler.stop()
+        else:
+            self.profiler.disable()
+
+    def report(self) -> str:
+        if Profiler is not None:
+            return self.profiler.output_text(unicode=True, color=False)
+        output = io.StringIO()
+        pstats.Stats(self.profiler, stream=output).sort_stats("cumulative").print_stats(50)
+        return output.getvalue()
+
+
+class InstrumentationMiddleware:
+    """
+    Trace every request: stage timings and SQL counts go to the metrics, and to a
+    `Server-Timing` header when `server_timing` is on.
+
+    With `profiling` on, a request sent with an `X-Profile` header is answered with the text
+    report of its profile instead of its response, whose status is kept in `X-Profiled-Status`.
+    """
+
+    def __init__(self, app: ASGIApp, server_timing: bool, profiling: bool, profiling_interval: float):
+        self.app = app
+        self.server_timing = server_timing
+        self.profiling = profiling
+        self.profiling_interval = profiling_interval
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace = RequestTrace()
+        token = current_trace.set(trace)
+        try:
+            if self.profiling and PROFILE_HEADER in Headers(scope=scope):
+                await self.profile(scope, receive, send, trace)
+            else:
+                await self.app(scope, receive, self.timed_send(send, trace))
+        finally:
+            current_trace.reset(token)
+            http_requests.inc()
+            request_db_time.observe(trace.db_time)
+            request_statements.observe(trace.statements)
+            request_rows.observe(trace.rows)
+
+    def timed_send(self, send: Send, trace: RequestTrace) -> Send:
+        async def send_with_timing(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                total = time.perf_counter() - trace.start
+                request_duration.observe(total)
+                if self.server_timing:
+                    MutableHeaders(raw=message["headers"]).append("Server-Timing", trace.server_timing(total))
+            await send(message)
+
+        return send_with_timing
+
+    async def profile(self, scope: Scope, receive: Receive, send: Send, trace: RequestTrace) -> None:
+        messages = []
+
+        async def collect(message: Message) -> None:
+            messages.append(message)
+
+        profiler = RequestProfiler(self.profiling_interval)
+        profiler.start()
+        try:
+            await self.app(scope, receive, self.timed_send(collect, trace))
+        finally:
+            profiler.stop()
+
+        start = next(message for message in messages if message["type"] == "http.response.start")
+        body = profiler.report().encode()
+        headers = MutableHeaders(raw=list(start["headers"]))
+        headers["Content-Type"] = "text/plain; charset=utf-8"
+        headers["Content-Length"] = str(len(body))
+        headers["X-Profiled-Status"] = str(start["status"])
+        for name in ("content-encoding", "etag"):
+            if name in headers:
+                del headers[name]
+
+        await send({"type": "http.response.start", "status": 200, "headers": headers.raw})
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,12 @@
+from sqlalchemy.orm import lazyload
+
+from app.models import Task, User
+
+# Loader option presets. Relationships on the models are lazy by default, so
+# every query states explicitly which related objects it needs.
+
+# Authentication only needs the user row itself, never its tasks
+AUTH_USER = (lazyload(User.tasks),)
+
+# Task rows without their owner, enough for all task responses
+TASK_ONLY = (lazyload(Task.user),)
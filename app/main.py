@@ -1,179 +1,300 @@
-from fastapi import FastAPI, Depends, HTTPException, Query
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Depends, Header, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
 from fastapi_pagination import add_pagination
 
-from sqlalchemy.orm import selectinload, Session
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
-from typing import Optional
+from typing import List, Optional
 
+from app import crud
+from app.compression import CompressionMiddleware
+from app.config import settings
+from app.database import async_engine, engine, run_db
 from app.dependencies import get_db
-from app.models import Task, User, TaskStatusEnum
-from app.models import User as UserModel
+from app.etags import etag_matches, not_modified, page_etag, task_etag
+from app.instrumentation import InstrumentationMiddleware, span
+from app.models import Task, TaskStatusEnum
+from app.filters import TaskSort, paginate_tasks, task_filters
+from app.pagination import encode_rank_cursor, estimated_total, exact_total, split_page
+from app.metrics import render_prometheus
+from app.pool import async_checkout_wait, checkout_timeouts, pool_stats, sync_checkout_wait
+from app.replicas import get_read_db, primary_reads, replica_reads, replica_set
+from app.responses import JSONResponseClass, ModelJSONResponse
 from app.schemas import TaskResponse, TaskCreate, AllTasksResponse, TaskUpdate
+from app.budgets import QueryBudgetMiddleware
+from app.bulk import router as bulk_router
+from app.counters import router as counters_router
+from app.events import broker
+from app.search import search_rank
+from app.sync import router as sync_router, tombstone_pruner
+from app.transfer import router as transfer_router
+from app.writes import ReadYourWritesMiddleware
+from auth.cache import UserIdentity
 from auth.dependencies import get_current_user
+from auth.hashing import password_hasher
 from auth.routes import router as auth_router
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    broker.start()
+    replica_set.start()
+    tombstone_pruner.start()
+    yield
+    replica_set.stop()
+    # Join the listener and pruning threads, which can take a while, off the event loop
+    await run_in_threadpool(broker.stop)
+    await run_in_threadpool(tombstone_pruner.stop)
+    # Stop the password hashing worker processes
+    password_hasher.shutdown()
+
+
 app = FastAPI(
-    title="To-Do List"
+    title="To-Do List",
+    lifespan=lifespan,
+    default_response_class=JSONResponseClass,
+)
+
+# Compress large JSON, NDJSON and CSV responses for clients that accept it
+if settings.compression_enabled:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.compression_minimum_size,
+        content_types=settings.compression_content_types.split(","),
+        encodings=settings.compression_encodings.split(","),
+    )
+
+# Catch N+1 queries in development and tests, inside the instrumentation that counts the statements
+if settings.query_budget_mode != "off":
+    app.add_middleware(QueryBudgetMiddleware, mode=settings.query_budget_mode)
+
+# Keep each client's reads on the primary for a while after it wrote, across workers
+if settings.read_your_writes_seconds > 0:
+    app.add_middleware(ReadYourWritesMiddleware, window=settings.read_your_writes_seconds)
+
+# Outermost, so the whole request is traced and the Server-Timing header is added last
+app.add_middleware(
+    InstrumentationMiddleware,
+    server_timing=settings.server_timing_enabled,
+    profiling=settings.profiling_enabled,
+    profiling_interval=settings.profiling_interval,
 )
 
 # Include authentication routes from the auth module
 app.include_router(auth_router, prefix="/auth", tags=["auth"])
 
+# Bulk, summary, sync and transfer task routes are registered before /tasks/{task_id} so that their
+# paths are not taken for a task id
+app.include_router(bulk_router, prefix="/tasks", tags=["tasks"])
+app.include_router(counters_router, prefix="/tasks", tags=["tasks"])
+app.include_router(sync_router, prefix="/tasks", tags=["tasks"])
+app.include_router(transfer_router, prefix="/tasks", tags=["tasks"])
+
+
+# Columns of a task in list responses, in the order of the TaskResponse fields
+TASK_PAGE_COLUMNS = (Task.id, Task.title, Task.description, Task.status, Task.user_id)
+TASK_PAGE_FIELDS = tuple(column.key for column in TASK_PAGE_COLUMNS)
+
+
+async def read_task_page(
+        session: Session | AsyncSession,
+        filters: list,
+        total,
+        page: int,
+        size: int,
+        cursor: Optional[str],
+        if_none_match: Optional[str],
+        total_approximate: bool = False,
+        sort: TaskSort = TaskSort.ID,
+        rank=None,
+):
+    """
+    Fetch a page of tasks matching the filters together with their total.
+
+    Tasks are ordered by id in the direction of `sort`, or by descending `rank` and then id
+    when a rank is given.
 
-def get_user_or_404(user_id: int, session: Session):
-    result = session.execute(select(User).where(User.id == user_id))
-    user = result.scalar_one_or_none()
+    Only the response columns are selected, as plain rows: no ORM objects are built and the
+    page is serialized straight to JSON by the response class, without validating it again against
+    `AllTasksResponse`.
 
-    if user is None:
-        raise HTTPException(status_code=404, detail="User not found")
+    When the client sends If-None-Match, only the ids and versions of the page are read
+    first, and 304 is returned if the page hasn't changed.
+    """
+    if if_none_match:
+        query = select(Task.id, Task.version, total.label("total")).where(*filters)
+        query = paginate_tasks(query, page, size, cursor, sort, rank)
+        with span("task_query"):
+            rows = (await run_db(session, crud.fetch_rows, query))[:size]
+        etag = page_etag(rows[0].total, rows) if rows else None
+        if etag and etag_matches(if_none_match, etag):
+            return not_modified(etag)
+
+    # The total is computed by the same statement as the page
+    query = select(*TASK_PAGE_COLUMNS, Task.version, total.label("total")).where(*filters)
+    query = paginate_tasks(query, page, size, cursor, sort, rank)
+
+    with span("task_query"):
+        rows = await run_db(session, crud.fetch_rows, query)
+    if rank is None:
+        rows, next_cursor = split_page(rows, size)
+    else:
+        rows, next_cursor = split_page(rows, size, lambda row: encode_rank_cursor(row.rank, row.id))
 
-    return user
+    # If no tasks are found, raise error
+    if not rows:
+        raise HTTPException(status_code=404, detail="No tasks found")
 
+    with span("response_build"):
+        # Build pagination info
+        pagination_info = {
+            "page": page,
+            "size": size,
+            "total": rows[0].total,
+            "total_approximate": total_approximate,
+        }
 
-def get_task_or_404(task_id: int, session: Session):
-    query = select(Task).where(Task.id == task_id)
-    result = session.execute(query)
-    task = result.scalar_one_or_none()
+        # Rows become TaskResponse dicts, the response class writes the status enum as its value
+        content = {
+            "pagination": pagination_info,
+            "tasks": [dict(zip(TASK_PAGE_FIELDS, row)) for row in rows],
+            "next_cursor": next_cursor,
+        }
 
-    if task is None:
-        raise HTTPException(status_code=404, detail="Task not found")
+        response = JSONResponseClass(content, headers={"ETag": page_etag(rows[0].total, rows)})
 
-    return task
+    return response
 
 
 # Endpoint to get all user's tasks with pagination
 @app.get("/tasks/", response_model=AllTasksResponse, status_code=200)
-def read_users_tasks(
-        session: Session = Depends(get_db),
-        current_user: UserModel = Depends(get_current_user),
+async def read_users_tasks(
+        session: Session | AsyncSession = Depends(get_read_db),
+        current_user: UserIdentity = Depends(get_current_user),
         page: int = Query(1, ge=1),  # Page number, default is 1
         size: int = Query(10, ge=1, le=100),  # Page size, default is 10, max 100
+        status: Optional[List[TaskStatusEnum]] = Query(None),  # Optional status filter, can be repeated
+        min_id: Optional[int] = Query(None),  # Optional lowest task id, inclusive
+        max_id: Optional[int] = Query(None),  # Optional highest task id, inclusive
+        sort: Optional[TaskSort] = Query(None),  # Order of the tasks, id (default) or -id
+        cursor: Optional[str] = Query(None),  # Opaque cursor from a previous page's next_cursor
+        q: Optional[str] = Query(None, min_length=1, max_length=200),  # Optional search in title and description
+        if_none_match: Optional[str] = Header(None),
 ):
     """
     Retrieve a paginated list of user's tasks.
 
     - **page**: Page number to retrieve (default is 1).
     - **size**: Number of tasks per page (default is 10, max 100).
+    - **status**: Optional status filter ('New', 'In progress', 'Completed'). Repeat it to get tasks
+      with any of several statuses.
+    - **min_id**, **max_id**: Optional range of task ids, both inclusive.
+    - **sort**: `id` (ascending, default) or `-id` (descending).
+    - **cursor**: Cursor returned as `next_cursor` by the previous page. When given, `page` is ignored
+      and the page is fetched by seeking past the last returned task.
+    - **q**: Optional search. Returns the tasks whose title or description match the words of `q`
+      (web search syntax: `"exact phrase"`, `or`, `-excluded`) or contain it as is, most relevant first
+      unless `sort` is given.
+
+    The response carries an `ETag`. Sending it back in `If-None-Match` returns 304 while the page is unchanged.
     """
-    offset = (page - 1) * size  # Calculate the offset for pagination
-    query = select(Task).where(Task.user_id == current_user.id).options(selectinload(Task.user)).offset(offset).limit(
-        size)
-
-    result = session.execute(query)
-    tasks = result.scalars().all()
+    filters = task_filters(current_user.id, status, min_id, max_id, q)
 
-    # If not tasks are found, raise error
-    if not tasks:
-        raise HTTPException(status_code=404, detail="No tasks found")
-
-    # Transform tasks to TaskResponse
-    task_responses = []
-    for task in tasks:
-        task_responses.append(
-            {
-                "id": task.id,
-                "title": task.title,
-                "description": task.description,
-                "user_id": task.user_id,
-                "status": task.status,
-            }
-        )
-
-    # Build pagination info
-    pagination_info = {
-        "page": page,
-        "size": size,
-        "total": len(tasks),
-    }
-
-    return {
-        "pagination": pagination_info,
-        "tasks": task_responses,
-    }
+    return await read_task_page(
+        session, filters, exact_total(Task, *filters), page, size, cursor, if_none_match,
+        sort=sort or TaskSort.ID, rank=search_rank(q) if q and sort is None else None,
+    )
 
 
-# Endpoint to get all tasks with pagination and optional status filtering
+# Endpoint to get all tasks with pagination and optional filtering
 @app.get("/tasks/all", response_model=AllTasksResponse, status_code=200)
-def read_all_tasks(
-        session: Session = Depends(get_db),
-        current_user: UserModel = Depends(get_current_user),
+async def read_all_tasks(
+        session: Session | AsyncSession = Depends(get_read_db),
+        current_user: UserIdentity = Depends(get_current_user),
         page: int = Query(1, ge=1),  # Page number, default is 1
         size: int = Query(10, ge=1, le=100),  # Page size, default is 10, max 100
-        status: Optional[TaskStatusEnum] = Query(None)  # Optional status filter
+        status: Optional[List[TaskStatusEnum]] = Query(None),  # Optional status filter, can be repeated
+        user_id: Optional[int] = Query(None),  # Optional owner filter
+        min_id: Optional[int] = Query(None),  # Optional lowest task id, inclusive
+        max_id: Optional[int] = Query(None),  # Optional highest task id, inclusive
+        sort: Optional[TaskSort] = Query(None),  # Order of the tasks, id (default) or -id
+        cursor: Optional[str] = Query(None),  # Opaque cursor from a previous page's next_cursor
+        approximate_total: bool = Query(False),  # Estimate the total instead of counting every task
+        q: Optional[str] = Query(None, min_length=1, max_length=200),  # Optional search in title and description
+        if_none_match: Optional[str] = Header(None),
 ):
     """
-    Retrieve a paginated list of tasks, optionally filtered by status.
+    Retrieve a paginated list of tasks, optionally filtered.
 
     - **page**: Page number to retrieve (default is 1).
     - **size**: Number of tasks per page (default is 10, max 100).
-    - **status**: Optional status filter ('New', 'In progress', 'Completed').
+    - **status**: Optional status filter ('New', 'In progress', 'Completed'). Repeat it to get tasks
+      with any of several statuses.
+    - **user_id**: Optional owner filter, only tasks of this user.
+    - **min_id**, **max_id**: Optional range of task ids, both inclusive.
+    - **sort**: `id` (ascending, default) or `-id` (descending).
+    - **cursor**: Cursor returned as `next_cursor` by the previous page. When given, `page` is ignored
+      and the page is fetched by seeking past the last returned task.
+    - **approximate_total**: Return the planner's row estimate as total instead of an exact count.
+      Only applies without filters, filtered totals are always exact.
+    - **q**: Optional search. Returns the tasks whose title or description match the words of `q`
+      (web search syntax: `"exact phrase"`, `or`, `-excluded`) or contain it as is, most relevant first
+      unless `sort` is given.
+
+    The response carries an `ETag`. Sending it back in `If-None-Match` returns 304 while the page is unchanged.
     """
-    offset = (page - 1) * size  # Calculate the offset for pagination
-
-    # Build the base query
-    query = select(Task).options(selectinload(Task.user)).offset(offset).limit(size)
-
-    # Add status filter if provided
-    if status:
-        query = query.where(Task.status == status)
+    filters = task_filters(user_id, status, min_id, max_id, q)
 
-    result = session.execute(query)
-    tasks = result.scalars().all()
+    # Without filters an exact total would be a full-table COUNT(*), so an estimate can be requested
+    use_estimate = approximate_total and not filters
+    total = estimated_total(Task) if use_estimate else exact_total(Task, *filters)
 
-    # If no tasks are found, raise error
-    if not tasks:
-        raise HTTPException(status_code=404, detail="No tasks found")
-
-    # Transform tasks to TaskResponse
-    task_responses = []
-    for task in tasks:
-        task_responses.append(
-            {
-                "id": task.id,
-                "title": task.title,
-                "description": task.description,
-                "user_id": task.user_id,
-                "status": task.status,
-            }
-        )
-
-    # Build pagination info
-    pagination_info = {
-        "page": page,
-        "size": size,
-        "total": len(tasks),
-    }
-
-    return {
-        "pagination": pagination_info,
-        "tasks": task_responses,
-    }
+    return await read_task_page(
+        session, filters, total, page, size, cursor, if_none_match, total_approximate=use_estimate,
+        sort=sort or TaskSort.ID, rank=search_rank(q) if q and sort is None else None,
+    )
 
 
 # Endpoint to get a specific task by ID
 @app.get("/tasks/{task_id}", response_model=TaskResponse, status_code=200)
-def read_task(
+async def read_task(
         task_id: int,
-        session: Session = Depends(get_db),
-        current_user: UserModel = Depends(get_current_user),
+        session: Session | AsyncSession = Depends(get_read_db),
+        current_user: UserIdentity = Depends(get_current_user),
+        if_none_match: Optional[str] = Header(None),
 ):
     """
     Retrieve information about a specific task by its ID.
 
     - **task_id**: ID of the task to retrieve.
+
+    The response carries an `ETag`. Sending it back in `If-None-Match` returns 304 while the task is unchanged.
     """
-    task = get_task_or_404(task_id, session)
+    if if_none_match:
+        # Only the version is needed to tell whether the client's copy is current
+        with span("task_query"):
+            version = await run_db(session, crud.get_task_version, task_id)
+        etag = task_etag(task_id, version) if version is not None else None
+        if etag and etag_matches(if_none_match, etag):
+            return not_modified(etag)
+
+    with span("task_query"):
+        task = await run_db(session, crud.get_task_or_404, task_id)
 
-    return task
+    return ModelJSONResponse(TaskResponse, task, headers={"ETag": task_etag(task.id, task.version)})
 
 
 # Endpoint to create a new task
 @app.post("/tasks/", response_model=TaskResponse, status_code=201)
-def create_task(
+async def create_task(
         task_create: TaskCreate,
-        session: Session = Depends(get_db),
-        current_user: UserModel = Depends(get_current_user),
+        session: Session | AsyncSession = Depends(get_db),
+        current_user: UserIdentity = Depends(get_current_user),
 ):
     """
     Create a new task.
@@ -196,28 +317,19 @@ def create_task(
     ```
     """
 
-    # Create new task
-    new_task = Task(
-        title=task_create.title,
-        description=task_create.description,
-        user_id=current_user.id,
-        status=task_create.status,
-    )
-
-    session.add(new_task)
-    session.commit()
-    session.refresh(new_task)  # Refresh the task to get the updated values
+    task = await run_db(session, crud.create_task, current_user.id, task_create)
 
-    return new_task
+    return ModelJSONResponse(TaskResponse, task, status_code=201)
 
 
 # Endpoint to update task. Can be updated only by owner
 @app.put("/tasks/{task_id}", response_model=TaskResponse, status_code=200)
-def update_task(
+async def update_task(
         task_id: int,
         task_update: TaskUpdate,
-        session: Session = Depends(get_db),
-        current_user: UserModel = Depends(get_current_user),
+        session: Session | AsyncSession = Depends(get_db),
+        current_user: UserIdentity = Depends(get_current_user),
+        if_match: Optional[str] = Header(None),
 ):
     """
     Update information about a specific task by its ID. Can be updated only by owner.
@@ -226,69 +338,77 @@ def update_task(
     - **title** (string): The title of the task.
     - **description** (string): The description of the task
     - **status** (string): The status of the task. Valid values are "New", "In progress", "Completed".
-    """
-    task = get_task_or_404(task_id, session)
 
-    if task.user_id != current_user.id:
-        raise HTTPException(status_code=403, detail="You do not have permission to update this task.")
-
-    # Update the task with the provided data
-    if task_update.title is not None:
-        task.title = task_update.title
-    task.description = task_update.description
-    task.status = task_update.status
-
-    session.commit()
-    session.refresh(task)  # Refresh the task to get the updated values
+    With an `If-Match` header carrying the task's `ETag`, the update is only applied if the task hasn't
+    changed since, otherwise 412 is returned. Without it, a change made by another request between the
+    read and the write is overwritten, and 409 is returned only if the task keeps changing.
+    """
+    task = await run_db(session, crud.update_task, task_id, current_user.id, task_update, if_match)
 
-    return task
+    return ModelJSONResponse(TaskResponse, task, headers={"ETag": task_etag(task.id, task.version)})
 
 
 # Endpoint to delete task. Can be deleted only by owner
 @app.delete("/tasks/{task_id}", response_model=dict, status_code=200)
-def delete_task(
+async def delete_task(
         task_id: int,
-        session: Session = Depends(get_db),
-        current_user: UserModel = Depends(get_current_user),
+        session: Session | AsyncSession = Depends(get_db),
+        current_user: UserIdentity = Depends(get_current_user),
 ):
     """
     Delete a task by its ID. Can be deleted only by owner.
 
     - **task_id**: ID of the task to delete.
     """
-    task = get_task_or_404(task_id, session)
-
-    if task.user_id != current_user.id:
-        raise HTTPException(status_code=403, detail="You do not have permission to delete this task.")
-
-    session.delete(task)
-    session.commit()
+    await run_db(session, crud.delete_task, task_id, current_user.id)
 
     return {"detail": "Task deleted successfully"}
 
 
 # Endpoint for marking a task as completed
 @app.put("/tasks/{task_id}/complete", response_model=TaskResponse, status_code=200)
-def mark_task_as_completed(
+async def mark_task_as_completed(
         task_id: int,
-        session: Session = Depends(get_db),
-        current_user: UserModel = Depends(get_current_user),
+        session: Session | AsyncSession = Depends(get_db),
+        current_user: UserIdentity = Depends(get_current_user),
 ):
     """
     Mark a task completed by its ID. Can be changed only by owner
 
     - **task_id**: ID of the task to delete.
     """
-    task = get_task_or_404(task_id, session)
+    task = await run_db(session, crud.complete_task, task_id, current_user.id)
 
-    if task.user_id != current_user.id:
-        raise HTTPException(status_code=403, detail="You do not have permission to change status of this task.")
+    return ModelJSONResponse(TaskResponse, task)
 
-    task.status = TaskStatusEnum.COMPLETED
 
-    session.commit()
-    session.refresh(task)
-    return task
+# Endpoint to inspect connection pool usage, used to size the pool from data
+@app.get("/metrics/pool", response_model=dict, status_code=200)
+def read_pool_metrics():
+    """
+    Retrieve the state of the connection pools and how long checkouts have waited for a connection.
+    """
+    return {
+        "sync": pool_stats(engine.pool, sync_checkout_wait),
+        "async": pool_stats(async_engine.sync_engine.pool, async_checkout_wait),
+        "checkout_timeouts": checkout_timeouts.value,
+        "replicas": {
+            "configured": len(replica_set.replicas),
+            "healthy": sum(replica.healthy for replica in replica_set.replicas),
+        },
+        "replica_reads": replica_reads.value,
+        "primary_reads": primary_reads.value,
+    }
+
+
+# Endpoint exposing every metric of the process to Prometheus
+@app.get("/metrics", status_code=200)
+def read_metrics():
+    """
+    Retrieve request stage timings, SQL statement and row counts, pool and cache metrics in the Prometheus
+    text exposition format.
+    """
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
 
 
 add_pagination(app)
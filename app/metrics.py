@@ -0,0 +1,103 @@
+import bisect
+import threading
+
+# Upper bounds (in seconds) of the default latency histogram buckets
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Every metric created in the process, in creation order
+REGISTRY = []
+
+
+class Counter:
+    """
+    Monotonically increasing, thread-safe counter.
+    """
+
+    def __init__(self, name: str, description: str):
+        self.name = name
+        self.description = description
+        self._value = 0
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def inc(self, amount: int = 1):
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> int:
+        return self._value
+
+    def reset(self):
+        with self._lock:
+            self._value = 0
+
+    def snapshot(self) -> dict:
+        return {"value": self._value}
+
+
+class Histogram:
+    """
+    Thread-safe histogram with fixed, cumulative buckets.
+    """
+
+    def __init__(self, name: str, description: str, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self.reset()
+        REGISTRY.append(self)
+
+    def observe(self, value: float):
+        with self._lock:
+            self._counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._count += 1
+            self._sum += value
+            self._max = max(self._max, value)
+
+    def reset(self):
+        with self._lock:
+            self._counts = [0] * (len(self.buckets) + 1)
+            self._count = 0
+            self._sum = 0.0
+            self._max = 0.0
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counts = list(self._counts)
+            count, total, maximum = self._count, self._sum, self._max
+
+        cumulative, buckets = 0, {}
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            buckets[str(bound)] = cumulative
+        buckets["+Inf"] = count
+
+        return {
+            "count": count,
+            "sum": total,
+            "max": maximum,
+            "avg": total / count if count else 0.0,
+            "buckets": buckets,
+        }
+
+
+def render_prometheus(registry=REGISTRY) -> str:
+    """
+    Render metrics in the Prometheus text exposition format.
+    """
+    lines = []
+    for metric in registry:
+        lines.append(f"# HELP {metric.name} {metric.description}")
+        if isinstance(metric, Histogram):
+            snapshot = metric.snapshot()
+            lines.append(f"# TYPE {metric.name} histogram")
+            for bound, count in snapshot["buckets"].items():
+                lines.append(f'{metric.name}_bucket{{le="{bound}"}} {count}')
+            lines.append(f"{metric.name}_sum {snapshot['sum']}")
+            lines.append(f"{metric.name}_count {snapshot['count']}")
+        else:
+            lines.append(f"# TYPE {metric.name} counter")
+            lines.append(f"{metric.name} {metric.value}")
+    return "\n".join(lines) + "\n"
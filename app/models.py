@@ -1,8 +1,21 @@
 import enum
 from sqlalchemy.orm import relationship
-from sqlalchemy import Column, String, Integer, ForeignKey, Text, Enum
+from sqlalchemy import (
+    Column, String, Integer, BigInteger, ForeignKey, Text, Enum, Index, DateTime, Sequence, Computed, DDL, event, func, text
+)
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from .database import Base
 
+# Orders all changes to tasks, including deletions, for delta sync
+task_change_seq = Sequence("task_change_seq", metadata=Base.metadata)
+
+# Id of the transaction writing a row. Sequence numbers are drawn when a row is written, not when its
+# transaction commits, so delta sync only hands out the changes of transactions older than any still running
+CURRENT_XID = "pg_current_xact_id()::text::bigint"
+
+# Text search configuration of the task search vector and of search queries
+TASK_SEARCH_CONFIG = "english"
+
 
 class TaskStatusEnum(enum.Enum):
     NEW = "New"
@@ -13,24 +26,194 @@ class TaskStatusEnum(enum.Enum):
 class User(Base):
     __tablename__ = "users"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     first_name = Column(String, nullable=False)
     last_name = Column(String, nullable=True)
     username = Column(String, unique=True, nullable=False)
     hashed_password = Column(String, nullable=False)
 
-    # Correct relationship to tasks
-    tasks = relationship("Task", back_populates="user", cascade="all, delete", lazy="selectin")
+    # Relationship to tasks. Loaded lazily, queries opt into eager loading via app.loaders
+    tasks = relationship("Task", back_populates="user", cascade="all, delete", lazy="select")
 
 
 class Task(Base):
     __tablename__ = "tasks"
+    __table_args__ = (
+        # Access paths of the list endpoints: a user's tasks and tasks by status, both ordered by id
+        Index("ix_tasks_user_id_id", "user_id", "id"),
+        Index("ix_tasks_status_id", "status", "id"),
+        # Delta sync: a user's changes since a sync token, by transaction then sequence number
+        Index("ix_tasks_user_id_change_xid_change_seq", "user_id", "change_xid", "change_seq"),
+        # Full-text search over title and description
+        Index("ix_tasks_search_vector", "search_vector", postgresql_using="gin"),
+    )
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     title = Column(String, nullable=False)
     description = Column(Text, nullable=True)
     status = Column(Enum(TaskStatusEnum, name="status_task"), nullable=False, default=TaskStatusEnum.NEW)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    # Incremented on every change, used for ETags and optimistic concurrency
+    version = Column(Integer, nullable=False, server_default="1")
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), onupdate=func.now())
+    # Position of the latest change of the task in task_change_seq
+    change_seq = Column(
+        BigInteger, nullable=False, server_default=text("nextval('task_change_seq')"), onupdate=task_change_seq.next_value()
+    )
+    # Transaction of the latest change of the task
+    change_xid = Column(BigInteger, nullable=False, server_default=text(CURRENT_XID), onupdate=text(CURRENT_XID))
+    # Words of the title (weight A) and description (weight B), kept up to date by the database
+    search_vector = Column(TSVECTOR, Computed(
+        f"setweight(to_tsvector('{TASK_SEARCH_CONFIG}', coalesce(title, '')), 'A') || "
+        f"setweight(to_tsvector('{TASK_SEARCH_CONFIG}', coalesce(description, '')), 'B')",
+        persisted=True,
+    ))
+
+    # Relationship to user (owner of a task). Loaded lazily, see app.loaders
+    user = relationship("User", back_populates="tasks", lazy="select")
+
+    __mapper_args__ = {
+        # The ORM bumps the version on every flush and refuses to overwrite a row changed in the meantime
+        "version_id_col": version,
+        # Only used in search queries, never loaded into Task objects (see app.search)
+        "exclude_properties": ["search_vector"],
+    }
+
+
+# Trigram indexes for substring matches in search. They need the pg_trgm extension, which not every
+# PostgreSQL installation ships, so they are created only where it is available
+TASK_TRIGRAM_INDEXES = ("ix_tasks_title_trgm", "ix_tasks_description_trgm")
+
+event.listen(Task.__table__, "after_create", DDL("""
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm') THEN
+        CREATE EXTENSION IF NOT EXISTS pg_trgm;
+        CREATE INDEX ix_tasks_title_trgm ON tasks USING gin (title gin_trgm_ops);
+        CREATE INDEX ix_tasks_description_trgm ON tasks USING gin (description gin_trgm_ops);
+    END IF;
+END $$
+"""))
+
+
+# Keeps task_counters in step with tasks. Statement-level, so a bulk write or a COPY adds one delta
+# per user and status, in the transaction of the write. Deltas are only ever inserted, never updated,
+# so concurrent writers of the same user and status don't wait for each other. Deletes skip users that
+# are being deleted, whose counters go with them. Once a user and status has TASK_COUNTER_FOLD_ROWS
+# deltas, the write folds them into one, skipping the deltas another write is folding, so a summary
+# never sums more than about that many rows per status
+TASK_COUNTER_FOLD_ROWS = 32
+
+TASK_COUNTERS_FUNCTION = f"""
+CREATE OR REPLACE FUNCTION fold_task_counters(fold_user_id integer, fold_status status_task) RETURNS void
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF (SELECT count(*) FROM (
+        SELECT 1 FROM task_counters WHERE user_id = fold_user_id AND status = fold_status LIMIT {TASK_COUNTER_FOLD_ROWS}
+    ) deltas) < {TASK_COUNTER_FOLD_ROWS} THEN
+        RETURN;
+    END IF;
+    WITH folded AS (
+        DELETE FROM task_counters WHERE id IN (
+            SELECT id FROM task_counters WHERE user_id = fold_user_id AND status = fold_status
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING count
+    )
+    INSERT INTO task_counters (user_id, status, count)
+    SELECT fold_user_id, fold_status, sum(count) FROM folded HAVING sum(count) <> 0;
+END $$;
 
-    # Correct relationship to user (owner of a task)
-    user = relationship("User", back_populates="tasks", lazy="selectin")
+CREATE OR REPLACE FUNCTION count_task_changes() RETURNS trigger LANGUAGE plpgsql AS $$
+DECLARE
+    appended record;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        FOR appended IN
+            WITH deltas AS (
+                INSERT INTO task_counters (user_id, status, count)
+                SELECT user_id, status, -count(*) FROM old_tasks
+                WHERE EXISTS (SELECT 1 FROM users WHERE users.id = old_tasks.user_id)
+                GROUP BY user_id, status
+                RETURNING user_id, status
+            )
+            SELECT user_id, status FROM deltas
+        LOOP
+            PERFORM fold_task_counters(appended.user_id, appended.status);
+        END LOOP;
+    ELSIF TG_OP = 'INSERT' THEN
+        FOR appended IN
+            WITH deltas AS (
+                INSERT INTO task_counters (user_id, status, count)
+                SELECT user_id, status, count(*) FROM new_tasks GROUP BY user_id, status
+                RETURNING user_id, status
+            )
+            SELECT user_id, status FROM deltas
+        LOOP
+            PERFORM fold_task_counters(appended.user_id, appended.status);
+        END LOOP;
+    ELSE
+        FOR appended IN
+            WITH deltas AS (
+                INSERT INTO task_counters (user_id, status, count)
+                SELECT user_id, status, sum(delta) FROM (
+                    SELECT user_id, status, 1 AS delta FROM new_tasks
+                    UNION ALL
+                    SELECT user_id, status, -1 AS delta FROM old_tasks
+                ) changes
+                GROUP BY user_id, status HAVING sum(delta) <> 0
+                RETURNING user_id, status
+            )
+            SELECT user_id, status FROM deltas
+        LOOP
+            PERFORM fold_task_counters(appended.user_id, appended.status);
+        END LOOP;
+    END IF;
+    RETURN NULL;
+END $$
+"""
+
+# Transition tables can only be declared by triggers on a single event
+TASK_COUNTERS_TRIGGERS = """
+CREATE TRIGGER tasks_count_inserts AFTER INSERT ON tasks
+    REFERENCING NEW TABLE AS new_tasks FOR EACH STATEMENT EXECUTE FUNCTION count_task_changes();
+CREATE TRIGGER tasks_count_updates AFTER UPDATE ON tasks
+    REFERENCING OLD TABLE AS old_tasks NEW TABLE AS new_tasks FOR EACH STATEMENT EXECUTE FUNCTION count_task_changes();
+CREATE TRIGGER tasks_count_deletes AFTER DELETE ON tasks
+    REFERENCING OLD TABLE AS old_tasks FOR EACH STATEMENT EXECUTE FUNCTION count_task_changes();
+"""
+
+event.listen(Task.__table__, "after_create", DDL(TASK_COUNTERS_FUNCTION))
+event.listen(Task.__table__, "after_create", DDL(TASK_COUNTERS_TRIGGERS))
+# The folding function takes the status type, which can't be dropped while it exists
+event.listen(Task.__table__, "before_drop", DDL("DROP FUNCTION IF EXISTS fold_task_counters(integer, status_task)"))
+
+
+# Change in the number of tasks of a user in a status, appended by the triggers above. A user's counts
+# are the sums of their deltas, which the triggers fold as they pile up
+class TaskCounter(Base):
+    __tablename__ = "task_counters"
+    __table_args__ = (
+        Index("ix_task_counters_user_id_status", "user_id", "status"),
+    )
+
+    id = Column(BigInteger, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    status = Column(Enum(TaskStatusEnum, name="status_task"), nullable=False)
+    count = Column(BigInteger, nullable=False, server_default="0")
+
+
+# Record of a deleted task, so that clients syncing changes learn about the deletion
+class TaskTombstone(Base):
+    __tablename__ = "task_tombstones"
+    __table_args__ = (
+        Index("ix_task_tombstones_user_id_change_xid_change_seq", "user_id", "change_xid", "change_seq"),
+        # Pruning finds the expired tombstones without reading the others
+        Index("ix_task_tombstones_deleted_at", "deleted_at"),
+    )
+
+    task_id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    change_seq = Column(BigInteger, nullable=False, server_default=text("nextval('task_change_seq')"))
+    change_xid = Column(BigInteger, nullable=False, server_default=text(CURRENT_XID))
+    deleted_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
@@ -0,0 +1,136 @@
+import base64
+import json
+
+from fastapi import HTTPException
+from sqlalchemy import BigInteger, and_, cast, column, func, literal_column, or_, select, table
+
+# Minimal description of the catalog table holding the planner's row estimates
+pg_class = table("pg_class", column("oid"), column("reltuples"))
+
+
+# Encode a small JSON payload into an opaque, URL safe token
+def encode_token(payload: dict) -> str:
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+# Decode the payload of a token made by encode_token, 400 if the token is malformed
+def decode_payload(token: str, error: str) -> dict:
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail=error)
+
+    if not isinstance(payload, dict):
+        raise HTTPException(status_code=400, detail=error)
+
+    return payload
+
+
+# Decode an integer field of a token made by encode_token, 400 if the token is malformed
+def decode_token(token: str, key: str, error: str) -> int:
+    value = decode_payload(token, error).get(key)
+
+    if not isinstance(value, int) or isinstance(value, bool):
+        raise HTTPException(status_code=400, detail=error)
+
+    return value
+
+
+# Encode the last seen task id into an opaque cursor token
+def encode_cursor(last_id: int) -> str:
+    return encode_token({"id": last_id})
+
+
+# Decode a cursor token back into the last seen task id
+def decode_cursor(cursor: str) -> int:
+    return decode_token(cursor, "id", "Invalid cursor")
+
+
+# Encode the rank and id of the last seen task of a ranked search into a cursor token
+def encode_rank_cursor(rank: float, last_id: int) -> str:
+    return encode_token({"rank": rank, "id": last_id})
+
+
+# Decode a ranked search cursor back into the rank and id of the last seen task
+def decode_rank_cursor(cursor: str) -> tuple[float, int]:
+    payload = decode_payload(cursor, "Invalid cursor")
+    rank, last_id = payload.get("rank"), payload.get("id")
+
+    if not isinstance(rank, (int, float)) or isinstance(rank, bool) or not isinstance(last_id, int):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    return rank, last_id
+
+
+def paginate_by_id(query, id_column, page: int, size: int, cursor: str | None, descending: bool = False):
+    """
+    Apply pagination to a query ordered by the given id column, ascending or descending.
+
+    With a cursor the query seeks past the last seen id (keyset pagination), so
+    the cost of a page does not depend on how deep it is. Without a cursor the
+    classic page/size offset is used. One extra row is fetched to know whether
+    a next page exists.
+    """
+    query = query.order_by(id_column.desc() if descending else id_column)
+
+    if cursor is not None:
+        last_id = decode_cursor(cursor)
+        query = query.where(id_column < last_id if descending else id_column > last_id)
+    else:
+        query = query.offset((page - 1) * size)
+
+    return query.limit(size + 1)
+
+
+def paginate_by_rank(query, rank, id_column, page: int, size: int, cursor: str | None):
+    """
+    Apply pagination to a query ordered by descending rank, ties broken by the id column.
+
+    Works like `paginate_by_id`, the cursor seeks past the (rank, id) of the last seen row,
+    so pages stay stable however many rows share a rank.
+    """
+    query = query.order_by(rank.desc(), id_column)
+
+    if cursor is not None:
+        last_rank, last_id = decode_rank_cursor(cursor)
+        query = query.where(or_(rank < last_rank, and_(rank == last_rank, id_column > last_id)))
+    else:
+        query = query.offset((page - 1) * size)
+
+    return query.limit(size + 1)
+
+
+# Split the fetched rows into the page and the cursor of the next page, made from the last row of the page
+def split_page(rows, size: int, cursor_of=lambda row: encode_cursor(row.id)):
+    if len(rows) > size:
+        rows = rows[:size]
+        return rows, cursor_of(rows[-1])
+    return rows, None
+
+
+def exact_total(model, *filters):
+    """
+    Scalar subquery counting the rows of `model` that match the filters.
+
+    It ignores the page and cursor of the outer query, and PostgreSQL evaluates
+    it once per statement, so the total comes back in the same round-trip as
+    the page itself.
+    """
+    return select(func.count()).select_from(model).where(*filters).scalar_subquery()
+
+
+def estimated_total(model):
+    """
+    Scalar expression with the planner's estimate of the number of rows in the table of `model`.
+
+    Reading the estimate avoids a full-table `COUNT(*)`. Tables that have never been
+    analyzed have no estimate (-1), in which case the exact count is used instead.
+    """
+    estimate = (
+        select(cast(pg_class.c.reltuples, BigInteger))
+        .where(pg_class.c.oid == literal_column(f"'{model.__tablename__}'::regclass"))
+        .scalar_subquery()
+    )
+    return func.coalesce(func.nullif(estimate, -1), exact_total(model))
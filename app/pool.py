@@ -0,0 +1,78 @@
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+
+from app.config import settings
+from app.metrics import Counter, Histogram
+
+sync_checkout_wait = Histogram(
+    "db_pool_checkout_wait_seconds_sync", "Time spent waiting for a connection from the psycopg2 engine pool"
+)
+async_checkout_wait = Histogram(
+    "db_pool_checkout_wait_seconds_async", "Time spent waiting for a connection from the asyncpg engine pool"
+)
+checkout_timeouts = Counter(
+    "db_pool_checkout_timeouts_total", "Connection checkouts that gave up after the pool timeout"
+)
+
+
+class TimedCheckoutMixin:
+    """
+    Records how long every connection checkout waits, including connecting and pre-ping.
+    """
+
+    checkout_wait: Histogram
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            checkout_timeouts.inc()
+            raise
+        finally:
+            self.checkout_wait.observe(time.perf_counter() - start)
+
+
+class TimedQueuePool(TimedCheckoutMixin, QueuePool):
+    checkout_wait = sync_checkout_wait
+
+
+class TimedAsyncAdaptedQueuePool(TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    checkout_wait = async_checkout_wait
+
+
+def engine_options(poolclass) -> dict:
+    """
+    Build the pool arguments for `create_engine` from the settings.
+
+    With `db_external_pooler` connections are not kept open by the application
+    (NullPool), leaving pooling to an external pooler such as PgBouncer.
+    """
+    if settings.db_external_pooler:
+        return {"poolclass": NullPool, "pool_pre_ping": settings.db_pool_pre_ping}
+
+    return {
+        "poolclass": poolclass,
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+
+
+# Describe the current state of an engine's pool together with its checkout wait times
+def pool_stats(pool, checkout_wait: Histogram) -> dict:
+    stats = {"pool": type(pool).__name__, "checkout_wait_seconds": checkout_wait.snapshot()}
+
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow(),
+        )
+
+    return stats
@@ -0,0 +1,194 @@
+import itertools
+import logging
+import threading
+
+from fastapi import Depends, Request
+from sqlalchemy import create_engine, exc, make_url, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.config import settings
+from app.database import AsyncSessionManager, SessionManager
+from app.dependencies import get_db
+from app.metrics import Counter
+from app.pool import engine_options
+from app.writes import wrote_recently
+from auth.cache import UserIdentity
+from auth.dependencies import get_current_user
+
+logger = logging.getLogger(__name__)
+
+replica_reads = Counter("db_replica_reads_total", "Read requests served by a replica")
+primary_reads = Counter("db_primary_reads_total", "Read requests served by the primary, replicas being unavailable or skipped")
+replica_failures = Counter("db_replica_failures_total", "Replica connections or health checks that failed")
+
+# Errors telling that a replica can't be reached. asyncpg raises OSError (or a timeout) as is
+CONNECTION_ERRORS = (exc.DBAPIError, OSError)
+
+
+class Replica:
+    """
+    One read replica, with a psycopg2 and an asyncpg engine like the primary has.
+
+    Connections are always pre-pinged, so a replica that went away is noticed when a
+    connection is checked out rather than halfway through a query.
+    """
+
+    def __init__(self, url: str, connect_timeout: int):
+        url = make_url(url)
+        self.name = url.render_as_string(hide_password=True)
+        self.healthy = True
+
+        self.engine = create_engine(
+            url.set(drivername="postgresql+psycopg2"),
+            connect_args={"connect_timeout": connect_timeout},
+            **{**engine_options(QueuePool), "pool_pre_ping": True},
+        )
+        self.async_engine = create_async_engine(
+            url.set(drivername="postgresql+asyncpg"),
+            connect_args={"timeout": connect_timeout},
+            **{**engine_options(AsyncAdaptedQueuePool), "pool_pre_ping": True},
+        )
+        self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        self.AsyncSessionLocal = async_sessionmaker(autoflush=False, expire_on_commit=False, bind=self.async_engine)
+
+    def mark_unhealthy(self, error: Exception):
+        if self.healthy:
+            logger.warning("Replica %s is unavailable, reading from the others: %s", self.name, error)
+        self.healthy = False
+        replica_failures.inc()
+
+    # Connect and run a trivial query, taking the replica back into use when it answers
+    def check(self):
+        try:
+            with self.engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+        except CONNECTION_ERRORS as error:
+            self.mark_unhealthy(error)
+            return
+
+        if not self.healthy:
+            logger.info("Replica %s is available again", self.name)
+        self.healthy = True
+
+    def dispose(self):
+        self.engine.dispose()
+
+
+class ReplicaSet:
+    """
+    The replicas serving reads, taken in turn among the healthy ones.
+
+    A background thread checks every replica each `check_interval` seconds. A replica also
+    becomes unhealthy as soon as a request fails to connect to it, and only a later health
+    check brings it back.
+    """
+
+    def __init__(self, replicas: list[Replica], check_interval: float):
+        self.replicas = replicas
+        self.check_interval = check_interval
+        self._turn = itertools.count()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    # The next healthy replica, None when there is none
+    def choose(self) -> Replica | None:
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return None
+        return healthy[next(self._turn) % len(healthy)]
+
+    def check(self):
+        for replica in self.replicas:
+            replica.check()
+
+    def start(self):
+        if not self.replicas:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="replica-health-checks", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self.check()
+            self._stopped.wait(self.check_interval)
+
+
+def create_replica_set() -> ReplicaSet:
+    urls = [url.strip() for url in settings.db_replica_urls.split(",") if url.strip()]
+    replicas = [Replica(url, settings.db_replica_connect_timeout) for url in urls]
+    return ReplicaSet(replicas, settings.db_replica_check_interval)
+
+
+replica_set = create_replica_set()
+
+
+# The replica to read from for the request, None to read from the primary
+def choose_replica(request: Request) -> Replica | None:
+    # The client's own recent writes may not have reached the replicas yet
+    if wrote_recently(request):
+        return None
+    return replica_set.choose()
+
+
+def get_sync_read_db(request: Request, current_user: UserIdentity = Depends(get_current_user), primary=Depends(get_db)):
+    """
+    Dependency that provides a session for read-only endpoints.
+
+    The session is bound to a healthy replica, unless the client wrote within the last
+    `read_your_writes_seconds` (as told by the `last_write` cookie or header it sends back)
+    or no replica can be reached, in which case the request's `get_db` session is used, so
+    a request never holds two primary connections at once. The user is authenticated and
+    the replica connection made upfront, so a replica that is down is skipped before the
+    endpoint runs.
+    """
+    replica = choose_replica(request)
+    if replica is not None:
+        db = replica.SessionLocal()
+        try:
+            db.connection()
+        except CONNECTION_ERRORS as error:
+            db.close()
+            replica.mark_unhealthy(error)
+        else:
+            replica_reads.inc()
+            with SessionManager(db) as session:
+                yield session
+            return
+
+    primary_reads.inc()
+    yield primary
+
+
+async def get_async_read_db(request: Request, current_user: UserIdentity = Depends(get_current_user), primary=Depends(get_db)):
+    """
+    Async counterpart of `get_sync_read_db`, yielding an `AsyncSession`.
+    """
+    replica = choose_replica(request)
+    if replica is not None:
+        db = replica.AsyncSessionLocal()
+        try:
+            await db.connection()
+        except CONNECTION_ERRORS as error:
+            await db.close()
+            replica.mark_unhealthy(error)
+        else:
+            replica_reads.inc()
+            async with AsyncSessionManager(db) as session:
+                yield session
+            return
+
+    primary_reads.inc()
+    yield primary
+
+
+# The session dependency of read-only endpoints, picked by the `db_async` setting
+get_read_db = get_async_read_db if settings.db_async else get_sync_read_db
@@ -0,0 +1,69 @@
+import enum
+import json
+from functools import cache
+from typing import Any, Mapping, Optional
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import BaseModel, TypeAdapter
+from starlette.background import BackgroundTask
+
+from app.config import settings
+from app.instrumentation import span
+
+
+def encode_enum(value):
+    if isinstance(value, enum.Enum):
+        return value.value
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class StdlibJSONResponse(JSONResponse):
+    """
+    JSONResponse rendered by the standard library, writing enums by their value like orjson does.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return json.dumps(
+            content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":"), default=encode_enum
+        ).encode("utf-8")
+
+
+def create_response_class() -> type[JSONResponse]:
+    if settings.json_renderer == "json":
+        return StdlibJSONResponse
+    return ORJSONResponse
+
+
+# Response class of all JSON endpoints, see JSON_RENDERER
+JSONResponseClass = create_response_class()
+
+
+# Built once per model, the adapter holds the model's compiled validator and serializer
+@cache
+def model_adapter(model: type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(model)
+
+
+class ModelJSONResponse(JSONResponse):
+    """
+    JSON response validated against `model` and serialized straight to JSON bytes by Pydantic.
+
+    Endpoints return it instead of their content so that FastAPI doesn't serialize the content to
+    Python objects the renderer walks again. The route's `response_model` still documents the
+    response, give the route's status code when it isn't 200. The content may be ORM objects.
+    """
+
+    def __init__(
+            self,
+            model: type[BaseModel],
+            content: Any,
+            status_code: int = 200,
+            headers: Optional[Mapping[str, str]] = None,
+            background: Optional[BackgroundTask] = None,
+    ):
+        self.adapter = model_adapter(model)
+        super().__init__(content, status_code=status_code, headers=headers, background=background)
+
+    def render(self, content: Any) -> bytes:
+        with span("response_model"):
+            return self.adapter.dump_json(self.adapter.validate_python(content, from_attributes=True), by_alias=True)
@@ -1,5 +1,6 @@
-from typing import Optional, List
-from pydantic import BaseModel, constr
+from typing import Any, Dict, Optional, List
+from pydantic import BaseModel, conlist, constr, model_validator
+from app.config import settings
 from app.models import TaskStatusEnum
 
 
@@ -55,9 +56,84 @@ class TaskResponse(BaseModel):
 class PaginationInfo(BaseModel):
     page: int
     size: int
-    total: int
+    total: int  # Number of tasks matching the query across all pages
+    total_approximate: bool = False  # True when total is the planner's estimate instead of an exact count
 
 
 class AllTasksResponse(BaseModel):
     pagination: PaginationInfo
     tasks: List[TaskResponse]
+    next_cursor: Optional[str] = None  # Pass as `cursor` to fetch the next page, None on the last page
+
+
+class BulkItemError(BaseModel):
+    index: int  # Position of the rejected item in the request
+    errors: List[Dict[str, Any]]
+
+
+class BulkCreateResponse(BaseModel):
+    created: List[TaskResponse]
+    errors: List[BulkItemError]
+
+
+# Selects the caller's tasks a bulk operation applies to, by ids and/or by status
+class TaskSelection(BaseModel):
+    ids: Optional[conlist(int, min_length=1, max_length=settings.bulk_max_items)] = None
+    status: Optional[TaskStatusEnum] = None
+
+    @model_validator(mode="after")
+    def check_not_empty(self):
+        if self.ids is None and self.status is None:
+            raise ValueError("Either ids or status must be given")
+        return self
+
+
+# Fields to change on every selected task, fields that are not sent are left unchanged
+class TaskChanges(BaseModel):
+    title: Optional[constr(min_length=1)] = None
+    description: Optional[str] = None
+    status: Optional[TaskStatusEnum] = None
+
+
+class TaskBulkUpdate(TaskSelection):
+    changes: TaskChanges
+
+
+class BulkItemResult(BaseModel):
+    id: int
+    result: str  # What happened to the task: updated, completed, deleted, not_found, forbidden or skipped
+
+
+class BulkResultResponse(BaseModel):
+    results: List[BulkItemResult]
+
+
+class TaskChangesResponse(BaseModel):
+    changed: List[TaskResponse]  # Tasks created or updated since the sync token
+    deleted: List[int]  # IDs of tasks deleted since the sync token
+    sync_token: str  # Pass as `since` to get the changes after this response
+    has_more: bool  # More changes are available right away
+
+
+class ImportRowError(BaseModel):
+    row: int  # Position of the rejected row in the body, starting at 1 (a CSV header is not counted)
+    errors: List[Dict[str, Any]]
+
+
+class ImportProgress(BaseModel):
+    import_id: str
+    status: str  # running, completed or failed
+    rows_read: int
+    rows_committed: int  # Rows of the body whose tasks are committed, a failed import resumes after them
+    imported: int
+    failed: int
+
+
+class ImportResponse(ImportProgress):
+    errors: List[ImportRowError]  # Errors of the first IMPORT_MAX_ERRORS rejected rows
+
+
+class TaskSummary(BaseModel):
+    user_id: int
+    counts: Dict[TaskStatusEnum, int]  # Number of tasks in each status, every status included
+    total: int
@@ -0,0 +1,41 @@
+from sqlalchemy import Double, cast, func, literal_column, or_
+
+from app.models import TASK_SEARCH_CONFIG, Task
+
+# The search vector is a generated column that isn't mapped on Task, see app.models
+search_vector = Task.__table__.c.search_vector
+
+# Escape character of LIKE patterns, a slash needs no escaping itself in SQL string literals
+LIKE_ESCAPE = "/"
+
+
+def search_query(q: str):
+    # websearch_to_tsquery accepts any user input: quoted phrases, "or", "-word", stray punctuation
+    return func.websearch_to_tsquery(literal_column(f"'{TASK_SEARCH_CONFIG}'::regconfig"), q)
+
+
+# Escape the wildcards of LIKE, so that they match literally
+def escape_like(q: str) -> str:
+    return q.replace(LIKE_ESCAPE, LIKE_ESCAPE * 2).replace("%", LIKE_ESCAPE + "%").replace("_", LIKE_ESCAPE + "_")
+
+
+def search_filter(q: str):
+    """
+    Condition matching the tasks found by a search.
+
+    A task matches when its words match the query (GIN index on the search vector), or
+    when the query appears as is in its title or description (trigram indexes), which
+    also finds prefixes and parts of words.
+    """
+    pattern = f"%{escape_like(q)}%"
+    return or_(
+        search_vector.op("@@")(search_query(q)),
+        Task.title.ilike(pattern, escape=LIKE_ESCAPE),
+        Task.description.ilike(pattern, escape=LIKE_ESCAPE),
+    )
+
+
+# Relevance of a task for a search, title words weigh more than description words. Double precision,
+# so that the rank in a cursor round-trips exactly through JSON
+def search_rank(q: str):
+    return cast(func.ts_rank_cd(search_vector, search_query(q)), Double)
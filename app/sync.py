@@ -0,0 +1,174 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, sessionmaker
+
+from app import crud
+from app.config import settings
+from app.database import SessionLocal, run_db
+from app.dependencies import get_db
+from app.events import Subscription, broker
+from app.pagination import decode_payload, decode_token, encode_token
+from app.responses import ModelJSONResponse
+from app.schemas import TaskChangesResponse
+from auth.cache import UserIdentity
+from auth.dependencies import get_current_user
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# Seconds tombstones are kept, and sync tokens accepted, for
+SYNC_RETENTION_SECONDS = settings.sync_retention_days * 86400
+
+
+def check_sync_token_age(since: str):
+    """
+    Answer 410 when the sync token was issued before the retention cutoff.
+
+    Tombstones older than the cutoff are pruned, so the client may have missed deletions and
+    has to start over with a full sync. Tokens issued before they carried their time count as old.
+    """
+    issued_at = decode_payload(since, "Invalid sync token").get("ts")
+    if not isinstance(issued_at, int) or issued_at < time.time() - SYNC_RETENTION_SECONDS:
+        raise HTTPException(status_code=410, detail="Sync token expired, resync required")
+
+
+# Endpoint to get the changes to the user's tasks since a sync token
+@router.get("/changes", response_model=TaskChangesResponse, status_code=200)
+async def read_task_changes(
+        session: Session | AsyncSession = Depends(get_db),
+        current_user: UserIdentity = Depends(get_current_user),
+        since: Optional[str] = Query(None),  # Sync token from a previous response, none for a full sync
+        limit: int = Query(100, ge=1, le=1000),  # Maximum number of changes to return
+):
+    """
+    Retrieve the user's tasks created, updated or deleted since a sync token.
+
+    - **since**: `sync_token` of the previous response. Without it all tasks are returned, starting a full sync.
+    - **limit**: Maximum number of changes per response (default is 100, max 1000).
+
+    Deleted tasks are reported by id in `deleted`. While `has_more` is true, call again with the new
+    `sync_token` right away. Changes of transactions that are still running are held back until
+    every older transaction has ended, so they are never skipped.
+
+    Deletions are only kept for `SYNC_RETENTION_DAYS`: an older `since` is answered 410, drop the
+    local tasks and start a full sync.
+    """
+    # Position of the last change synced: its transaction id and sequence number
+    position = (0, 0)
+    if since is not None:
+        check_sync_token_age(since)
+        position = (decode_token(since, "xid", "Invalid sync token"), decode_token(since, "seq", "Invalid sync token"))
+
+    changed, deleted, (last_xid, last_seq), has_more = await run_db(
+        session, crud.fetch_changes, current_user.id, position, limit
+    )
+
+    return ModelJSONResponse(TaskChangesResponse, {
+        "changed": changed,
+        "deleted": deleted,
+        "sync_token": encode_token({"xid": last_xid, "seq": last_seq, "ts": int(time.time())}),
+        "has_more": has_more,
+    })
+
+
+class TombstonePruner:
+    """
+    Deletes the tombstones older than `retention` seconds, every `interval` seconds on a background thread.
+
+    Every worker runs one; deleting the same old rows twice does no harm.
+    """
+
+    def __init__(self, session_factory: sessionmaker, retention: float, interval: float):
+        self.session_factory = session_factory
+        self.retention = retention
+        self.interval = interval
+        self._stopped = threading.Event()
+        self._thread = None
+
+    # Delete the expired tombstones, returns the number deleted
+    def prune(self) -> int:
+        with self.session_factory() as session:
+            return crud.prune_tombstones(session, datetime.now(timezone.utc) - timedelta(seconds=self.retention))
+
+    def start(self):
+        if self.interval <= 0:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="tombstone-pruning", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                pruned = self.prune()
+                if pruned:
+                    logger.info("Pruned %d tombstones", pruned)
+            except Exception:
+                logger.exception("Pruning tombstones failed")
+            self._stopped.wait(self.interval)
+
+
+tombstone_pruner = TombstonePruner(SessionLocal, SYNC_RETENTION_SECONDS, settings.tombstone_prune_interval)
+
+
+async def event_stream(subscription: Subscription):
+    """
+    Format the events of a subscription as Server-Sent Events, with keep-alive comments while idle.
+
+    If the client falls too far behind, its buffered events are dropped and a single `resync`
+    event tells it to catch up through `GET /tasks/changes`.
+    """
+    try:
+        while True:
+            if subscription.overflowed:
+                subscription.overflowed = False
+                while not subscription.queue.empty():
+                    subscription.queue.get_nowait()
+                yield "event: resync\ndata: {}\n\n"
+                continue
+
+            try:
+                task_event = await asyncio.wait_for(subscription.get(), timeout=settings.events_keepalive_seconds)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+
+            yield f"event: {task_event['type']}\ndata: {json.dumps(task_event)}\n\n"
+    finally:
+        broker.unsubscribe(subscription)
+
+
+# Endpoint streaming changes of the user's tasks as they happen
+@router.get("/events", status_code=200)
+async def stream_task_events(
+        current_user: UserIdentity = Depends(get_current_user),
+):
+    """
+    Stream the user's task changes as Server-Sent Events.
+
+    Each event is named after the change (`created`, `updated`, `deleted`) and its data lists the
+    affected `task_ids`. A `resync` event means events were missed, call `GET /tasks/changes` to catch up.
+    """
+    subscription = broker.subscribe(current_user.id)
+
+    return StreamingResponse(
+        event_stream(subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,345 @@
+import codecs
+import csv
+import enum
+import io
+import json
+import re
+import threading
+import uuid
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.future import select
+from sqlalchemy.orm import Session
+
+from app import crud
+from app.config import settings
+from app.database import run_db
+from app.dependencies import get_db, get_sessionmaker
+from app.models import Task, TaskStatusEnum
+from app.responses import ModelJSONResponse
+from app.schemas import ImportProgress, ImportResponse, TaskCreate
+from auth.cache import UserIdentity
+from auth.dependencies import get_current_user
+
+router = APIRouter()
+
+# Columns of exported tasks, in CSV column order
+EXPORT_COLUMNS = ("id", "title", "description", "status", "user_id")
+
+
+class TransferFormat(str, enum.Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
+MEDIA_TYPES = {
+    TransferFormat.NDJSON: "application/x-ndjson",
+    TransferFormat.CSV: "text/csv",
+}
+
+
+def export_query(user_id: int, status: Optional[TaskStatusEnum]):
+    query = select(*(getattr(Task, column) for column in EXPORT_COLUMNS)).where(Task.user_id == user_id)
+    if status is not None:
+        query = query.where(Task.status == status)
+    # yield_per fetches the rows through a server-side cursor, one batch at a time
+    return query.order_by(Task.id).execution_options(yield_per=settings.export_batch_size)
+
+
+# Render a batch of rows into one chunk of the response body
+def format_rows(rows, export_format: TransferFormat) -> str:
+    if export_format is TransferFormat.NDJSON:
+        return "".join(
+            json.dumps({"id": id, "title": title, "description": description, "status": status.value,
+                        "user_id": user_id}) + "\n"
+            for id, title, description, status, user_id in rows
+        )
+
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(
+        (id, title, description, status.value, user_id) for id, title, description, status, user_id in rows
+    )
+    return buffer.getvalue()
+
+
+def csv_header() -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(EXPORT_COLUMNS)
+    return buffer.getvalue()
+
+
+def export_stream(session_factory, query, export_format: TransferFormat):
+    # Runs on the threadpool, one batch per iteration
+    with session_factory() as session:
+        if export_format is TransferFormat.CSV:
+            yield csv_header()
+        for rows in session.execute(query).partitions():
+            yield format_rows(rows, export_format)
+
+
+async def async_export_stream(session_factory, query, export_format: TransferFormat):
+    async with session_factory() as session:
+        if export_format is TransferFormat.CSV:
+            yield csv_header()
+        result = await session.stream(query)
+        async for rows in result.partitions():
+            yield format_rows(rows, export_format)
+
+
+# Endpoint to download all of the user's tasks
+@router.get("/export", status_code=200)
+async def export_tasks(
+        format: TransferFormat = Query(TransferFormat.NDJSON),  # Format of the export, ndjson or csv
+        status: Optional[TaskStatusEnum] = Query(None),  # Optional status filter
+        session_factory=Depends(get_sessionmaker),
+        current_user: UserIdentity = Depends(get_current_user),
+):
+    """
+    Export all of the user's tasks as NDJSON (one task per line) or CSV.
+
+    - **format**: `ndjson` (default) or `csv`.
+    - **status**: Optional status filter ('New', 'In progress', 'Completed').
+
+    Tasks are streamed from a server-side cursor in batches, so memory use stays constant
+    however many tasks the user has.
+    """
+    query = export_query(current_user.id, status)
+
+    if isinstance(session_factory, async_sessionmaker):
+        body = async_export_stream(session_factory, query, format)
+    else:
+        body = export_stream(session_factory, query, format)
+
+    return StreamingResponse(
+        body,
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="tasks.{format.value}"'},
+    )
+
+
+@dataclass
+class ImportJob:
+    import_id: str
+    user_id: int
+    status: str = "running"
+    rows_read: int = 0
+    # Rows of the body up to which the import is committed, the rows after it are to be sent again if it fails
+    rows_committed: int = 0
+    imported: int = 0
+    failed: int = 0
+    errors: list = field(default_factory=list)
+
+    def record(self, rows: int, imported: int, errors: list):
+        self.rows_read += rows
+        self.imported += imported
+        self.failed += len(errors)
+        self.errors.extend(errors[:settings.import_max_errors - len(self.errors)])
+
+
+class ImportJobs:
+    """
+    Progress of the imports of this process, the running ones and the last finished ones.
+
+    The progress lives in memory: with several workers, only the worker running an import
+    knows it, and a progress request served by another worker answers 404.
+    """
+
+    def __init__(self, max_finished: int = 100):
+        self.max_finished = max_finished
+        self._jobs: OrderedDict[str, ImportJob] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def start(self, import_id: str, user_id: int) -> ImportJob:
+        with self._lock:
+            if import_id in self._jobs:
+                raise HTTPException(status_code=409, detail="Import id already in use")
+            job = self._jobs[import_id] = ImportJob(import_id, user_id)
+            return job
+
+    def finish(self, job: ImportJob, status: str):
+        with self._lock:
+            job.status = status
+            self._jobs.move_to_end(job.import_id)
+            finished = [key for key, other in self._jobs.items() if other.status != "running"]
+            for key in finished[:-self.max_finished]:
+                del self._jobs[key]
+
+    def get(self, import_id: str) -> Optional[ImportJob]:
+        return self._jobs.get(import_id)
+
+    def clear(self):
+        with self._lock:
+            self._jobs.clear()
+
+
+import_jobs = ImportJobs()
+
+QUOTE_OR_NEWLINE = re.compile(r'["\n]')
+
+
+class RecordSplitter:
+    """
+    Splits a body, fed chunk by chunk, into complete records: NDJSON lines, or CSV rows, which
+    may span lines, mapped onto the header row.
+    """
+
+    def __init__(self, import_format: TransferFormat):
+        self.import_format = import_format
+        self.pending = b""
+        self.decoder = codecs.getincrementaldecoder("utf-8")()
+        self.header, self.text, self.scanned, self.quoted = None, "", 0, False
+
+    def feed(self, chunk: bytes) -> list:
+        if self.import_format is TransferFormat.NDJSON:
+            *lines, self.pending = (self.pending + chunk).split(b"\n")
+            return [line for line in lines if line.strip()]
+
+        self.text += self.decode(chunk)
+        # A newline ends a row only outside a quoted field
+        end = 0
+        for match in QUOTE_OR_NEWLINE.finditer(self.text, self.scanned):
+            if match.group() == '"':
+                self.quoted = not self.quoted
+            elif not self.quoted:
+                end = match.end()
+        complete, self.text, self.scanned = self.text[:end], self.text[end:], len(self.text) - end
+        return self.rows(complete)
+
+    # The records left once the body has ended
+    def finish(self) -> list:
+        if self.import_format is TransferFormat.NDJSON:
+            return [self.pending] if self.pending.strip() else []
+        return self.rows(self.text + self.decode(b"", final=True))
+
+    def decode(self, chunk: bytes, final: bool = False) -> str:
+        try:
+            return self.decoder.decode(chunk, final)
+        except UnicodeDecodeError:
+            raise HTTPException(status_code=400, detail="Body is not valid UTF-8")
+
+    def rows(self, text: str) -> list:
+        rows = csv.reader(io.StringIO(text))
+        if self.header is None:
+            self.header = next(rows, None)
+        return [row_to_record(self.header, row) for row in rows if row]
+
+
+# Split the streamed body into complete records. Splitting, like validating, is CPU work on every
+# byte of the body, so it runs in the threadpool to keep the event loop serving other requests
+async def read_records(body, import_format: TransferFormat):
+    splitter = RecordSplitter(import_format)
+    async for chunk in body:
+        for record in await run_in_threadpool(splitter.feed, chunk):
+            yield record
+    for record in await run_in_threadpool(splitter.finish):
+        yield record
+
+
+# Map a CSV row onto the header, empty values are left out so the defaults of TaskCreate apply
+def row_to_record(header, row) -> dict:
+    return {key: value for key, value in zip(header, row) if value != ""}
+
+
+def validate_record(record):
+    if isinstance(record, dict):
+        return TaskCreate.model_validate(record)
+    return TaskCreate.model_validate_json(record)
+
+
+# Validate a chunk of records whose first is row `first_row` of the body, returns the valid tasks and the errors
+def validate_chunk(chunk: list, first_row: int) -> tuple[list, list]:
+    tasks, errors = [], []
+    for row, record in enumerate(chunk, start=first_row):
+        try:
+            tasks.append(validate_record(record))
+        except ValidationError as e:
+            errors.append({"row": row, "errors": e.errors(include_url=False, include_context=False)})
+    return tasks, errors
+
+
+async def read_chunks(body, import_format: TransferFormat, size: int):
+    chunk = []
+    async for record in read_records(body, import_format):
+        chunk.append(record)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# Endpoint to create tasks from a streamed NDJSON or CSV body
+@router.post(
+    "/import",
+    response_model=ImportResponse,
+    status_code=201,
+    openapi_extra={"requestBody": {"required": True, "content": {
+        "application/x-ndjson": {"schema": {"type": "string"}},
+        "text/csv": {"schema": {"type": "string"}},
+    }}},
+)
+async def import_tasks(
+        request: Request,
+        format: TransferFormat = Query(TransferFormat.NDJSON),  # Format of the body, ndjson or csv
+        import_id: Optional[str] = Header(None, alias="X-Import-Id", max_length=64),  # Id to follow the progress of the import with
+        session: Session | AsyncSession = Depends(get_db),
+        current_user: UserIdentity = Depends(get_current_user),
+):
+    """
+    Import tasks from a streamed body, one task per NDJSON line or CSV row.
+
+    - **format**: `ndjson` (default) or `csv`. A CSV body starts with a header row naming
+      the columns; the output of `GET /tasks/export` can be imported as is.
+    - **X-Import-Id** (header): Optional id under which the progress of the import can be
+      followed with `GET /tasks/import/{import_id}` while it runs. A random id is used otherwise.
+
+    Every row is validated like the body of `POST /tasks/`. Valid rows are loaded with COPY
+    and committed in chunks of `IMPORT_CHUNK_SIZE`; invalid rows are skipped and reported in
+    `errors` by their position. If the import fails, the chunks committed before the failure
+    are kept: `rows_committed` in the progress tells after which row of the body to resume.
+    """
+    job = import_jobs.start(import_id or uuid.uuid4().hex, current_user.id)
+
+    try:
+        async for chunk in read_chunks(request.stream(), format, settings.import_chunk_size):
+            tasks, errors = await run_in_threadpool(validate_chunk, chunk, job.rows_read + 1)
+            await run_db(session, crud.copy_tasks, current_user.id, tasks)
+            # Each chunk is its own transaction, so an import never holds locks or buffered events for long
+            await run_db(session, Session.commit)
+            job.record(len(chunk), len(tasks), errors)
+            job.rows_committed = job.rows_read
+    except BaseException:
+        import_jobs.finish(job, "failed")
+        raise
+
+    import_jobs.finish(job, "completed")
+    return ModelJSONResponse(ImportResponse, asdict(job), status_code=201)
+
+
+# Endpoint to follow the progress of an import
+@router.get("/import/{import_id}", response_model=ImportProgress, status_code=200)
+async def read_import_progress(
+        import_id: str,
+        current_user: UserIdentity = Depends(get_current_user),
+):
+    """
+    Get the progress of a running or recently finished import of the current user.
+
+    - **import_id**: The `X-Import-Id` the import was started with.
+
+    Progress is kept by the worker running the import. With several workers, a request served
+    by another worker answers 404, so route progress requests to the worker of the import (for
+    example with sticky sessions) or rely on the response of the import itself.
+    """
+    job = import_jobs.get(import_id)
+    if job is None or job.user_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Import not found")
+
+    return ModelJSONResponse(ImportProgress, asdict(job))
@@ -0,0 +1,113 @@
+import hashlib
+import hmac
+import math
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from starlette.datastructures import MutableHeaders
+from starlette.requests import HTTPConnection
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import settings
+
+# Cookie carrying the time of the client's last write, and the header doing the same for clients without cookies
+LAST_WRITE_COOKIE = "last_write"
+LAST_WRITE_HEADER = "X-Last-Write"
+
+
+@dataclass
+class RequestWrites:
+    """
+    The time the request's last write committed, None while it hasn't written.
+    """
+    committed_at: Optional[float] = None
+
+
+# The writes of the request being handled, None outside of `ReadYourWritesMiddleware`
+current_writes: ContextVar[Optional[RequestWrites]] = ContextVar("current_writes", default=None)
+
+
+class ReadYourWritesMiddleware:
+    """
+    Hands the time of a request's committed writes back to the client, signed, in the
+    `last_write` cookie and the `X-Last-Write` header, so that its reads over the next
+    `window` seconds stay on the primary whichever worker serves them.
+
+    Clients that keep cookies send it back by themselves, others send the header back.
+    """
+
+    def __init__(self, app: ASGIApp, window: float):
+        self.app = app
+        self.window = window
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        writes = RequestWrites()
+        token = current_writes.set(writes)
+
+        async def send_with_last_write(message: Message) -> None:
+            if message["type"] == "http.response.start" and writes.committed_at is not None:
+                value = sign_last_write(writes.committed_at)
+                headers = MutableHeaders(scope=message)
+                headers.append(LAST_WRITE_HEADER, value)
+                headers.append(
+                    "Set-Cookie",
+                    f"{LAST_WRITE_COOKIE}={value}; Max-Age={math.ceil(self.window)}; Path=/; HttpOnly; SameSite=Lax",
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_last_write)
+        finally:
+            current_writes.reset(token)
+
+
+def last_write_signature(written_at: str) -> str:
+    return hmac.new(settings.secret_key.encode(), written_at.encode(), hashlib.sha256).hexdigest()
+
+
+# The write time with its signature, "<seconds>:<signature>"
+def sign_last_write(committed_at: float) -> str:
+    written_at = f"{committed_at:.3f}"
+    return f"{written_at}:{last_write_signature(written_at)}"
+
+
+def wrote_recently(connection: HTTPConnection) -> bool:
+    """
+    Whether the client's last write, as it sent it back, is within `read_your_writes_seconds`.
+
+    The time is signed with the secret key, so a client can only send back the time of a
+    write it made: missing, unsigned, tampered or malformed values count as no recent write.
+    A client keeps its reads on the primary only for the window after each of its writes.
+    """
+    value = connection.headers.get(LAST_WRITE_HEADER) or connection.cookies.get(LAST_WRITE_COOKIE)
+    if value is None:
+        return False
+    written_at, _, signature = value.partition(":")
+    if not hmac.compare_digest(signature.encode(), last_write_signature(written_at).encode()):
+        return False
+    return abs(time.time() - float(written_at)) < settings.read_your_writes_seconds
+
+
+# Note that the session writes data the client will read back, recorded once the transaction commits
+def record_write(session: Session):
+    session.info["wrote"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def mark_committed_writes(session):
+    writes = current_writes.get()
+    if session.info.pop("wrote", False) and writes is not None:
+        writes.committed_at = time.time()
+
+
+@event.listens_for(Session, "after_rollback")
+def discard_writes(session):
+    session.info.pop("wrote", None)
@@ -0,0 +1,88 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from sqlalchemy import event, inspect
+
+from app.config import settings
+from app.metrics import Counter
+from app.models import User
+
+user_cache_hits = Counter("user_cache_hits_total", "Authenticated requests served from the user cache")
+user_cache_misses = Counter("user_cache_misses_total", "Authenticated requests that had to look up the user")
+
+
+@dataclass(frozen=True)
+class UserIdentity:
+    """
+    What the request path needs to know about the authenticated user.
+    """
+
+    id: int
+    username: str
+
+    @classmethod
+    def from_user(cls, user: User) -> "UserIdentity":
+        return cls(id=user.id, username=user.username)
+
+
+class UserCache:
+    """
+    In-process LRU cache of user identities by username, with entries expiring after a TTL.
+
+    The cache is per process, so with several workers a change made through one of them
+    reaches the others at the latest when the TTL runs out.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, UserIdentity]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, username: str) -> UserIdentity | None:
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is None or entry[0] < time.monotonic():
+                self._entries.pop(username, None)
+                user_cache_misses.inc()
+                return None
+            self._entries.move_to_end(username)
+        user_cache_hits.inc()
+        return entry[1]
+
+    def set(self, identity: UserIdentity) -> UserIdentity:
+        if self.max_size <= 0:
+            return identity
+        with self._lock:
+            self._entries[identity.username] = (time.monotonic() + self.ttl, identity)
+            self._entries.move_to_end(identity.username)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return identity
+
+    def invalidate(self, username: str):
+        with self._lock:
+            self._entries.pop(username, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_cache = UserCache(settings.user_cache_size, settings.user_cache_ttl_seconds)
+
+
+# Drop cached identities whenever a user is changed or deleted through the ORM.
+# Changes made with Core statements must call user_cache.invalidate() themselves.
+@event.listens_for(User, "after_update")
+def invalidate_updated_user(mapper, connection, target):
+    history = inspect(target).attrs.username.history
+    for username in (*history.deleted, target.username):
+        user_cache.invalidate(username)
+
+
+@event.listens_for(User, "after_delete")
+def invalidate_deleted_user(mapper, connection, target):
+    user_cache.invalidate(target.username)
@@ -1,32 +1,50 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
+from app import crud, loaders
 from app.models import User
 from app.config import settings
+from app.instrumentation import span
+from auth.cache import UserIdentity, user_cache
 from auth.models import TokenData
-from auth.utils import verify_password
+from auth.hashing import password_hasher
+from auth.utils import verify_and_update_password
+from app.database import run_db
 from app.dependencies import get_db
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token")
 
 
-# Get a user from the database by username
-def get_user(db: Session, username: str):
-    return db.query(User).filter(User.username == username).first()
+# Get a user from the database by username. Tasks are not loaded unless other loader options are passed
+def get_user(db: Session, username: str, options=loaders.AUTH_USER):
+    return db.query(User).options(*options).filter(User.username == username).first()
 
 
 # Authenticate the user by verifying credentials
-def authenticate_user(db: Session, username: str, password: str) -> User | None:
-    user = get_user(db, username)
-    if user and verify_password(password, user.hashed_password):
-        return user
-    return None
+async def authenticate_user(db: Session | AsyncSession, username: str, password: str) -> User | None:
+    user = await run_db(db, get_user, username)
+    if user is None:
+        return None
+
+    verified, new_hash = await password_hasher.run(verify_and_update_password, password, user.hashed_password)
+    if not verified:
+        return None
+
+    # The hash was made with outdated settings, store the new one
+    if new_hash is not None:
+        user.hashed_password = new_hash
+        user = await run_db(db, crud.save, user)
+
+    return user
 
 
 # Get the currently logged-in user from the JWT token
-def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)) -> User:
+async def get_current_user(
+        db: Session | AsyncSession = Depends(get_db), token: str = Depends(oauth2_scheme)
+) -> UserIdentity:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -34,16 +52,26 @@ def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_
     )
 
     try:
-        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+        with span("jwt"):
+            payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
         username: str = payload.get("sub")
         if username is None:
             raise credentials_exception
-        token_data = TokenData(username=username)
-    except JWTError:
+        token_data = TokenData(username=username, user_id=payload.get("uid"))
+    except (JWTError, ValueError):
         raise credentials_exception
 
-    user = get_user(db, username=token_data.username)
+    # The token already carries the identity, no lookup needed
+    if settings.trust_token_user_id and token_data.user_id is not None:
+        return UserIdentity(id=token_data.user_id, username=token_data.username)
+
+    identity = user_cache.get(token_data.username)
+    if identity is not None:
+        return identity
+
+    with span("user_query"):
+        user = await run_db(db, get_user, username=token_data.username)
     if user is None:
         raise credentials_exception
 
-    return user
+    return user_cache.set(UserIdentity.from_user(user))
@@ -0,0 +1,69 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from fastapi import HTTPException
+
+from app.config import settings
+from app.metrics import Counter
+
+password_hash_rejections = Counter(
+    "password_hash_rejections_total", "Password hashing jobs rejected with 503 because the queue was full"
+)
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt in a pool of worker processes, so hashing uses every core and neither holds
+    the GIL nor occupies the threadpool of the web workers.
+
+    At most `workers + queue_size` jobs are admitted at once. Further jobs are rejected
+    with 503 and a Retry-After header instead of piling up behind a login storm.
+    """
+
+    def __init__(self, workers: int, queue_size: int, retry_after: int):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = self.workers + queue_size
+        self.retry_after = retry_after
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # Workers are spawned rather than forked from the multi-threaded server process
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    async def run(self, fn, *args):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                password_hash_rejections.inc()
+                raise HTTPException(
+                    status_code=503,
+                    detail="Server is busy, try again later",
+                    headers={"Retry-After": str(self.retry_after)},
+                )
+            self._pending += 1
+
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+
+password_hasher = PasswordHasher(
+    settings.password_hash_workers, settings.password_hash_queue_size, settings.password_hash_retry_after
+)
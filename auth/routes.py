@@ -1,10 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app import crud
+from app.database import run_db
 from app.models import User
+from app.responses import ModelJSONResponse
 from app.schemas import UserCreate, UserResponse
 from .utils import create_access_token, get_password_hash
 from .dependencies import authenticate_user, get_db, get_user
+from .hashing import password_hasher
 from .models import Token
 
 router = APIRouter()
@@ -12,34 +17,34 @@ router = APIRouter()
 
 # Login endpoint for access token
 @router.post("/token", response_model=Token)
-def login_for_access_token(
-        form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)
+async def login_for_access_token(
+        form_data: OAuth2PasswordRequestForm = Depends(), db: Session | AsyncSession = Depends(get_db)
 ):
     """
     Endpoint to authenticate a user and return an access token.
     """
-    user = authenticate_user(db, form_data.username, form_data.password)
+    user = await authenticate_user(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=401,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    access_token = create_access_token(data={"sub": user.username})
-    return {"access_token": access_token, "token_type": "bearer"}
+    access_token = create_access_token(data={"sub": user.username, "uid": user.id})
+    return ModelJSONResponse(Token, {"access_token": access_token, "token_type": "bearer"})
 
 
 # Signup endpoint for user registration
 @router.post("/signup", response_model=UserResponse, status_code=201)
-def signup(user: UserCreate, db: AsyncSession = Depends(get_db)):
+async def signup(user: UserCreate, db: Session | AsyncSession = Depends(get_db)):
     """
     Endpoint to register a new user.
     """
-    db_user = get_user(db, username=user.username)
+    db_user = await run_db(db, get_user, username=user.username)
     if db_user:
         raise HTTPException(status_code=400, detail="Username already registered")
 
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await password_hasher.run(get_password_hash, user.password)
     db_user = User(
         first_name=user.first_name,
         last_name=user.last_name,
@@ -47,7 +52,6 @@ def signup(user: UserCreate, db: AsyncSession = Depends(get_db)):
         hashed_password=hashed_password
     )
 
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
-    return db_user
+    db_user = await run_db(db, crud.save, db_user)
+
+    return ModelJSONResponse(UserResponse, db_user, status_code=201)
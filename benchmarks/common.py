@@ -0,0 +1,95 @@
+import random
+import uuid
+from dataclasses import dataclass
+
+from sqlalchemy import create_engine, delete, insert, text
+from sqlalchemy.orm import sessionmaker
+
+from app.config import settings
+from app.database import Base, SessionManager
+from app.models import Task, TaskStatusEnum, User
+from auth.utils import create_access_token
+
+# Benchmarks run against the test database, never against the application's own data
+DATABASE_URL = f"postgresql+psycopg2://{settings.db_user}:{settings.db_password}@{settings.db_host}:{settings.db_port}/{settings.test_db_name}"
+
+engine = create_engine(DATABASE_URL)
+BenchmarkSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def seed_user(tasks: int) -> int:
+    """
+    Create a throwaway user owning the given number of tasks, creating the tables if needed.
+    Returns the id of the user.
+    """
+    Base.metadata.create_all(bind=engine)
+    with BenchmarkSessionLocal() as session:
+        user = User(first_name="Benchmark", username=f"benchmark-{uuid.uuid4().hex}", hashed_password="")
+        session.add(user)
+        session.flush()
+        session.execute(insert(Task), [
+            {"title": f"Task {i}", "description": "Benchmark task " * 4, "status": TaskStatusEnum.NEW,
+             "user_id": user.id}
+            for i in range(tasks)
+        ])
+        session.commit()
+        return user.id
+
+
+# Delete a user made by seed_user, its tasks go with it
+def remove_user(user_id: int):
+    with BenchmarkSessionLocal() as session:
+        session.execute(delete(User).where(User.id == user_id))
+        session.commit()
+
+
+def auth_headers(user_id: int) -> dict:
+    with BenchmarkSessionLocal() as session:
+        username = session.get(User, user_id).username
+    token = create_access_token(data={"sub": username, "uid": user_id})
+    return {"Authorization": f"Bearer {token}"}
+
+
+def get_benchmark_db():
+    with SessionManager(BenchmarkSessionLocal()) as session:
+        yield session
+
+
+# Words of the generated titles and descriptions, so that searches find tasks
+WORDS = ("report", "invoice", "meeting", "release", "backup", "review", "budget", "deploy", "design", "support")
+
+
+@dataclass
+class SeededUser:
+    id: int
+    username: str
+    first_task_id: int
+    last_task_id: int
+
+
+def seed_users(session_factory, users: int, tasks: int, seed: int = 0) -> list[SeededUser]:
+    """
+    Create `users` users owning `tasks` tasks each, with random statuses and titles made of WORDS,
+    then analyze the tables so the planner has statistics. The tables must exist.
+
+    The same seed generates the same data. Returns the created users with the range of their task ids.
+    """
+    rng = random.Random(seed)
+    statuses = list(TaskStatusEnum)
+    seeded = []
+
+    with session_factory() as session:
+        for number in range(users):
+            user = User(first_name="Benchmark", username=f"benchmark-{number}-{uuid.uuid4().hex[:8]}", hashed_password="")
+            session.add(user)
+            session.flush()
+            task_ids = session.scalars(insert(Task).returning(Task.id, sort_by_parameter_order=True), [
+                {"title": " ".join(rng.sample(WORDS, 3)), "description": " ".join(rng.choices(WORDS, k=12)),
+                 "status": rng.choice(statuses), "user_id": user.id}
+                for _ in range(tasks)
+            ]).all()
+            seeded.append(SeededUser(user.id, user.username, task_ids[0], task_ids[-1]))
+        session.commit()
+        session.execute(text("ANALYZE"))
+
+    return seeded
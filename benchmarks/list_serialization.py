@@ -0,0 +1,92 @@
+"""
+Microbenchmark of the task list path: full ORM objects validated by Pydantic versus plain
+column rows serialized with orjson.
+
+Seeds a throwaway user with tasks in the test database (TEST_DB_NAME), times both paths
+for several page sizes and prints the median cost per row. The user and its tasks are
+deleted at the end.
+
+    python -m benchmarks.list_serialization [--rows 1000] [--repeat 50]
+"""
+import argparse
+import json
+import statistics
+import time
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+from sqlalchemy.future import select
+
+from app import loaders
+from app.main import TASK_PAGE_COLUMNS, TASK_PAGE_FIELDS
+from app.models import Task
+from app.schemas import AllTasksResponse
+from benchmarks.common import BenchmarkSessionLocal, remove_user, seed_user
+
+
+def orm_path(session, user_id, size):
+    # The list path before the fast path: ORM objects, copied into dicts, validated, encoded
+    tasks = session.execute(
+        select(Task).where(Task.user_id == user_id).options(*loaders.TASK_ONLY).order_by(Task.id).limit(size)
+    ).scalars().all()
+    content = {
+        "pagination": {"page": 1, "size": size, "total": len(tasks), "total_approximate": False},
+        "tasks": [
+            {"id": task.id, "title": task.title, "description": task.description, "user_id": task.user_id,
+             "status": task.status}
+            for task in tasks
+        ],
+        "next_cursor": None,
+    }
+    validated = AllTasksResponse.model_validate(content)
+    body = JSONResponse(jsonable_encoder(validated)).body
+    session.expunge_all()
+    return body
+
+
+def columns_path(session, user_id, size):
+    rows = session.execute(
+        select(*TASK_PAGE_COLUMNS).where(Task.user_id == user_id).order_by(Task.id).limit(size)
+    ).all()
+    content = {
+        "pagination": {"page": 1, "size": size, "total": len(rows), "total_approximate": False},
+        "tasks": [dict(zip(TASK_PAGE_FIELDS, row)) for row in rows],
+        "next_cursor": None,
+    }
+    return ORJSONResponse(content).body
+
+
+def per_row_us(fn, session, user_id, size, repeat):
+    fn(session, user_id, size)  # Warm up
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(session, user_id, size)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) / size * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000, help="tasks seeded for the benchmark user")
+    parser.add_argument("--repeat", type=int, default=50, help="timed runs per path and page size")
+    args = parser.parse_args()
+
+    user_id = seed_user(args.rows)
+
+    try:
+        with BenchmarkSessionLocal() as session:
+            # Both paths must produce the same document
+            assert json.loads(orm_path(session, user_id, 10)) == json.loads(columns_path(session, user_id, 10))
+
+            print(f"{'page size':>10} {'orm us/row':>12} {'columns us/row':>15} {'speedup':>8}")
+            for size in (10, 100, min(1000, args.rows)):
+                orm = per_row_us(orm_path, session, user_id, size, args.repeat)
+                columns = per_row_us(columns_path, session, user_id, size, args.repeat)
+                print(f"{size:>10} {orm:>12.2f} {columns:>15.2f} {orm / columns:>7.1f}x")
+    finally:
+        remove_user(user_id)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,339 @@
+"""
+Load test of the API: throughput and p50/p95/p99 latency of each endpoint under concurrent requests.
+
+A fresh database is seeded with USERS x TASKS generated tasks, then every scenario is run
+with CONCURRENCY clients, in-process (through the ASGI application) and against a uvicorn
+server, each in its own process configured for the benchmark database. Results are compared
+to the baselines stored in benchmarks/baselines/, and the run fails on regressions, and when
+there is no baseline recorded with the same parameters. The committed baselines were recorded
+with the default parameters; record the reference machine's own with --save-baseline.
+
+By default the database lives in a disposable PostgreSQL server (needs the pgserver package);
+with `--server configured` a throwaway database is created on the server of the DB_* settings.
+There is no SQLite fallback: the schema depends on PostgreSQL (tsvector search, enum types,
+the triggers maintaining the task counters, COPY imports).
+
+    python -m benchmarks.load [--users 20] [--tasks 500] [--requests 1000] [--concurrency 16]
+                              [--mode both] [--scenarios read_task,list_tasks] [--save-baseline]
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict
+from pathlib import Path
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+BASELINES = Path(__file__).parent / "baselines"
+DATABASE_NAME = "todo_benchmark"
+MODES = ("inprocess", "uvicorn")
+
+# Words searched for by the search scenario, all of them occur in the generated tasks
+SEARCH_WORDS = ("report", "invoice", "meeting", "release", "backup")
+STATUSES = ("New", "In progress", "Completed")
+
+# Concurrent updates of the same task are refused with 412 by optimistic locking, which is not a failure
+EXPECTED_STATUSES = {412}
+
+
+def task_id(user: dict, rng: random.Random) -> int:
+    return rng.randint(user["first_task_id"], user["last_task_id"])
+
+
+# Request of each scenario for a user: method, path and JSON body
+SCENARIOS = {
+    "read_task": lambda user, rng: ("GET", f"/tasks/{task_id(user, rng)}", None),
+    "list_tasks": lambda user, rng: ("GET", "/tasks/?size=50", None),
+    "list_by_status": lambda user, rng: ("GET", f"/tasks/?size=50&status={rng.choice(STATUSES)}", None),
+    "list_all": lambda user, rng: ("GET", "/tasks/all?size=50&approximate_total=true", None),
+    "search": lambda user, rng: ("GET", f"/tasks/?size=20&q={rng.choice(SEARCH_WORDS)}", None),
+    "summary": lambda user, rng: ("GET", "/tasks/summary", None),
+    "changes": lambda user, rng: ("GET", "/tasks/changes?limit=100", None),
+    "create_task": lambda user, rng: ("POST", "/tasks/", {"title": "Load test task", "description": "Created"}),
+    "update_task": lambda user, rng: (
+        "PUT", f"/tasks/{task_id(user, rng)}",
+        {"title": "Load test update", "description": None, "status": rng.choice(STATUSES)},
+    ),
+}
+
+
+def percentile(sorted_values: list[float], percent: float) -> float:
+    # Nearest-rank percentile
+    return sorted_values[max(math.ceil(percent / 100 * len(sorted_values)) - 1, 0)]
+
+
+def summarize(latencies: list[float], errors: int, elapsed: float) -> dict:
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+async def run_scenario(client, scenario: str, users: list[dict], requests: int, concurrency: int) -> dict:
+    """
+    Send `requests` requests of a scenario from `concurrency` concurrent clients, each for random users.
+    """
+    make_request = SCENARIOS[scenario]
+    remaining = iter(range(requests))
+    latencies, errors = [], 0
+
+    async def run_client(number: int):
+        nonlocal errors
+        rng = random.Random(number)
+        for _ in remaining:
+            user = rng.choice(users)
+            method, path, body = make_request(user, rng)
+            start = time.perf_counter()
+            response = await client.request(method, path, json=body, headers=user["headers"])
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400 and response.status_code not in EXPECTED_STATUSES:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(run_client(number) for number in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+
+async def drive(plan: dict, target: str) -> dict:
+    # Imported here, the worker process is configured for the benchmark database by its environment
+    import httpx
+
+    if target == "inprocess":
+        from app.main import app
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://benchmark")
+    else:
+        limits = httpx.Limits(max_connections=plan["concurrency"])
+        client = httpx.AsyncClient(base_url=target, limits=limits, timeout=60)
+
+    results = {}
+    async with client:
+        for scenario in plan["scenarios"]:
+            # Warm up connections, caches and the query plans
+            await run_scenario(client, scenario, plan["users"], plan["warmup"], plan["concurrency"])
+            results[scenario] = await run_scenario(
+                client, scenario, plan["users"], plan["requests"], plan["concurrency"]
+            )
+    return results
+
+
+def run_worker(plan_path: Path, target: str, env: dict) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.load", "--worker", str(plan_path), "--target", target],
+        env=env, check=True, stdout=subprocess.PIPE, text=True,
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+@contextlib.contextmanager
+def uvicorn_server(env: dict, workers: int):
+    """
+    Run the application with uvicorn on a free port and yield its URL once it answers.
+    """
+    from benchmarks.postgres import free_port
+
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        env=env,
+    )
+    url = f"http://127.0.0.1:{port}"
+    try:
+        import httpx
+
+        deadline = time.monotonic() + 30
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError("uvicorn exited before answering")
+            try:
+                if httpx.get(f"{url}/metrics/pool").status_code == 200:
+                    break
+            except httpx.TransportError:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError("uvicorn did not answer within 30 seconds")
+            time.sleep(0.2)
+        yield url
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+@contextlib.contextmanager
+def benchmark_database(server: str):
+    """
+    Yield the DB_* environment variables of an empty database for the benchmark, removed on exit.
+    """
+    with contextlib.ExitStack() as stack:
+        if server == "disposable":
+            from benchmarks.postgres import disposable_postgres
+            env = stack.enter_context(disposable_postgres())
+        else:
+            from app.config import settings
+            env = {"DB_HOST": settings.db_host, "DB_PORT": settings.db_port,
+                   "DB_USER": settings.db_user, "DB_PASSWORD": settings.db_password}
+
+        server_url = f"postgresql+psycopg2://{env['DB_USER']}:{env['DB_PASSWORD']}@{env['DB_HOST']}:{env['DB_PORT']}"
+        admin = create_engine(f"{server_url}/postgres", isolation_level="AUTOCOMMIT")
+        with admin.connect() as connection:
+            connection.execute(text(f"DROP DATABASE IF EXISTS {DATABASE_NAME} WITH (FORCE)"))
+            connection.execute(text(f"CREATE DATABASE {DATABASE_NAME}"))
+        try:
+            yield {**env, "DB_NAME": DATABASE_NAME}, f"{server_url}/{DATABASE_NAME}"
+        finally:
+            with admin.connect() as connection:
+                connection.execute(text(f"DROP DATABASE IF EXISTS {DATABASE_NAME} WITH (FORCE)"))
+            admin.dispose()
+
+
+def compare(mode: str, results: dict, params: dict, tolerance: float) -> list[str]:
+    """
+    Compare results to the stored baseline of the mode and describe every regression.
+
+    A scenario regresses when its throughput drops or its p95 latency grows by more than
+    `tolerance`, or when any of its requests failed. Results without a baseline recorded
+    with the same parameters can't be checked, which fails the run as well.
+    """
+    regressions = [f"{mode} {scenario}: {result['errors']} failed requests"
+                   for scenario, result in results.items() if result["errors"]]
+
+    path = BASELINES / f"{mode}.json"
+    if not path.exists():
+        return regressions + [f"{mode}: no baseline in {path}, record one with --save-baseline"]
+
+    baseline = json.loads(path.read_text())
+    if baseline["params"] != params:
+        return regressions + [
+            f"{mode}: the baseline was recorded with {baseline['params']}, not comparable to {params}; "
+            "run with the baseline's parameters or record one with --save-baseline"
+        ]
+
+    for scenario, result in results.items():
+        expected = baseline["results"].get(scenario)
+        if expected is None:
+            regressions.append(f"{mode} {scenario}: no baseline, record one with --save-baseline")
+            continue
+        if result["throughput"] < expected["throughput"] * (1 - tolerance):
+            regressions.append(
+                f"{mode} {scenario}: throughput {result['throughput']:.1f} req/s, baseline {expected['throughput']:.1f}"
+            )
+        if result["p95_ms"] > expected["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{mode} {scenario}: p95 {result['p95_ms']:.2f} ms, baseline {expected['p95_ms']:.2f}")
+
+    return regressions
+
+
+def print_results(mode: str, results: dict):
+    print(f"\n{mode}")
+    print(f"{'scenario':<16}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for scenario, result in results.items():
+        print(f"{scenario:<16}{result['throughput']:>10.1f}{result['p50_ms']:>10.2f}"
+              f"{result['p95_ms']:>10.2f}{result['p99_ms']:>10.2f}{result['errors']:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--server", choices=("disposable", "configured"), default="disposable",
+                        help="disposable PostgreSQL server, or a throwaway database on the DB_* server")
+    parser.add_argument("--users", type=int, default=20, help="users seeded")
+    parser.add_argument("--tasks", type=int, default=500, help="tasks seeded per user")
+    parser.add_argument("--requests", type=int, default=1000, help="timed requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent clients")
+    parser.add_argument("--mode", choices=(*MODES, "both"), default="both")
+    parser.add_argument("--uvicorn-workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma-separated scenarios to run")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression")
+    parser.add_argument("--save-baseline", action="store_true", help="store the results as the new baselines")
+    parser.add_argument("--output", type=Path, help="also write the results to this JSON file")
+    parser.add_argument("--worker", type=Path, help=argparse.SUPPRESS)  # Plan file, set for the measuring processes
+    parser.add_argument("--target", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker is not None:
+        print(json.dumps(asyncio.run(drive(json.loads(args.worker.read_text()), args.target))))
+        return
+
+    scenarios = [scenario.strip() for scenario in args.scenarios.split(",") if scenario.strip()]
+    unknown = set(scenarios) - SCENARIOS.keys()
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    if args.users < 1 or args.tasks < 1:
+        parser.error("--users and --tasks must be at least 1")
+
+    from auth.utils import create_access_token
+    from benchmarks.common import seed_users
+    from app.database import Base
+
+    modes = MODES if args.mode == "both" else (args.mode,)
+    params = {"users": args.users, "tasks": args.tasks, "requests": args.requests,
+              "concurrency": args.concurrency, "uvicorn_workers": args.uvicorn_workers}
+    all_results, regressions = {}, []
+
+    with benchmark_database(args.server) as (db_env, database_url):
+        engine = create_engine(database_url)
+        Base.metadata.create_all(bind=engine)
+        print(f"Seeding {args.users} users x {args.tasks} tasks")
+        users = seed_users(sessionmaker(bind=engine), args.users, args.tasks)
+        engine.dispose()
+
+        plan = {
+            "users": [
+                {**asdict(user), "headers": {
+                    "Authorization": f"Bearer {create_access_token(data={'sub': user.username, 'uid': user.id})}"
+                }}
+                for user in users
+            ],
+            "scenarios": scenarios,
+            "requests": args.requests,
+            "warmup": max(args.requests // 10, args.concurrency),
+            "concurrency": args.concurrency,
+        }
+        # The application under test uses the benchmark database and nothing else
+        env = {**os.environ, **db_env, "DB_REPLICA_URLS": "", "EVENT_BROKER": "memory", "PROFILING_ENABLED": "false"}
+
+        with tempfile.TemporaryDirectory() as directory:
+            plan_path = Path(directory) / "plan.json"
+            plan_path.write_text(json.dumps(plan))
+            for mode in modes:
+                print(f"Running {len(scenarios)} scenarios {mode}")
+                if mode == "inprocess":
+                    results = run_worker(plan_path, "inprocess", env)
+                else:
+                    with uvicorn_server(env, args.uvicorn_workers) as url:
+                        results = run_worker(plan_path, url, env)
+                all_results[mode] = results
+                print_results(mode, results)
+                regressions += compare(mode, results, params, args.tolerance)
+
+    if args.output is not None:
+        args.output.write_text(json.dumps({"params": params, "results": all_results}, indent=2))
+
+    if args.save_baseline:
+        BASELINES.mkdir(exist_ok=True)
+        for mode, results in all_results.items():
+            (BASELINES / f"{mode}.json").write_text(json.dumps({"params": params, "results": results}, indent=2) + "\n")
+        print(f"Baselines saved to {BASELINES}")
+        return
+
+    if regressions:
+        print("\nRegressions:\n" + "\n".join(f"  {regression}" for regression in regressions))
+        sys.exit(1)
+    print("\nNo regressions")
+
+
+if __name__ == "__main__":
+    main()
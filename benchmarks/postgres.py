@@ -0,0 +1,54 @@
+"""
+Disposable PostgreSQL servers for the benchmarks, from the binaries shipped by the `pgserver` package.
+
+The server gets a fresh data directory in a temporary directory, listens on a free local
+TCP port and is stopped and deleted on exit, so benchmarks never touch existing data.
+"""
+import contextlib
+import shutil
+import socket
+import tempfile
+from pathlib import Path
+
+# Optional, only needed for disposable servers
+try:
+    import pgserver
+except ImportError:
+    pgserver = None
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextlib.contextmanager
+def disposable_postgres():
+    """
+    Start a throwaway PostgreSQL server and yield the settings to reach it, as DB_* environment variables.
+
+    Connections are trusted, the `postgres` user needs no password.
+    """
+    if pgserver is None:
+        raise RuntimeError("Disposable servers need the pgserver package (pip install pgserver)")
+
+    directory = Path(tempfile.mkdtemp(prefix="todo-benchmark-"))
+    directory.chmod(0o777)  # pgserver runs the server as an unprivileged user when started as root
+    pgdata = directory / "pgdata"
+    try:
+        # pgserver initializes the data directory and starts the server on a socket only, it is
+        # restarted on TCP since the application connects by host and port
+        server = pgserver.get_server(pgdata, cleanup_mode=None)
+        pgserver.pg_ctl(["-w", "stop"], pgdata=pgdata, user=server.system_user)
+        port = free_port()
+        pgserver.pg_ctl(
+            ["-w", "-o", f"-h 127.0.0.1 -p {port} -k {pgdata}", "-l", str(pgdata / "server.log"), "start"],
+            pgdata=pgdata, user=server.system_user,
+        )
+        try:
+            yield {"DB_HOST": "127.0.0.1", "DB_PORT": str(port), "DB_USER": "postgres", "DB_PASSWORD": ""}
+        finally:
+            pgserver.pg_ctl(["-w", "-m", "fast", "stop"], pgdata=pgdata, user=server.system_user)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
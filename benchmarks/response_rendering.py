@@ -0,0 +1,114 @@
+"""
+Throughput of an endpoint with each JSON renderer (JSON_RENDERER=orjson and JSON_RENDERER=json).
+
+The renderer is chosen when the application is imported, so every renderer is measured in
+its own process. Requests go through the whole ASGI application in-process, against the
+test database (TEST_DB_NAME), for a throwaway user whose tasks are deleted at the end.
+
+With --isolated, only the rendering of a page of the task list is timed, without the database
+or the ASGI application: the response model serialized to Python objects then written by each
+renderer, against the response model serialized straight to JSON by Pydantic (`ModelJSONResponse`).
+
+    python -m benchmarks.response_rendering [--path "/tasks/all?size=100"] [--requests 500] [--isolated]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+import timeit
+
+from benchmarks.common import remove_user, seed_user
+
+RENDERERS = ("json", "orjson")
+
+
+def measure(path: str, requests: int, user_id: int) -> float:
+    # Imported here, after JSON_RENDERER has been set for this process
+    from fastapi.testclient import TestClient
+
+    from app.dependencies import get_db
+    from app.main import app
+    from benchmarks.common import auth_headers, get_benchmark_db
+
+    app.dependency_overrides[get_db] = get_benchmark_db
+    client = TestClient(app)
+    headers = auth_headers(user_id)
+
+    for _ in range(20):  # Warm up
+        assert client.get(path, headers=headers).status_code == 200
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        client.get(path, headers=headers)
+    return requests / (time.perf_counter() - start)
+
+
+def measure_rendering(size: int, repeat: int) -> dict[str, float]:
+    from fastapi.responses import ORJSONResponse
+
+    from app.models import TaskStatusEnum
+    from app.responses import ModelJSONResponse, StdlibJSONResponse, model_adapter
+    from app.schemas import AllTasksResponse
+
+    content = {
+        "pagination": {"page": 1, "size": size, "total": size},
+        "tasks": [
+            {"id": i, "title": f"Task {i}", "description": "Description", "status": TaskStatusEnum.NEW, "user_id": 1}
+            for i in range(size)
+        ],
+    }
+    adapter = model_adapter(AllTasksResponse)
+
+    # Validated then dumped to Python objects as FastAPI does, before each renderer writes them
+    renderings = {
+        "json": lambda: StdlibJSONResponse(adapter.dump_python(adapter.validate_python(content), mode="json")).body,
+        "orjson": lambda: ORJSONResponse(adapter.dump_python(adapter.validate_python(content), mode="json")).body,
+        "pydantic": lambda: ModelJSONResponse(AllTasksResponse, content).body,
+    }
+    return {
+        name: min(timeit.repeat(render, number=repeat, repeat=5)) / repeat
+        for name, render in renderings.items()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--path", default="/tasks/all?size=100", help="endpoint to request")
+    parser.add_argument("--requests", type=int, default=500, help="timed requests per renderer")
+    parser.add_argument("--rows", type=int, default=1000, help="tasks seeded for the benchmark user")
+    parser.add_argument("--isolated", action="store_true", help="time the rendering of a page alone")
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)  # User id, set for the measuring processes
+    args = parser.parse_args()
+
+    if args.isolated:
+        results = measure_rendering(size=100, repeat=args.requests)
+        print("Rendering of a page of 100 tasks")
+        for name, seconds in results.items():
+            print(f"{name:>8} {seconds * 1e6:>10.1f} us {results['json'] / seconds:>6.2f}x")
+        return
+
+    if args.worker is not None:
+        print(measure(args.path, args.requests, args.worker))
+        return
+
+    user_id = seed_user(args.rows)
+    try:
+        results = {}
+        for renderer in RENDERERS:
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.response_rendering", "--path", args.path,
+                 "--requests", str(args.requests), "--worker", str(user_id)],
+                env={**os.environ, "JSON_RENDERER": renderer}, capture_output=True, text=True, check=True,
+            ).stdout
+            results[renderer] = float(output.split()[-1])
+
+        print(f"GET {args.path}")
+        for renderer, throughput in results.items():
+            print(f"{renderer:>8} {throughput:>10.1f} req/s {throughput / results['json']:>6.2f}x")
+    finally:
+        remove_user(user_id)
+
+
+if __name__ == "__main__":
+    main()
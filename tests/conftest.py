@@ -1,13 +1,21 @@
+import os
+
+# Fail every request that executes more SQL statements than the budget of its route (app/budgets.py).
+# Set before the app is imported, which reads it from the settings
+os.environ.setdefault("QUERY_BUDGET_MODE", "raise")
+
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 
 from app.database import Base
-from app.dependencies import get_db
+from app.dependencies import get_db, get_sessionmaker
 from app.main import app
 from app.config import settings
 from app.models import User
+from app.transfer import import_jobs
+from auth.cache import user_cache
 from auth.dependencies import get_current_user
 
 # Define the test database engine
@@ -32,6 +40,7 @@ def override_get_db():
 
 # Override the default get_db dependency to use the test database
 app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_sessionmaker] = lambda: TestingSessionLocal
 
 
 @pytest.fixture(scope="function", autouse=True)
@@ -39,14 +48,32 @@ def setup_and_teardown():
     """
     Fixture to set up and tear down the test database.
     """
-    # Setup: Clear the test database
+    # Setup: Clear the test database and the identities cached for its users
     Base.metadata.drop_all(bind=engine)
     Base.metadata.create_all(bind=engine)
+    user_cache.clear()
+    import_jobs.clear()
     yield
     # Teardown: Clear the test database after each test
     Base.metadata.drop_all(bind=engine)
 
 
+@pytest.fixture
+def count_queries():
+    """
+    Fixture that records every SQL statement executed against the test database.
+    Returns the list of statements, filled in while the test runs.
+    """
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    yield statements
+    event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
 @pytest.fixture
 def create_user():
     """
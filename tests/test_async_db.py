@@ -0,0 +1,71 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.config import settings
+from app.database import AsyncSessionManager
+from app.dependencies import get_db
+from app.main import app
+from tests.conftest import create_user, override_get_db
+
+SQLALCHEMY_ASYNC_TEST_DATABASE_URL = f"postgresql+asyncpg://{settings.db_user}:{settings.db_password}@{settings.db_host}:{settings.db_port}/{settings.test_db_name}"
+
+# TestClient runs every request on a fresh event loop, so connections must not be pooled across requests
+async_engine = create_async_engine(SQLALCHEMY_ASYNC_TEST_DATABASE_URL, poolclass=NullPool)
+AsyncTestingSessionLocal = async_sessionmaker(autoflush=False, expire_on_commit=False, bind=async_engine)
+
+client = TestClient(app)
+
+
+async def override_get_async_db():
+    async with AsyncSessionManager(AsyncTestingSessionLocal()) as session:
+        yield session
+
+
+@pytest.fixture
+def async_db():
+    """
+    Fixture that serves every request with an AsyncSession on the asyncpg engine.
+    """
+    app.dependency_overrides[get_db] = override_get_async_db
+    yield
+    app.dependency_overrides[get_db] = override_get_db
+
+
+def test_signup_and_login_async(async_db):
+    """
+    Test case for signup and login through the async engine.
+    """
+    user_data = {"username": "asyncuser", "first_name": "FirstName", "password": "testpassword"}
+    response = client.post("/auth/signup", json=user_data)
+    assert response.status_code == 201
+
+    response = client.post("/auth/token", data={"username": "asyncuser", "password": "testpassword"})
+    assert response.status_code == 200
+    assert "access_token" in response.json()
+
+
+def test_task_lifecycle_async(async_db, create_user):
+    """
+    Test case for creating, listing, completing and deleting a task through the async engine.
+    """
+    headers = {"Authorization": f"Bearer {create_user}"}
+
+    response = client.post("/tasks/", json={"title": "Async task"}, headers=headers)
+    assert response.status_code == 201
+    task_id = response.json()["id"]
+
+    response = client.get("/tasks/", headers=headers)
+    assert response.status_code == 200
+    assert [task["id"] for task in response.json()["tasks"]] == [task_id]
+
+    response = client.put(f"/tasks/{task_id}/complete", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["status"] == "Completed"
+
+    response = client.delete(f"/tasks/{task_id}", headers=headers)
+    assert response.status_code == 200
+
+    response = client.get(f"/tasks/{task_id}", headers=headers)
+    assert response.status_code == 404
@@ -0,0 +1,111 @@
+import logging
+
+import pytest
+from fastapi.routing import APIRoute
+from fastapi.testclient import TestClient
+
+from app.budgets import QUERY_BUDGETS, QueryBudgetExceeded, QueryBudgetMiddleware, query_budget, route_key
+from app.config import settings
+from app.instrumentation import InstrumentationMiddleware
+from app.main import app
+from auth.cache import user_cache
+from tests.conftest import create_user, create_task
+
+client = TestClient(app)
+
+
+def budgeted_client(mode: str, budgets: dict) -> TestClient:
+    """
+    Client of the app behind a query budget middleware of its own, traced like the app.
+    """
+    guarded = QueryBudgetMiddleware(app, mode=mode, budgets=budgets)
+    return TestClient(InstrumentationMiddleware(guarded, server_timing=False, profiling=False, profiling_interval=0.001))
+
+
+def test_every_route_has_a_budget():
+    """
+    Test case for a query budget declared for every route of the API.
+    """
+    routes = {
+        route_key(method, route.path)
+        for route in app.routes if isinstance(route, APIRoute)
+        for method in route.methods
+    }
+    assert routes == QUERY_BUDGETS.keys()
+
+
+def test_tests_run_with_budgets_enforced():
+    """
+    Test case for the tests failing any request over its budget.
+    """
+    assert settings.query_budget_mode == "raise"
+
+
+def test_routes_within_budget_without_cached_users():
+    """
+    Test case for the task and auth routes staying within their budget when the user has to be looked up.
+    """
+    user = {"username": "budget", "first_name": "First", "last_name": "Last", "password": "testpassword"}
+    assert client.post("/auth/signup", json=user).status_code == 201
+    token = client.post("/auth/token", data={"username": "budget", "password": "testpassword"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    user_cache.clear()
+    task_id = client.post("/tasks/", json={"title": "Task"}, headers=headers).json()["id"]
+    updated_data = {"title": "Updated", "description": None, "status": "In progress"}
+    requests = [
+        lambda: client.get("/tasks/", params={"q": "task"}, headers=headers),
+        lambda: client.get("/tasks/all", params={"status": "New"}, headers=headers),
+        lambda: client.get(f"/tasks/{task_id}", headers=headers),
+        lambda: client.put(f"/tasks/{task_id}", json=updated_data, headers=headers),
+        lambda: client.put(f"/tasks/{task_id}/complete", headers=headers),
+        lambda: client.delete(f"/tasks/{task_id}", headers=headers),
+        lambda: client.get("/metrics/pool"),
+        lambda: client.get("/metrics"),
+    ]
+    for request in requests:
+        user_cache.clear()
+        assert request().status_code == 200
+
+
+def test_query_budget_exceeded(create_user, create_task):
+    """
+    Test case for the query budget context manager failing with the statements of the block.
+    """
+    with pytest.raises(QueryBudgetExceeded, match=r"Task read executed 1 SQL statements, over its budget of 0:\n  SELECT"):
+        with query_budget(0, "Task read"):
+            client.get(f"/tasks/{create_task['id']}", headers={"Authorization": f"Bearer {create_user}"})
+
+
+def test_middleware_raises_over_budget(create_user, create_task):
+    """
+    Test case for the middleware failing a request over its budget in raise mode.
+    """
+    budgeted = budgeted_client("raise", {"GET /tasks/{task_id}": 0})
+
+    with pytest.raises(QueryBudgetExceeded, match=r"GET /tasks/\{task_id\} executed 1 SQL statements"):
+        budgeted.get(f"/tasks/{create_task['id']}", headers={"Authorization": f"Bearer {create_user}"})
+
+
+def test_middleware_warns_over_budget(create_user, create_task, caplog):
+    """
+    Test case for the middleware logging a request over its budget in warn mode, and answering it as usual.
+    """
+    budgeted = budgeted_client("warn", {"GET /tasks/{task_id}": 0, "GET /tasks/": 1})
+    headers = {"Authorization": f"Bearer {create_user}"}
+
+    with caplog.at_level(logging.WARNING, logger="app.budgets"):
+        assert budgeted.get(f"/tasks/{create_task['id']}", headers=headers).status_code == 200
+        assert budgeted.get("/tasks/", headers=headers).status_code == 200
+
+    assert [record.getMessage() for record in caplog.records] == [
+        "GET /tasks/{task_id} executed 1 SQL statements, over its budget of 0"
+    ]
+
+
+def test_unknown_query_budget_mode():
+    """
+    Test case for rejecting an unknown query budget mode.
+    """
+    with pytest.raises(ValueError, match="Unknown query budget mode"):
+        QueryBudgetMiddleware(app, mode="strict")
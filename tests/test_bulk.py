@@ -0,0 +1,147 @@
+from fastapi.testclient import TestClient
+
+from app.main import app
+from tests.conftest import create_user, create_task
+
+client = TestClient(app)
+
+
+def test_create_tasks_bulk(create_user, count_queries):
+    """
+    Test case for creating many tasks with a single INSERT statement.
+    """
+    tasks = [{"title": f"Task {i}", "status": "In progress"} for i in range(50)]
+
+    response = client.post("/tasks/bulk", json=tasks, headers={"Authorization": f"Bearer {create_user}"})
+
+    assert response.status_code == 201
+    assert [task["title"] for task in response.json()["created"]] == [f"Task {i}" for i in range(50)]
+    assert response.json()["errors"] == []
+    assert len([statement for statement in count_queries if statement.startswith("INSERT INTO tasks")]) == 1
+
+
+def test_create_tasks_bulk_without_reloads(create_user, count_queries):
+    """
+    Test case for a bulk create mixing null and set descriptions in a single INSERT, without reloading the created tasks.
+    """
+    tasks = [{"title": f"Task {i}", "description": "Description" if i % 2 else None} for i in range(20)]
+
+    response = client.post("/tasks/bulk", json=tasks, headers={"Authorization": f"Bearer {create_user}"})
+
+    assert response.status_code == 201
+    assert [task["description"] for task in response.json()["created"]] == [task["description"] for task in tasks]
+    assert len([statement for statement in count_queries if statement.startswith("INSERT INTO tasks")]) == 1
+    assert not [statement for statement in count_queries if statement.startswith("SELECT tasks")]
+
+
+def test_create_tasks_bulk_atomic_rejects_invalid(create_user):
+    """
+    Test case for rejecting the whole bulk request when one task is invalid.
+    """
+    headers = {"Authorization": f"Bearer {create_user}"}
+    tasks = [{"title": "Valid"}, {"title": ""}, {"title": "Also valid", "status": "Unknown"}]
+
+    response = client.post("/tasks/bulk", json=tasks, headers=headers)
+
+    assert response.status_code == 422
+    assert [error["index"] for error in response.json()["detail"]] == [1, 2]
+    assert client.get("/tasks/", headers=headers).status_code == 404
+
+
+def test_create_tasks_bulk_partial(create_user):
+    """
+    Test case for creating the valid tasks and reporting the invalid ones.
+    """
+    tasks = [{"title": "Valid"}, {"title": ""}, {"title": "Also valid"}]
+
+    response = client.post("/tasks/bulk", params={"atomic": False}, json=tasks,
+                           headers={"Authorization": f"Bearer {create_user}"})
+
+    assert response.status_code == 201
+    assert [task["title"] for task in response.json()["created"]] == ["Valid", "Also valid"]
+    assert [error["index"] for error in response.json()["errors"]] == [1]
+
+
+def test_create_tasks_bulk_too_many(create_user):
+    """
+    Test case for rejecting bulk requests above the configured limit.
+    """
+    tasks = [{"title": "Task"}] * 1001
+
+    response = client.post("/tasks/bulk", json=tasks, headers={"Authorization": f"Bearer {create_user}"})
+
+    assert response.status_code == 422
+
+
+def create_other_users_task():
+    """
+    Create a second user with one task and return the task ID.
+    """
+    user_data = {"username": "otheruser", "first_name": "Other", "password": "otherpassword"}
+    client.post("/auth/signup", json=user_data)
+    token = client.post("/auth/token", data=user_data).json()["access_token"]
+    response = client.post("/tasks/", json={"title": "Other"}, headers={"Authorization": f"Bearer {token}"})
+    return response.json()["id"]
+
+
+def test_update_tasks_bulk(create_user, create_task):
+    """
+    Test case for updating many tasks, reporting missing and foreign ids.
+    """
+    headers = {"Authorization": f"Bearer {create_user}"}
+    other_task_id = create_other_users_task()
+    payload = {"ids": [create_task["id"], other_task_id, 999], "changes": {"description": "Sprint 1"}}
+
+    response = client.put("/tasks/bulk", json=payload, headers=headers)
+
+    assert response.status_code == 200
+    assert response.json()["results"] == [
+        {"id": create_task["id"], "result": "updated"},
+        {"id": other_task_id, "result": "forbidden"},
+        {"id": 999, "result": "not_found"},
+    ]
+    task = client.get(f"/tasks/{create_task['id']}", headers=headers).json()
+    assert task["description"] == "Sprint 1"
+    assert task["title"] == create_task["title"]
+    assert client.get(f"/tasks/{other_task_id}", headers=headers).json()["description"] is None
+
+
+def test_complete_tasks_bulk_by_status(create_user):
+    """
+    Test case for completing all tasks with a given status.
+    """
+    headers = {"Authorization": f"Bearer {create_user}"}
+    tasks = [{"title": "A", "status": "In progress"}, {"title": "B", "status": "New"}, {"title": "C", "status": "In progress"}]
+    created = client.post("/tasks/bulk", json=tasks, headers=headers).json()["created"]
+
+    response = client.put("/tasks/bulk/complete", json={"status": "In progress"}, headers=headers)
+
+    assert response.status_code == 200
+    assert [result["id"] for result in response.json()["results"]] == [created[0]["id"], created[2]["id"]]
+    statuses = [task["status"] for task in client.get("/tasks/", headers=headers).json()["tasks"]]
+    assert statuses == ["Completed", "New", "Completed"]
+
+
+def test_delete_tasks_bulk(create_user, create_task, count_queries):
+    """
+    Test case for deleting many tasks with a single statement.
+    """
+    headers = {"Authorization": f"Bearer {create_user}"}
+    second = client.post("/tasks/", json={"title": "Second"}, headers=headers).json()
+    count_queries.clear()
+
+    response = client.post("/tasks/bulk/delete", json={"ids": [create_task["id"], second["id"]]}, headers=headers)
+
+    assert response.status_code == 200
+    assert {result["result"] for result in response.json()["results"]} == {"deleted"}
+    assert len([statement for statement in count_queries if statement.startswith("DELETE")]) == 1
+    assert client.get("/tasks/", headers=headers).status_code == 404
+
+
+def test_bulk_selection_required(create_user):
+    """
+    Test case for rejecting bulk operations without ids or status.
+    """
+    response = client.post("/tasks/bulk/delete", json={}, headers={"Authorization": f"Bearer {create_user}"})
+
+    assert response.status_code == 422
@@ -0,0 +1,136 @@
+import gzip
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.compression import ENCODERS, CompressionMiddleware, choose_encoding
+from app.main import app
+from tests.conftest import create_user, create_task
+
+client = TestClient(app)
+
+
+def create_app(minimum_size=100):
+    """
+    Build a small application behind the compression middleware.
+    """
+    small_app = FastAPI()
+    small_app.add_middleware(CompressionMiddleware, minimum_size=minimum_size,
+                             content_types=["text/plain", "application/json"], encodings=["zstd", "br", "gzip"])
+
+    @small_app.get("/text")
+    def text(size: int):
+        return PlainTextResponse("a" * size)
+
+    @small_app.get("/binary")
+    def binary():
+        return Response(b"\x00" * 1000, media_type="image/png")
+
+    @small_app.get("/stream")
+    def stream():
+        return StreamingResponse((f"line {i}\n" for i in range(100)), media_type="text/plain")
+
+    return small_app
+
+
+def test_large_task_list_is_compressed(create_user):
+    """
+    Test case for compressing a large task list for a client accepting gzip.
+    """
+    headers = {"Authorization": f"Bearer {create_user}"}
+    client.post("/tasks/bulk", json=[{"title": f"Task {i}", "description": "Long description " * 20} for i in range(20)],
+                headers=headers)
+
+    response = client.get("/tasks/", params={"size": 20}, headers={**headers, "Accept-Encoding": "gzip"})
+
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert int(response.headers["content-length"]) < len(response.content) / 5
+    assert len(response.json()["tasks"]) == 20
+
+
+def test_small_response_is_not_compressed(create_user, create_task):
+    """
+    Test case for sending a small response as is.
+    """
+    response = client.get(f"/tasks/{create_task['id']}",
+                          headers={"Authorization": f"Bearer {create_user}", "Accept-Encoding": "gzip"})
+
+    assert response.status_code == 200
+    assert "content-encoding" not in response.headers
+    assert response.json()["title"] == "Test Task"
+
+
+def test_streamed_export_is_compressed(create_user, create_task):
+    """
+    Test case for compressing a streamed export chunk by chunk.
+    """
+    response = client.get("/tasks/export", params={"format": "csv"},
+                          headers={"Authorization": f"Bearer {create_user}", "Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert response.text.splitlines()[1].split(",")[1] == "Test Task"
+
+
+def test_middleware_thresholds_and_content_types():
+    """
+    Test case for the size threshold, the content-type allowlist and clients not accepting compression.
+    """
+    small_client = TestClient(create_app())
+
+    response = small_client.get("/text", params={"size": 1000}, headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.text == "a" * 1000
+
+    response = small_client.get("/text", params={"size": 99}, headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+    assert response.headers["vary"] == "Accept-Encoding"
+
+    response = small_client.get("/binary", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers and "vary" not in response.headers
+
+    response = small_client.get("/text", params={"size": 1000}, headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers
+
+    response = small_client.get("/stream", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.text == "".join(f"line {i}\n" for i in range(100))
+
+
+def test_choose_encoding():
+    """
+    Test case for negotiating the encoding from Accept-Encoding.
+    """
+    preferred = ["zstd", "br", "gzip"]
+    best_available = next(encoding for encoding in preferred if encoding in ENCODERS)
+
+    assert choose_encoding("gzip, deflate", preferred) == "gzip"
+    assert choose_encoding("gzip;q=0.5, br;q=0.5, zstd;q=0.5", preferred) == best_available
+    assert choose_encoding("*", preferred) == best_available
+    assert choose_encoding("gzip;q=0, *;q=0.1", ["gzip"]) is None
+    assert choose_encoding("deflate", preferred) is None
+    assert choose_encoding("", preferred) is None
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "br", "zstd"])
+def test_encoders_round_trip(encoding):
+    """
+    Test case for compressing a body in chunks and decompressing it again.
+    """
+    if encoding not in ENCODERS:
+        pytest.skip(f"{encoding} support is not installed")
+    decompress = {
+        "gzip": gzip.decompress,
+        "br": lambda data: pytest.importorskip("brotli").decompress(data),
+        "zstd": lambda data: pytest.importorskip("zstandard").ZstdDecompressor().decompressobj().decompress(data),
+    }[encoding]
+
+    encoder = ENCODERS[encoding]()
+    chunks = [f"chunk {i} ".encode() * 50 for i in range(10)]
+    data = b"".join(encoder.compress(chunk) for chunk in chunks) + encoder.finish()
+
+    assert decompress(data) == b"".join(chunks)
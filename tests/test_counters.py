@@ -0,0 +1,164 @@
+import json
+
+from fastapi.testclient import TestClient
+from sqlalchemy import delete, select, text, update
+
+from app.counters import compact_task_counters, rebuild_task_counters
+from app.main import app
+from app.models import TASK_COUNTER_FOLD_ROWS, Task, TaskCounter, TaskStatusEnum, User
+from tests.conftest import TestingSessionLocal, create_user, create_task
+
+client = TestClient(app)
+
+
+def summary(headers, **params) -> dict:
+    response = client.get("/tasks/summary", params=params, headers=headers)
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_summary_follows_task_writes(create_user):
+    """
+    Test case for the summary counting tasks through create, update, complete and delete.
+    """
+    headers = {"Authorization": f"Bearer {create_user}"}
+
+    assert summary(headers)["counts"] == {"New": 0, "In progress": 0, "Completed": 0}
+
+    first = client.post("/tasks/", json={"title": "First"}, headers=headers).json()
+    second = client.post("/tasks/", json={"title": "Second", "status": "In progress"}, headers=headers).json()
+    client.post("/tasks/", json={"title": "Third"}, headers=headers)
+    assert summary(headers) == {
+        "user_id": first["user_id"], "counts": {"New": 2, "In progress": 1, "Completed": 0}, "total": 3
+    }
+
+    changes = {"title": "First", "description": None, "status": "In progress"}
+    assert client.put(f"/tasks/{first['id']}", json=changes, headers=headers).status_code == 200
+    assert client.put(f"/tasks/{second['id']}/complete", headers=headers).status_code == 200
+    assert summary(headers)["counts"] == {"New": 1, "In progress": 1, "Completed": 1}
+
+    # A change that keeps the status leaves the counts alone
+    changes = {"title": "Renamed", "description": None, "status": "In progress"}
+    assert client.put(f"/tasks/{first['id']}", json=changes, headers=headers).status_code == 200
+    assert client.delete(f"/tasks/{second['id']}", headers=headers).status_code == 200
+    assert summary(headers) == {
+        "user_id": first["user_id"], "counts": {"New": 1, "In progress": 1, "Completed": 0}, "total": 2
+    }
+
+
+def test_summary_follows_bulk_writes_and_imports(create_user):
+    """
+    Test case for the summary counting tasks written by bulk operations and imports.
+    """
+    headers = {"Authorization": f"Bearer {create_user}"}
+
+    tasks = [{"title": f"Task {number}"} for number in range(5)]
+    client.post("/tasks/bulk", json=tasks, headers=headers)
+    client.put("/tasks/bulk/complete", json={"status": "New"}, headers=headers)
+    assert summary(headers)["counts"] == {"New": 0, "In progress": 0, "Completed": 5}
+
+    body = "\n".join(json.dumps({"title": f"Imported {number}", "status": "In progress"}) for number in range(3))
+    response = client.post("/tasks/import", content=body, headers=headers)
+    assert response.status_code == 201
+    assert summary(headers)["counts"] == {"New": 0, "In progress": 3, "Completed": 5}
+
+    client.post("/tasks/bulk/delete", json={"status": "Completed"}, headers=headers)
+    assert summary(headers)["total"] == 3
+
+
+def test_summary_of_other_user(create_task, create_user):
+    """
+    Test case for the summary of another user, given by user_id.
+    """
+    user_data = {"username": "otheruser", "first_name": "Other", "password": "testpassword"}
+    client.post("/auth/signup", json=user_data)
+    token = client.post("/auth/token", data=user_data).json()["access_token"]
+
+    result = summary({"Authorization": f"Bearer {token}"}, user_id=create_task["user_id"])
+    assert result["user_id"] == create_task["user_id"]
+    assert result["counts"]["New"] == 1
+
+
+def test_rebuild_fixes_counters(create_task, create_user):
+    """
+    Test case for the rebuild recounting the tasks and replacing wrong counters.
+    """
+    headers = {"Authorization": f"Bearer {create_user}"}
+    client.post("/tasks/", json={"title": "Done", "status": "Completed"}, headers=headers)
+
+    with TestingSessionLocal() as session:
+        session.execute(update(TaskCounter).where(TaskCounter.status == "COMPLETED").values(count=7))
+        session.execute(delete(TaskCounter).where(TaskCounter.status == "NEW"))
+        session.commit()
+
+        assert rebuild_task_counters(session) == 2
+        assert rebuild_task_counters(session) == 0
+
+    assert summary(headers)["counts"] == {"New": 1, "In progress": 0, "Completed": 1}
+
+
+def test_deleting_user_removes_counters(create_task):
+    """
+    Test case for deleting a user along with their tasks and counters.
+    """
+    with TestingSessionLocal() as session:
+        session.execute(delete(User).where(User.id == create_task["user_id"]))
+        session.commit()
+
+        assert session.query(TaskCounter).count() == 0
+
+
+def test_concurrent_writers_of_the_same_status(create_task, create_user):
+    """
+    Test case for two transactions adding tasks of the same user and status without waiting for each other.
+    """
+    user_id = create_task["user_id"]
+
+    with TestingSessionLocal() as first, TestingSessionLocal() as second:
+        first.add(Task(title="First", user_id=user_id))
+        first.flush()
+
+        # Fails instead of hanging if the second writer waits for a lock held by the first
+        second.execute(text("SET LOCAL lock_timeout = '2s'"))
+        second.add(Task(title="Second", user_id=user_id))
+        second.flush()
+
+        second.commit()
+        first.commit()
+
+    assert summary({"Authorization": f"Bearer {create_user}"})["counts"]["New"] == 3
+
+
+def test_compact_folds_counter_deltas(create_task, create_user):
+    """
+    Test case for compacting the counter deltas into one row per status with the same counts.
+    """
+    headers = {"Authorization": f"Bearer {create_user}"}
+    client.post("/tasks/", json={"title": "Second"}, headers=headers)
+    client.put(f"/tasks/{create_task['id']}/complete", headers=headers)
+    counts = summary(headers)["counts"]
+
+    with TestingSessionLocal() as session:
+        assert compact_task_counters(session) == 2
+        assert session.execute(select(TaskCounter.status, TaskCounter.count).order_by(TaskCounter.status)).all() == [
+            (TaskStatusEnum.NEW, 1), (TaskStatusEnum.COMPLETED, 1)
+        ]
+
+    assert summary(headers)["counts"] == counts
+
+
+def test_writes_fold_counter_deltas(create_task, create_user):
+    """
+    Test case for the writes folding the counter deltas of a user and status once they pile up.
+    """
+    user_id = create_task["user_id"]
+
+    with TestingSessionLocal() as session:
+        for number in range(TASK_COUNTER_FOLD_ROWS * 3):
+            session.add(Task(title=f"Task {number}", user_id=user_id))
+            session.commit()
+
+        rows = session.query(TaskCounter).filter(TaskCounter.status == TaskStatusEnum.NEW).count()
+        assert rows <= TASK_COUNTER_FOLD_ROWS
+
+    assert summary({"Authorization": f"Bearer {create_user}"})["counts"]["New"] == TASK_COUNTER_FOLD_ROWS * 3 + 1
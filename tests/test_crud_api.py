@@ -1,6 +1,7 @@
 from fastapi.testclient import TestClient
 
 from app.main import app
+from auth.cache import user_cache
 from tests.conftest import create_user, create_task
 
 client = TestClient(app)
@@ -164,3 +165,101 @@ def test_mark_task_as_completed(create_task, create_user):
 
     assert response.status_code == 200
     assert response.json()["status"] == "Completed"
+
+
+def test_read_users_tasks_with_cursor(create_user):
+    """
+    Test case for walking through user's tasks with cursor pagination.
+    """
+    user = create_user
+    for i in range(5):
+        client.post("/tasks/", json={"title": f"Task {i}"}, headers={"Authorization": f"Bearer {user}"})
+
+    response = client.get("/tasks/", params={"size": 2}, headers={"Authorization": f"Bearer {user}"})
+    assert response.status_code == 200
+
+    seen = [task["title"] for task in response.json()["tasks"]]
+    cursor = response.json()["next_cursor"]
+    while cursor:
+        response = client.get("/tasks/", params={"size": 2, "cursor": cursor},
+                              headers={"Authorization": f"Bearer {user}"})
+        assert response.status_code == 200
+        seen.extend(task["title"] for task in response.json()["tasks"])
+        cursor = response.json()["next_cursor"]
+
+    assert seen == [f"Task {i}" for i in range(5)]
+
+
+def test_read_all_tasks_invalid_cursor(create_user):
+    """
+    Test case for read_all_tasks rejecting a malformed cursor.
+    """
+    response = client.get("/tasks/all", params={"cursor": "not-a-cursor"},
+                          headers={"Authorization": f"Bearer {create_user}"})
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
+
+
+def test_read_specific_task_query_count(create_user, create_task, count_queries):
+    """
+    Test case checking that reading a task runs only the user lookup and the task query,
+    without eager-loading the user's other tasks.
+    """
+    user = create_user
+    for i in range(3):
+        client.post("/tasks/", json={"title": f"Task {i}"}, headers={"Authorization": f"Bearer {user}"})
+    user_cache.clear()
+    count_queries.clear()
+
+    response = client.get(f"/tasks/{create_task['id']}", headers={"Authorization": f"Bearer {user}"})
+
+    assert response.status_code == 200
+    assert len(count_queries) == 2
+
+
+def test_read_tasks_total(create_user):
+    """
+    Test case checking that total counts all matching tasks, not only the current page.
+    """
+    user = create_user
+    for i in range(5):
+        status = "Completed" if i % 2 else "New"
+        client.post("/tasks/", json={"title": f"Task {i}", "status": status}, headers={"Authorization": f"Bearer {user}"})
+
+    response = client.get("/tasks/", params={"size": 2}, headers={"Authorization": f"Bearer {user}"})
+    assert response.json()["pagination"]["total"] == 5
+
+    response = client.get("/tasks/all", params={"size": 2, "status": "New"}, headers={"Authorization": f"Bearer {user}"})
+    assert response.json()["pagination"]["total"] == 3
+    assert response.json()["pagination"]["total_approximate"] is False
+
+    # Without statistics the estimate falls back to the exact count
+    response = client.get("/tasks/all", params={"size": 2, "approximate_total": True},
+                          headers={"Authorization": f"Bearer {user}"})
+    assert response.json()["pagination"]["total"] == 5
+    assert response.json()["pagination"]["total_approximate"] is True
+
+
+def test_read_tasks_selects_only_response_columns(create_user, create_task, count_queries):
+    """
+    Test case checking that a task list reads only the response columns, with one statement,
+    and still returns the documented response.
+    """
+    user = create_user
+    count_queries.clear()
+
+    response = client.get("/tasks/", headers={"Authorization": f"Bearer {user}"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    assert response.json()["tasks"] == [
+        {"id": create_task["id"], "title": "Test Task", "description": "This is a test task.",
+         "status": "New", "user_id": create_task["user_id"]}
+    ]
+    assert response.json()["pagination"] == {"page": 1, "size": 10, "total": 1, "total_approximate": False}
+    assert response.json()["next_cursor"] is None
+
+    page_query = count_queries[-1]
+    assert len([statement for statement in count_queries if "FROM tasks" in statement]) == 1
+    assert "tasks.updated_at" not in page_query and "users" not in page_query
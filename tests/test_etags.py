@@ -0,0 +1,142 @@
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy import event, update
+
+from app import crud
+from app.main import app
+from app.models import Task, TaskStatusEnum
+from app.schemas import TaskUpdate
+from tests.conftest import TestingSessionLocal, create_user, create_task, engine
+
+client = TestClient(app)
+
+
+def test_read_task_not_modified(create_user, create_task, count_queries):
+    """
+    Test case for answering 304 to a conditional GET of an unchanged task, reading only its version.
+    """
+    headers = {"Authorization": f"Bearer {create_user}"}
+    etag = client.get(f"/tasks/{create_task['id']}", headers=headers).headers["ETag"]
+    count_queries.clear()
+
+    response = client.get(f"/tasks/{create_task['id']}", headers={**headers, "If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert len(count_queries) == 1
+    assert "description" not in count_queries[0]
+
+
+def test_read_task_modified(create_user, create_task):
+    """
+    Test case for returning the task again once it has changed.
+    """
+    headers = {"Authorization": f"Bearer {create_user}"}
+    etag = client.get(f"/tasks/{create_task['id']}", headers=headers).headers["ETag"]
+    client.put(f"/tasks/{create_task['id']}/complete", headers=headers)
+
+    response = client.get(f"/tasks/{create_task['id']}", headers={**headers, "If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert response.json()["status"] == "Completed"
+
+
+def test_read_tasks_not_modified(create_user, create_task):
+    """
+    Test case for conditional GET of task lists.
+    """
+    headers = {"Authorization": f"Bearer {create_user}"}
+    for path in ("/tasks/", "/tasks/all"):
+        etag = client.get(path, headers=headers).headers["ETag"]
+
+        response = client.get(path, headers={**headers, "If-None-Match": etag})
+        assert response.status_code == 304
+
+    etag = client.get("/tasks/", headers=headers).headers["ETag"]
+    client.post("/tasks/", json={"title": "Another"}, headers=headers)
+
+    response = client.get("/tasks/", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert len(response.json()["tasks"]) == 2
+
+
+def test_update_task_if_match(create_user, create_task):
+    """
+    Test case for optimistic concurrency with If-Match on task updates.
+    """
+    headers = {"Authorization": f"Bearer {create_user}"}
+    etag = client.get(f"/tasks/{create_task['id']}", headers=headers).headers["ETag"]
+    updated_data = {"title": "Updated Task", "description": None, "status": "In progress"}
+
+    response = client.put(f"/tasks/{create_task['id']}", json=updated_data, headers={**headers, "If-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+    # The old ETag is outdated now
+    response = client.put(f"/tasks/{create_task['id']}", json=updated_data, headers={**headers, "If-Match": etag})
+    assert response.status_code == 412
+
+
+def change_before_flush(session, task_id: int, times: int = 1):
+    """
+    Bump the version of a task from another connection right before each of the session's next `times` flushes,
+    as a request writing the task between the session's read and its write would.
+    """
+    remaining = [times]
+
+    @event.listens_for(session, "before_flush")
+    def concurrent_write(session, flush_context, instances):
+        if remaining[0]:
+            remaining[0] -= 1
+            with engine.begin() as connection:
+                connection.execute(update(Task).where(Task.id == task_id).values(version=Task.version + 1))
+
+
+def test_concurrent_change_reapplies_writes(create_task):
+    """
+    Test case for updates without If-Match, completions and deletions applied again after a concurrent change.
+    """
+    task_id, user_id = create_task["id"], create_task["user_id"]
+    task_update = TaskUpdate(title="Updated Task", description=None, status=TaskStatusEnum.IN_PROGRESS)
+
+    with TestingSessionLocal() as session:
+        change_before_flush(session, task_id)
+        assert crud.update_task(session, task_id, user_id, task_update).title == "Updated Task"
+
+        change_before_flush(session, task_id)
+        assert crud.complete_task(session, task_id, user_id).status == TaskStatusEnum.COMPLETED
+
+        change_before_flush(session, task_id)
+        crud.delete_task(session, task_id, user_id)
+
+    with TestingSessionLocal() as session:
+        assert session.get(Task, task_id) is None
+
+
+def test_concurrent_change_with_if_match(create_user, create_task):
+    """
+    Test case for answering 412 to an update with If-Match when the task changed between its read and its write.
+    """
+    etag = client.get(f"/tasks/{create_task['id']}", headers={"Authorization": f"Bearer {create_user}"}).headers["ETag"]
+    task_update = TaskUpdate(title="Updated Task", description=None, status=TaskStatusEnum.IN_PROGRESS)
+
+    with TestingSessionLocal() as session:
+        change_before_flush(session, create_task["id"])
+        with pytest.raises(HTTPException) as error:
+            crud.update_task(session, create_task["id"], create_task["user_id"], task_update, etag)
+
+    assert error.value.status_code == 412
+
+
+def test_task_changing_on_every_attempt(create_task):
+    """
+    Test case for answering 409 when the task changes on every attempt of a write.
+    """
+    with TestingSessionLocal() as session:
+        change_before_flush(session, create_task["id"], times=crud.CONFLICT_RETRIES)
+        with pytest.raises(HTTPException) as error:
+            crud.complete_task(session, create_task["id"], create_task["user_id"])
+
+    assert error.value.status_code == 409
@@ -0,0 +1,155 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from app.config import settings
+from app.events import PostgresBroker, broker, publish_task_events
+from app.main import app
+from app.sync import event_stream
+from tests.conftest import TestingSessionLocal, create_user, create_task
+
+client = TestClient(app)
+
+TEST_CONNECT_ARGS = {
+    "dbname": settings.test_db_name,
+    "user": settings.db_user,
+    "password": settings.db_password,
+    "host": settings.db_host,
+    "port": settings.db_port,
+}
+
+
+def test_write_endpoints_publish_events(create_user, create_task):
+    """
+    Test case checking that task writes reach the owner's subscriptions once committed.
+    """
+    headers = {"Authorization": f"Bearer {create_user}"}
+
+    async def scenario():
+        subscription = broker.subscribe(create_task["user_id"])
+        try:
+            await asyncio.to_thread(client.put, f"/tasks/{create_task['id']}/complete", headers=headers)
+            await asyncio.to_thread(client.delete, f"/tasks/{create_task['id']}", headers=headers)
+            return [await asyncio.wait_for(subscription.get(), 5) for _ in range(2)]
+        finally:
+            broker.unsubscribe(subscription)
+
+    assert asyncio.run(scenario()) == [
+        {"type": "updated", "task_ids": [create_task["id"]]},
+        {"type": "deleted", "task_ids": [create_task["id"]]},
+    ]
+
+
+def test_rolled_back_events_are_discarded():
+    """
+    Test case checking that events staged in a rolled back transaction are never delivered.
+    """
+    async def scenario():
+        subscription = broker.subscribe(42)
+        try:
+            with TestingSessionLocal() as session:
+                session.execute(text("SELECT 1"))
+                publish_task_events(session, 42, "created", [1])
+                session.rollback()
+                session.commit()
+            await asyncio.sleep(0.1)
+            return subscription.queue.empty()
+        finally:
+            broker.unsubscribe(subscription)
+
+    assert asyncio.run(scenario())
+
+
+def test_postgres_broker_delivers_notifications():
+    """
+    Test case for delivering events through Postgres LISTEN/NOTIFY.
+    """
+    postgres_broker = PostgresBroker(TEST_CONNECT_ARGS, "test_task_events")
+    postgres_broker.start()
+
+    def notify():
+        with TestingSessionLocal() as session:
+            # A malformed notification is skipped without stopping the listener
+            session.execute(text("SELECT pg_notify('test_task_events', 'not json')"))
+            session.execute(text("""SELECT pg_notify('test_task_events', '{"user_id": 7}')"""))
+            postgres_broker.stage(session, 7, {"type": "created", "task_ids": [3]})
+            session.commit()
+
+    async def scenario():
+        subscription = postgres_broker.subscribe(7)
+        # Give the listener time to connect before notifying
+        await asyncio.sleep(0.5)
+        await asyncio.to_thread(notify)
+        return await asyncio.wait_for(subscription.get(), 5)
+
+    try:
+        assert asyncio.run(scenario()) == {"type": "created", "task_ids": [3]}
+        assert postgres_broker._thread.is_alive()
+    finally:
+        postgres_broker.stop()
+
+
+def test_event_stream_format():
+    """
+    Test case for formatting events as Server-Sent Events and asking slow clients to resync.
+    """
+    async def scenario():
+        subscription = broker.subscribe(5)
+        stream = event_stream(subscription)
+        subscription.put({"type": "created", "task_ids": [1]})
+        first = await stream.__anext__()
+        subscription.overflowed = True
+        second = await stream.__anext__()
+        await stream.aclose()
+        return first, second
+
+    first, second = asyncio.run(scenario())
+
+    assert first == 'event: created\ndata: {"type": "created", "task_ids": [1]}\n\n'
+    assert second == "event: resync\ndata: {}\n\n"
+
+
+def test_events_endpoint_streams_task_events(create_task, create_user):
+    """
+    Test case for GET /tasks/events streaming the user's events until the client disconnects.
+    """
+    assert client.get("/tasks/events").status_code == 401
+
+    user_id, task_id = create_task["user_id"], create_task["id"]
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": "/tasks/events", "raw_path": b"/tasks/events", "root_path": "", "query_string": b"",
+        "headers": [(b"host", b"testserver"), (b"authorization", f"Bearer {create_user}".encode())],
+        "client": ("testclient", 50000), "server": ("testserver", 80),
+    }
+
+    async def scenario():
+        messages, requested, disconnected = [], asyncio.Event(), asyncio.Event()
+
+        async def receive():
+            if not requested.is_set():
+                requested.set()
+                return {"type": "http.request", "body": b"", "more_body": False}
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            messages.append(message)
+            if message.get("body"):
+                disconnected.set()
+
+        request = asyncio.create_task(app(scope, receive, send))
+        while user_id not in broker._subscriptions and not request.done():
+            await asyncio.sleep(0.01)
+        broker.dispatch(user_id, {"type": "created", "task_ids": [task_id]})
+        await asyncio.wait_for(request, 5)
+        return messages
+
+    start, *bodies = asyncio.run(scenario())
+
+    assert start["status"] == 200
+    assert (b"content-type", b"text/event-stream; charset=utf-8") in start["headers"]
+    assert bodies[0]["body"].decode() == f'event: created\ndata: {{"type": "created", "task_ids": [{task_id}]}}\n\n'
+    # The subscription ends with the stream
+    assert user_id not in broker._subscriptions
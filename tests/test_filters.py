@@ -0,0 +1,102 @@
+from fastapi.testclient import TestClient
+
+from app.main import app
+from tests.conftest import create_user
+
+client = TestClient(app)
+
+
+def create_tasks(headers, tasks):
+    response = client.post("/tasks/bulk", json=tasks, headers=headers)
+    assert response.status_code == 201
+    return [task["id"] for task in response.json()["created"]]
+
+
+def signup(username):
+    client.post("/auth/signup", json={"username": username, "first_name": "Name", "password": "testpassword"})
+    token = client.post("/auth/token", data={"username": username, "password": "testpassword"}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+def listed_ids(path, params, headers):
+    response = client.get(path, params=params, headers=headers)
+    assert response.status_code == 200
+    return [task["id"] for task in response.json()["tasks"]]
+
+
+def test_filter_by_several_statuses(create_user):
+    """
+    Test case for listing tasks with any of several statuses.
+    """
+    headers = {"Authorization": f"Bearer {create_user}"}
+    new, started, done = create_tasks(headers, [
+        {"title": "New"},
+        {"title": "Started", "status": "In progress"},
+        {"title": "Done", "status": "Completed"},
+    ])
+
+    params = {"status": ["In progress", "Completed"]}
+    assert listed_ids("/tasks/", params, headers) == [started, done]
+    assert listed_ids("/tasks/all", params, headers) == [started, done]
+    assert listed_ids("/tasks/all", {"status": "New"}, headers) == [new]
+
+
+def test_filter_by_owner_and_id_range(create_user):
+    """
+    Test case for listing the tasks of one owner and tasks within a range of ids.
+    """
+    headers = {"Authorization": f"Bearer {create_user}"}
+    mine = create_tasks(headers, [{"title": f"Mine {i}"} for i in range(4)])
+    other_headers = signup("other")
+    theirs = create_tasks(other_headers, [{"title": "Theirs"}])
+    owner_id = client.get(f"/tasks/{theirs[0]}", headers=headers).json()["user_id"]
+
+    assert listed_ids("/tasks/all", {"user_id": owner_id}, headers) == theirs
+    assert listed_ids("/tasks/all", {"min_id": mine[1], "max_id": mine[2]}, headers) == mine[1:3]
+    assert listed_ids("/tasks/", {"min_id": mine[2]}, headers) == mine[2:]
+    assert listed_ids("/tasks/", {"max_id": mine[0]}, headers) == mine[:1]
+
+    response = client.get("/tasks/all", params={"min_id": mine[2], "max_id": mine[1]}, headers=headers)
+    assert response.status_code == 404
+
+
+def test_sort_descending_with_cursor(create_user):
+    """
+    Test case for paging through tasks in descending id order with a cursor.
+    """
+    headers = {"Authorization": f"Bearer {create_user}"}
+    ids = create_tasks(headers, [{"title": f"Task {i}"} for i in range(5)])
+
+    seen, cursor = [], None
+    while True:
+        params = {"sort": "-id", "size": 2, **({"cursor": cursor} if cursor else {})}
+        response = client.get("/tasks/", params=params, headers=headers).json()
+        seen.extend(task["id"] for task in response["tasks"])
+        cursor = response["next_cursor"]
+        if cursor is None:
+            break
+
+    assert seen == ids[::-1]
+    assert listed_ids("/tasks/all", {"sort": "-id", "size": 2, "page": 2}, headers) == [ids[2], ids[1]]
+
+
+def test_search_with_explicit_sort(create_user):
+    """
+    Test case for ordering search results by id instead of relevance.
+    """
+    headers = {"Authorization": f"Bearer {create_user}"}
+    once, twice = create_tasks(headers, [
+        {"title": "Report"},
+        {"title": "Report", "description": "Another report"},
+    ])
+
+    assert listed_ids("/tasks/", {"q": "report"}, headers) == [twice, once]
+    assert listed_ids("/tasks/", {"q": "report", "sort": "id"}, headers) == [once, twice]
+
+
+def test_unknown_sort_key(create_user):
+    """
+    Test case for rejecting a sort key that is not supported.
+    """
+    response = client.get("/tasks/all", params={"sort": "title"}, headers={"Authorization": f"Bearer {create_user}"})
+    assert response.status_code == 422
@@ -0,0 +1,85 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.future import select
+
+from app.models import Task, TaskStatusEnum
+from app.pagination import paginate_by_id
+from app.search import search_filter, search_query, search_vector
+from tests.conftest import engine
+
+
+@pytest.fixture
+def seeded_tasks():
+    """
+    Fixture seeding 20000 tasks and refreshing the planner statistics. Like in production, user 1
+    owns a small share of the tasks and few tasks are completed.
+    """
+    with engine.begin() as connection:
+        connection.execute(text(
+            "INSERT INTO users (first_name, username, hashed_password) "
+            "SELECT 'User', 'user' || n, '' FROM generate_series(1, 100) AS n"
+        ))
+        connection.execute(text(
+            "INSERT INTO tasks (title, status, user_id) "
+            "SELECT 'Task ' || n, CASE WHEN n % 50 = 0 THEN 'COMPLETED' ELSE 'NEW' END::status_task, n % 100 + 1 "
+            "FROM generate_series(1, 20000) AS n"
+        ))
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.execute(text("ANALYZE users, tasks"))
+
+
+def explain(query) -> str:
+    """
+    Return the plan of the query, with sequential scans disabled so that any usable index is chosen.
+    """
+    sql = str(query.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+    with engine.connect() as connection:
+        connection.execute(text("SET enable_seqscan = off"))
+        rows = connection.execute(text(f"EXPLAIN {sql}")).all()
+    return "\n".join(row[0] for row in rows)
+
+
+@pytest.mark.parametrize("cursor", [None, "eyJpZCI6MX0"])
+def test_users_tasks_use_user_index(seeded_tasks, cursor):
+    """
+    Test case checking that a user's task page is read through the (user_id, id) index.
+    """
+    query = paginate_by_id(select(Task).where(Task.user_id == 1), Task.id, 1, 10, cursor)
+
+    assert "ix_tasks_user_id_id" in explain(query)
+
+
+@pytest.mark.parametrize("cursor", [None, "eyJpZCI6MX0"])
+def test_tasks_by_status_use_status_index(seeded_tasks, cursor):
+    """
+    Test case checking that a page of tasks filtered by status is read through the (status, id) index.
+    """
+    query = paginate_by_id(select(Task).where(Task.status == TaskStatusEnum.COMPLETED), Task.id, 1, 10, cursor)
+
+    assert "ix_tasks_status_id" in explain(query)
+
+
+def trigram_indexes_available() -> bool:
+    with engine.connect() as connection:
+        return connection.execute(text("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")).first() is not None
+
+
+def test_search_words_use_search_vector_index(seeded_tasks):
+    """
+    Test case checking that matching the words of a search goes through the GIN index on the search vector.
+    """
+    query = select(Task.id).where(search_vector.op("@@")(search_query("task")))
+
+    assert "ix_tasks_search_vector" in explain(query)
+
+
+@pytest.mark.skipif(not trigram_indexes_available(), reason="pg_trgm is not available")
+def test_search_uses_search_and_trigram_indexes(seeded_tasks):
+    """
+    Test case checking that a search over all tasks combines the search vector and trigram indexes.
+    """
+    plan = explain(select(Task.id).where(search_filter("ask 1")))
+
+    assert "Seq Scan" not in plan
+    assert all(index in plan for index in ("ix_tasks_search_vector", "ix_tasks_title_trgm", "ix_tasks_description_trgm"))
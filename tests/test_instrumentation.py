@@ -0,0 +1,112 @@
+import re
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import exc, text
+
+from app import instrumentation
+from app.instrumentation import InstrumentationMiddleware
+from app.main import app
+from tests.conftest import create_user, create_task, engine
+
+client = TestClient(app)
+
+
+def server_timing(response) -> dict:
+    """
+    Parse the Server-Timing header of a response into the parameters of each metric.
+    """
+    metrics = {}
+    for metric in re.split(r', (?=\w+;)', response.headers["Server-Timing"]):
+        name, *params = metric.split(";")
+        metrics[name] = dict(param.split("=", 1) for param in params)
+    return metrics
+
+
+def test_server_timing_of_task_read(create_task, create_user):
+    """
+    Test case for the stages and SQL counts of a task read in the Server-Timing header.
+    """
+    response = client.get(f"/tasks/{create_task['id']}", headers={"Authorization": f"Bearer {create_user}"})
+    assert response.status_code == 200
+
+    metrics = server_timing(response)
+    assert {"jwt", "task_query", "response_model", "db", "total"} <= metrics.keys()
+    assert float(metrics["total"]["dur"]) >= float(metrics["task_query"]["dur"])
+    assert metrics["db"]["desc"] == '"1 statements, 1 rows"'
+
+
+def test_server_timing_of_task_list(create_task, create_user):
+    """
+    Test case for the response building of a task list being timed.
+    """
+    response = client.get("/tasks/", headers={"Authorization": f"Bearer {create_user}"})
+    assert response.status_code == 200
+
+    metrics = server_timing(response)
+    assert {"task_query", "response_build"} <= metrics.keys()
+    # Task lists are rendered without validation against their response model
+    assert "response_model" not in metrics
+
+
+def test_metrics_endpoint(create_task):
+    """
+    Test case for the Prometheus rendering of the metrics.
+    """
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    lines = response.text.splitlines()
+    assert "# TYPE http_requests_total counter" in lines
+    assert "# TYPE request_sql_statements histogram" in lines
+    assert any(line.startswith('request_jwt_decode_seconds_bucket{le="+Inf"} ') for line in lines)
+    assert any(line.startswith("request_task_query_seconds_count ") for line in lines)
+
+
+@pytest.mark.parametrize("sampling", [True, False])
+def test_profile_header(monkeypatch, sampling, create_task, create_user):
+    """
+    Test case for a request answered with its profile, sampled by pyinstrument or traced by cProfile.
+    """
+    if sampling:
+        pytest.importorskip("pyinstrument")
+    else:
+        monkeypatch.setattr(instrumentation, "Profiler", None)
+    profiled = TestClient(InstrumentationMiddleware(app, server_timing=True, profiling=True, profiling_interval=0.0001))
+    headers = {"Authorization": f"Bearer {create_user}"}
+
+    response = profiled.get(f"/tasks/{create_task['id']}", headers={**headers, "X-Profile": "1"})
+    assert response.status_code == 200
+    assert response.headers["X-Profiled-Status"] == "200"
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "Server-Timing" in response.headers
+
+    # Without the header the response is left alone
+    response = profiled.get(f"/tasks/{create_task['id']}", headers=headers)
+    assert response.json()["id"] == create_task["id"]
+
+
+def test_profile_header_ignored_when_disabled(create_task, create_user):
+    """
+    Test case for the profile header having no effect unless profiling is enabled.
+    """
+    headers = {"Authorization": f"Bearer {create_user}", "X-Profile": "1"}
+    response = client.get(f"/tasks/{create_task['id']}", headers=headers)
+
+    assert response.json()["id"] == create_task["id"]
+    assert "X-Profiled-Status" not in response.headers
+
+
+def test_failed_statement_is_not_kept_on_the_connection():
+    """
+    Test case for the start of a failed statement being dropped with the error.
+    """
+    token = instrumentation.current_trace.set(instrumentation.RequestTrace())
+    try:
+        with engine.connect() as connection:
+            with pytest.raises(exc.ProgrammingError):
+                connection.execute(text("SELECT * FROM missing_table"))
+            assert connection.info.get("statement_start") == []
+    finally:
+        instrumentation.current_trace.reset(token)
@@ -0,0 +1,44 @@
+from fastapi.testclient import TestClient
+from passlib.context import CryptContext
+
+from app.config import settings
+from app.main import app
+from app.models import User
+from auth.hashing import password_hasher
+from tests.conftest import TestingSessionLocal
+
+client = TestClient(app)
+
+
+def test_login_rehashes_outdated_password():
+    """
+    Test case checking that a password hashed with other bcrypt rounds is rehashed on login.
+    """
+    outdated = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4).hash("testpassword")
+    with TestingSessionLocal() as session:
+        session.add(User(first_name="Old", username="olduser", hashed_password=outdated))
+        session.commit()
+
+    response = client.post("/auth/token", data={"username": "olduser", "password": "testpassword"})
+    assert response.status_code == 200
+
+    with TestingSessionLocal() as session:
+        hashed_password = session.query(User).filter(User.username == "olduser").one().hashed_password
+    assert hashed_password.startswith(f"$2b${settings.bcrypt_rounds:02d}$")
+
+    # The new hash still verifies
+    response = client.post("/auth/token", data={"username": "olduser", "password": "testpassword"})
+    assert response.status_code == 200
+
+
+def test_hashing_queue_full(monkeypatch):
+    """
+    Test case checking that signups are rejected with 503 and Retry-After when the hashing queue is full.
+    """
+    monkeypatch.setattr(password_hasher, "max_pending", 0)
+
+    user_data = {"username": "testuser", "first_name": "FirstName", "password": "testpassword"}
+    response = client.post("/auth/signup", json=user_data)
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == str(settings.password_hash_retry_after)
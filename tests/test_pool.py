@@ -0,0 +1,65 @@
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import NullPool
+
+from app.config import settings
+from app.main import app
+from app.pool import TimedQueuePool, engine_options, sync_checkout_wait
+from tests.conftest import SQLALCHEMY_TEST_DATABASE_URL
+
+client = TestClient(app)
+
+
+def test_engine_options_from_settings(monkeypatch):
+    """
+    Test case for building the pool arguments from the settings.
+    """
+    monkeypatch.setattr(settings, "db_pool_size", 20)
+    monkeypatch.setattr(settings, "db_max_overflow", 0)
+    monkeypatch.setattr(settings, "db_pool_pre_ping", True)
+
+    options = engine_options(TimedQueuePool)
+
+    assert options["poolclass"] is TimedQueuePool
+    assert options["pool_size"] == 20
+    assert options["max_overflow"] == 0
+    assert options["pool_pre_ping"] is True
+
+
+def test_engine_options_external_pooler(monkeypatch):
+    """
+    Test case for disabling application-side pooling when an external pooler is used.
+    """
+    monkeypatch.setattr(settings, "db_external_pooler", True)
+
+    options = engine_options(TimedQueuePool)
+
+    assert options["poolclass"] is NullPool
+    assert "pool_size" not in options
+
+
+def test_checkout_wait_is_recorded():
+    """
+    Test case for recording the wait time of every connection checkout.
+    """
+    engine = create_engine(SQLALCHEMY_TEST_DATABASE_URL, poolclass=TimedQueuePool, pool_size=1)
+    before = sync_checkout_wait.snapshot()["count"]
+
+    for _ in range(3):
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+    engine.dispose()
+
+    assert sync_checkout_wait.snapshot()["count"] == before + 3
+
+
+def test_read_pool_metrics():
+    """
+    Test case for reading the pool metrics endpoint.
+    """
+    response = client.get("/metrics/pool")
+
+    assert response.status_code == 200
+    assert response.json()["sync"]["pool"] == "TimedQueuePool"
+    assert "count" in response.json()["sync"]["checkout_wait_seconds"]
+    assert response.json()["replicas"] == {"configured": 0, "healthy": 0}
@@ -0,0 +1,100 @@
+import itertools
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.future import select
+
+from app.filters import TaskSort, paginate_tasks, task_filters
+from app.models import Task, TaskStatusEnum
+from app.pagination import encode_cursor, encode_rank_cursor, exact_total
+from app.search import search_rank
+from tests.conftest import engine
+from tests.test_indexes import trigram_indexes_available
+
+STATUSES = [None, [TaskStatusEnum.COMPLETED], [TaskStatusEnum.NEW, TaskStatusEnum.IN_PROGRESS]]
+ID_RANGES = [(None, None), (60000, None), (None, 40000), (30000, 31000)]
+SORTS = [None, TaskSort.ID, TaskSort.ID_DESC]
+
+
+@pytest.fixture
+def large_table():
+    """
+    Fixture seeding 100000 tasks of 1000 users and refreshing the planner statistics. Most tasks
+    are new, few are completed, and the words of titles and descriptions vary.
+    """
+    with engine.begin() as connection:
+        connection.execute(text(
+            "INSERT INTO users (first_name, username, hashed_password) "
+            "SELECT 'User', 'user' || n, '' FROM generate_series(1, 1000) AS n"
+        ))
+        connection.execute(text(
+            "INSERT INTO tasks (title, description, status, user_id) "
+            "SELECT (ARRAY['Report', 'Meeting', 'Invoice', 'Review'])[n % 4 + 1] || ' ' || n, "
+            "       CASE WHEN n % 3 = 0 THEN NULL ELSE 'Notes for item ' || n END, "
+            "       CASE WHEN n % 20 = 0 THEN 'COMPLETED' WHEN n % 5 = 0 THEN 'IN_PROGRESS' ELSE 'NEW' END::status_task, "
+            "       n % 1000 + 1 "
+            "FROM generate_series(1, 100000) AS n"
+        ))
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.execute(text("VACUUM ANALYZE users, tasks"))
+
+
+def combinations():
+    """
+    Every supported combination of list filters, sort and cursor, as the endpoints build them.
+    """
+    searches = [None, "report"]
+    for user_id, statuses, (min_id, max_id), sort, q, with_cursor in itertools.product(
+            [None, 7], STATUSES, ID_RANGES, SORTS, searches, [False, True]):
+        # Without the trigram indexes a search over all users' tasks can only be a scan
+        if q and user_id is None and not trigram_indexes_available():
+            continue
+
+        rank = search_rank(q) if q and sort is None else None
+        cursor = None
+        if with_cursor:
+            cursor = encode_rank_cursor(0.1, 50000) if rank is not None else encode_cursor(50000)
+
+        filters = task_filters(user_id, statuses, min_id, max_id, q)
+        name = f"user_id={user_id} status={statuses} id={min_id}..{max_id} sort={sort} q={q} cursor={with_cursor}"
+        yield name, filters, rank, sort or TaskSort.ID, cursor
+
+
+def explain(query, seqscan: bool) -> str:
+    sql = str(query.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+    with engine.connect() as connection:
+        if not seqscan:
+            connection.execute(text("SET enable_seqscan = off"))
+        rows = connection.execute(text(f"EXPLAIN {sql}")).all()
+    return "\n".join(row[0] for row in rows)
+
+
+def test_pages_never_scan_the_table(large_table):
+    """
+    Test case checking that the planner reads every kind of page through an index.
+    """
+    scans = []
+    for name, filters, rank, sort, cursor in combinations():
+        query = paginate_tasks(select(Task).where(*filters), 1, 10, cursor, sort, rank)
+        if "Seq Scan" in explain(query, seqscan=True):
+            scans.append(name)
+
+    assert scans == []
+
+
+def test_pages_with_totals_have_index_plans(large_table):
+    """
+    Test case checking that every full list statement, including its total, can be served by indexes.
+
+    Counting a large share of the table is cheapest with a scan, so scans are disabled
+    to check that an index plan exists at all.
+    """
+    scans = []
+    for name, filters, rank, sort, cursor in combinations():
+        query = select(Task, exact_total(Task, *filters).label("total")).where(*filters)
+        query = paginate_tasks(query, 1, 10, cursor, sort, rank)
+        if "Seq Scan" in explain(query, seqscan=False):
+            scans.append(name)
+
+    assert scans == []
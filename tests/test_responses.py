@@ -0,0 +1,70 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+from fastapi.responses import ORJSONResponse
+from fastapi.routing import APIRoute
+from fastapi.testclient import TestClient
+from pydantic import ValidationError
+
+from app.main import app
+from app.models import TaskStatusEnum
+from app.responses import JSONResponseClass, ModelJSONResponse, StdlibJSONResponse
+from app.schemas import TaskResponse
+from tests.conftest import create_user, create_task
+
+client = TestClient(app)
+
+
+def test_all_routes_use_configured_response_class():
+    """
+    Test case checking that every endpoint, including the included routers, renders with the configured class.
+    """
+    routes = [route for route in app.routes if isinstance(route, APIRoute)]
+
+    assert routes
+    assert all(route.response_class is JSONResponseClass for route in routes)
+
+
+def test_model_response_renders_like_the_renderer():
+    """
+    Test case checking that a response model rendered straight to JSON by Pydantic has the same bytes
+    as the renderer writes, from a dict or an object's attributes.
+    """
+    task = {"id": 1, "title": "Zadanie ✓", "description": None, "status": TaskStatusEnum.IN_PROGRESS, "user_id": 1}
+    expected = JSONResponseClass(TaskResponse.model_validate(task).model_dump()).body
+
+    assert ModelJSONResponse(TaskResponse, task).body == expected
+    assert ModelJSONResponse(TaskResponse, SimpleNamespace(**task), status_code=201).body == expected
+
+    with pytest.raises(ValidationError):
+        ModelJSONResponse(TaskResponse, {**task, "status": "Unknown"})
+
+
+def test_renderers_write_the_same_json():
+    """
+    Test case checking that the orjson and standard library renderers produce the same bytes,
+    with the status enum written as its value.
+    """
+    content = {
+        "tasks": [{"id": 1, "title": "Zadanie ✓", "description": None, "status": TaskStatusEnum.IN_PROGRESS}],
+        "total": 1,
+        "ratio": 0.5,
+        "next_cursor": None,
+    }
+
+    body = StdlibJSONResponse(content).body
+    assert body == ORJSONResponse(content).body
+    assert json.loads(body)["tasks"][0]["status"] == "In progress"
+
+
+def test_status_serialized_as_before(create_user, create_task):
+    """
+    Test case checking that task responses still carry the status by its display value.
+    """
+    headers = {"Authorization": f"Bearer {create_user}"}
+    client.put(f"/tasks/{create_task['id']}/complete", headers=headers)
+
+    assert client.get(f"/tasks/{create_task['id']}", headers=headers).json()["status"] == "Completed"
+    assert client.get("/tasks/all", headers=headers).json()["tasks"][0]["status"] == "Completed"
+    assert client.get("/tasks/changes", headers=headers).json()["changed"][0]["status"] == "Completed"
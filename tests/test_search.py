@@ -0,0 +1,117 @@
+from fastapi.testclient import TestClient
+
+from app.main import app
+from tests.conftest import create_user
+
+client = TestClient(app)
+
+
+def create_tasks(headers, tasks):
+    response = client.post("/tasks/bulk", json=tasks, headers=headers)
+    assert response.status_code == 201
+    return [task["id"] for task in response.json()["created"]]
+
+
+def test_search_by_words(create_user):
+    """
+    Test case for finding tasks by the words of their title and description, title matches first.
+    """
+    headers = {"Authorization": f"Bearer {create_user}"}
+    in_description, in_title, _ = create_tasks(headers, [
+        {"title": "Release", "description": "Fix the failing login tests"},
+        {"title": "Fix login bug", "description": "Users are logged out"},
+        {"title": "Groceries", "description": "Milk and bread"},
+    ])
+
+    # Words are stemmed: "fixing logins" matches "Fix login"
+    response = client.get("/tasks/", params={"q": "fixing logins"}, headers=headers)
+    assert response.status_code == 200
+    assert [task["id"] for task in response.json()["tasks"]] == [in_title, in_description]
+    assert response.json()["pagination"]["total"] == 2
+
+    response = client.get("/tasks/", params={"q": "login -release"}, headers=headers)
+    assert [task["id"] for task in response.json()["tasks"]] == [in_title]
+
+
+def test_search_by_substring(create_user):
+    """
+    Test case for finding tasks by a part of a word, with LIKE wildcards taken literally.
+    """
+    headers = {"Authorization": f"Bearer {create_user}"}
+    discount, percent = create_tasks(headers, [
+        {"title": "Apply discount"},
+        {"title": "Raise by 5%", "description": "c_discount"},
+    ])
+
+    response = client.get("/tasks/", params={"q": "iscou"}, headers=headers)
+    assert [task["id"] for task in response.json()["tasks"]] == [discount, percent]
+
+    response = client.get("/tasks/", params={"q": "5%"}, headers=headers)
+    assert [task["id"] for task in response.json()["tasks"]] == [percent]
+
+    response = client.get("/tasks/", params={"q": "c_d"}, headers=headers)
+    assert [task["id"] for task in response.json()["tasks"]] == [percent]
+
+    response = client.get("/tasks/", params={"q": "%"}, headers=headers)
+    assert [task["id"] for task in response.json()["tasks"]] == [percent]
+
+
+def test_search_pages_with_cursor(create_user):
+    """
+    Test case for paging through ranked results with a cursor, without gaps or repeats among equal ranks.
+    """
+    headers = {"Authorization": f"Bearer {create_user}"}
+    ids = create_tasks(headers, [{"title": f"Report {i}", "description": "report" if i % 2 else None} for i in range(7)])
+
+    seen, cursor = [], None
+    while True:
+        params = {"q": "report", "size": 2, **({"cursor": cursor} if cursor else {})}
+        response = client.get("/tasks/", params=params, headers=headers).json()
+        seen.extend(task["id"] for task in response["tasks"])
+        cursor = response["next_cursor"]
+        if cursor is None:
+            break
+
+    # Tasks mentioning the word twice rank first, ties are ordered by id
+    assert seen == [ids[i] for i in (1, 3, 5, 0, 2, 4, 6)]
+
+    # Offset pages follow the same order
+    response = client.get("/tasks/", params={"q": "report", "size": 2, "page": 2}, headers=headers)
+    assert [task["id"] for task in response.json()["tasks"]] == [ids[5], ids[0]]
+
+
+def test_search_all_tasks_with_status(create_user):
+    """
+    Test case for searching all tasks together with a status filter.
+    """
+    headers = {"Authorization": f"Bearer {create_user}"}
+    open_task, done_task = create_tasks(headers, [
+        {"title": "Write docs"},
+        {"title": "Write tests", "status": "Completed"},
+    ])
+
+    response = client.get("/tasks/all", params={"q": "write"}, headers=headers)
+    assert [task["id"] for task in response.json()["tasks"]] == [open_task, done_task]
+
+    response = client.get("/tasks/all", params={"q": "write", "status": "Completed"}, headers=headers)
+    assert [task["id"] for task in response.json()["tasks"]] == [done_task]
+    assert response.json()["pagination"]["total"] == 1
+
+    # Searches always count exactly
+    response = client.get("/tasks/all", params={"q": "write", "approximate_total": True}, headers=headers)
+    assert response.json()["pagination"]["total_approximate"] is False
+
+
+def test_search_no_match_and_invalid_cursor(create_user):
+    """
+    Test case for a search without results and for rejecting an id cursor on a search.
+    """
+    headers = {"Authorization": f"Bearer {create_user}"}
+    create_tasks(headers, [{"title": "One"}, {"title": "Two"}])
+
+    response = client.get("/tasks/", params={"q": "three"}, headers=headers)
+    assert response.status_code == 404
+
+    cursor = client.get("/tasks/", params={"size": 1}, headers=headers).json()["next_cursor"]
+    response = client.get("/tasks/", params={"q": "one", "cursor": cursor}, headers=headers)
+    assert response.status_code == 400
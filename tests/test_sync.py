@@ -0,0 +1,143 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+from fastapi.testclient import TestClient
+from sqlalchemy import select, update
+
+from app.main import app
+from app.models import Task, TaskStatusEnum, TaskTombstone
+from app.pagination import decode_payload, decode_token, encode_token
+from app.sync import SYNC_RETENTION_SECONDS, TombstonePruner
+from tests.conftest import TestingSessionLocal, create_user, create_task
+
+client = TestClient(app)
+
+
+def test_full_then_delta_sync(create_user, create_task):
+    """
+    Test case for a full sync followed by a sync of only the changes made since.
+    """
+    headers = {"Authorization": f"Bearer {create_user}"}
+    second = client.post("/tasks/", json={"title": "Second"}, headers=headers).json()
+    third = client.post("/tasks/", json={"title": "Third"}, headers=headers).json()
+
+    response = client.get("/tasks/changes", headers=headers)
+    assert response.status_code == 200
+    assert [task["id"] for task in response.json()["changed"]] == [create_task["id"], second["id"], third["id"]]
+    assert response.json()["has_more"] is False
+    token = response.json()["sync_token"]
+
+    # Nothing changed yet
+    response = client.get("/tasks/changes", params={"since": token}, headers=headers)
+    assert response.json()["changed"] == [] and response.json()["deleted"] == []
+    # The token is issued again, at the same position
+    for key in ("xid", "seq"):
+        assert decode_token(response.json()["sync_token"], key, "") == decode_token(token, key, "")
+
+    client.put(f"/tasks/{second['id']}/complete", headers=headers)
+    client.delete(f"/tasks/{create_task['id']}", headers=headers)
+    client.post("/tasks/bulk/delete", json={"ids": [third["id"]]}, headers=headers)
+
+    response = client.get("/tasks/changes", params={"since": token}, headers=headers)
+    assert [task["id"] for task in response.json()["changed"]] == [second["id"]]
+    assert response.json()["changed"][0]["status"] == "Completed"
+    assert response.json()["deleted"] == [create_task["id"], third["id"]]
+
+
+def test_sync_in_batches(create_user):
+    """
+    Test case for fetching changes in several batches with has_more.
+    """
+    headers = {"Authorization": f"Bearer {create_user}"}
+    client.post("/tasks/bulk", json=[{"title": f"Task {i}"} for i in range(5)], headers=headers)
+    client.put("/tasks/bulk/complete", json={"status": "New"}, headers=headers)
+
+    titles, token, has_more = [], None, True
+    while has_more:
+        params = {"limit": 2, **({"since": token} if token else {})}
+        response = client.get("/tasks/changes", params=params, headers=headers).json()
+        titles.extend(task["title"] for task in response["changed"])
+        token, has_more = response["sync_token"], response["has_more"]
+
+    # Every task shows up once, after its latest change
+    assert sorted(titles) == [f"Task {i}" for i in range(5)]
+
+
+def test_sync_invalid_token(create_user):
+    """
+    Test case for rejecting a malformed sync token.
+    """
+    response = client.get("/tasks/changes", params={"since": "bad"}, headers={"Authorization": f"Bearer {create_user}"})
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid sync token"
+
+
+def test_sync_expired_token(create_user, create_task):
+    """
+    Test case for asking a client whose sync token is older than the retention to resync.
+    """
+    headers = {"Authorization": f"Bearer {create_user}"}
+    payload = decode_payload(client.get("/tasks/changes", headers=headers).json()["sync_token"], "")
+
+    expired = encode_token({**payload, "ts": int(time.time() - SYNC_RETENTION_SECONDS) - 60})
+    response = client.get("/tasks/changes", params={"since": expired}, headers=headers)
+    assert response.status_code == 410
+    assert response.json()["detail"] == "Sync token expired, resync required"
+
+    # Tokens issued without their time are treated as expired
+    undated = encode_token({"xid": payload["xid"], "seq": payload["seq"]})
+    assert client.get("/tasks/changes", params={"since": undated}, headers=headers).status_code == 410
+
+
+def test_prune_expired_tombstones(create_user):
+    """
+    Test case for pruning the tombstones older than the retention and keeping the recent ones.
+    """
+    headers = {"Authorization": f"Bearer {create_user}"}
+    old = client.post("/tasks/", json={"title": "Old"}, headers=headers).json()
+    recent = client.post("/tasks/", json={"title": "Recent"}, headers=headers).json()
+    client.delete(f"/tasks/{old['id']}", headers=headers)
+    client.delete(f"/tasks/{recent['id']}", headers=headers)
+
+    with TestingSessionLocal() as session:
+        session.execute(
+            update(TaskTombstone)
+            .where(TaskTombstone.task_id == old["id"])
+            .values(deleted_at=datetime.now(timezone.utc) - timedelta(seconds=SYNC_RETENTION_SECONDS + 60))
+        )
+        session.commit()
+
+    assert TombstonePruner(TestingSessionLocal, SYNC_RETENTION_SECONDS, 0).prune() == 1
+
+    with TestingSessionLocal() as session:
+        assert session.scalars(select(TaskTombstone.task_id)).all() == [recent["id"]]
+    # A full sync no longer walks the pruned deletion
+    assert client.get("/tasks/changes", headers=headers).json()["deleted"] == [recent["id"]]
+
+
+def test_sync_waits_for_running_transactions(create_user, create_task):
+    """
+    Test case for a change written before another but committed after it being synced, not skipped.
+    """
+    headers = {"Authorization": f"Bearer {create_user}"}
+    token = client.get("/tasks/changes", headers=headers).json()["sync_token"]
+
+    # The first task is written, taking its sequence number, but its transaction is still running
+    with TestingSessionLocal() as session:
+        first = Task(title="First", status=TaskStatusEnum.COMPLETED, user_id=create_task["user_id"])
+        session.add(first)
+        session.flush()
+
+        second = client.post("/tasks/", json={"title": "Second"}, headers=headers).json()
+        response = client.get("/tasks/changes", params={"since": token}, headers=headers).json()
+        synced = [task["id"] for task in response["changed"]]
+        token = response["sync_token"]
+
+        session.commit()
+        first_id = first.id
+
+    response = client.get("/tasks/changes", params={"since": token}, headers=headers).json()
+    synced += [task["id"] for task in response["changed"]]
+
+    assert sorted(synced) == sorted([first_id, second["id"]])
@@ -0,0 +1,289 @@
+import asyncio
+import csv
+import io
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app import crud, transfer
+from app.config import settings
+from app.dependencies import get_db, get_sessionmaker
+from app.events import broker
+from app.main import app
+from tests.conftest import TestingSessionLocal, create_user, create_task, engine, override_get_db
+from tests.test_async_db import AsyncTestingSessionLocal, override_get_async_db
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def server_side_cursors():
+    """
+    Fixture that records whether each executed statement ran on a named (server-side) cursor.
+    """
+    named = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and "FROM tasks" in statement:
+            named.append(cursor.name is not None)
+
+    event.listen(engine, "before_cursor_execute", record)
+    yield named
+    event.remove(engine, "before_cursor_execute", record)
+
+
+def test_export_ndjson(create_user, create_task, server_side_cursors, monkeypatch):
+    """
+    Test case for exporting all of the user's tasks as NDJSON, streamed in batches.
+    """
+    monkeypatch.setattr(settings, "export_batch_size", 2)
+    headers = {"Authorization": f"Bearer {create_user}"}
+    client.post("/tasks/bulk", json=[{"title": f"Task {i}"} for i in range(4)], headers=headers)
+    server_side_cursors.clear()
+
+    response = client.get("/tasks/export", headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert response.headers["content-disposition"] == 'attachment; filename="tasks.ndjson"'
+
+    tasks = [json.loads(line) for line in response.text.splitlines()]
+    assert [task["title"] for task in tasks] == ["Test Task", "Task 0", "Task 1", "Task 2", "Task 3"]
+    assert tasks[0] == {"id": create_task["id"], "title": "Test Task", "description": "This is a test task.",
+                        "status": "New", "user_id": create_task["user_id"]}
+
+    # The rows were read through a server-side cursor
+    assert server_side_cursors == [True]
+
+
+def test_export_csv_with_status(create_user, create_task):
+    """
+    Test case for exporting the user's tasks with a given status as CSV.
+    """
+    headers = {"Authorization": f"Bearer {create_user}"}
+    done = client.post("/tasks/", json={"title": "Done, really", "description": 'with "quotes"'}, headers=headers)
+    client.put(f"/tasks/{done.json()['id']}/complete", headers=headers)
+
+    response = client.get("/tasks/export", params={"format": "csv", "status": "Completed"}, headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+
+    rows = list(csv.reader(io.StringIO(response.text)))
+    assert rows == [
+        ["id", "title", "description", "status", "user_id"],
+        [str(done.json()["id"]), "Done, really", 'with "quotes"', "Completed", str(create_task["user_id"])],
+    ]
+
+
+def test_export_only_own_tasks(create_user, create_task):
+    """
+    Test case for the export leaving out the tasks of other users.
+    """
+    client.post("/auth/signup", json={"username": "other", "first_name": "Other", "password": "testpassword"})
+    token = client.post("/auth/token", data={"username": "other", "password": "testpassword"}).json()["access_token"]
+
+    response = client.get("/tasks/export", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    assert response.text == ""
+
+
+def test_export_async(create_user, create_task):
+    """
+    Test case for exporting through the async engine.
+    """
+    app.dependency_overrides[get_sessionmaker] = lambda: AsyncTestingSessionLocal
+    try:
+        response = client.get("/tasks/export", params={"format": "csv"},
+                              headers={"Authorization": f"Bearer {create_user}"})
+    finally:
+        app.dependency_overrides[get_sessionmaker] = lambda: TestingSessionLocal
+
+    assert response.status_code == 200
+    assert response.text.splitlines()[1].split(",")[1] == "Test Task"
+
+
+def test_export_invalid_format(create_user):
+    """
+    Test case for rejecting an unknown export format.
+    """
+    response = client.get("/tasks/export", params={"format": "xml"},
+                          headers={"Authorization": f"Bearer {create_user}"})
+    assert response.status_code == 422
+
+
+def test_import_ndjson(create_user):
+    """
+    Test case for importing NDJSON tasks in several chunks, with a report of the rejected rows.
+    """
+    headers = {"Authorization": f"Bearer {create_user}", "X-Import-Id": "first-import"}
+    lines = [
+        json.dumps({"title": "One", "description": "Tab\there, newline\nthere, back\\slash"}),
+        json.dumps({"title": "Two", "status": "Completed"}),
+        "",
+        json.dumps({"description": "No title"}),
+        "{not json",
+        json.dumps({"title": "Three", "status": "Unknown"}),
+        json.dumps({"title": "Four"}),
+    ]
+
+    def body():
+        # The body arrives in pieces that don't line up with the lines
+        data = "\n".join(lines).encode()
+        for start in range(0, len(data), 7):
+            yield data[start:start + 7]
+
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(settings, "import_chunk_size", 2)
+        response = client.post("/tasks/import", content=body(), headers=headers)
+
+    assert response.status_code == 201
+    result = response.json()
+    assert (result["status"], result["rows_read"], result["imported"], result["failed"]) == ("completed", 6, 3, 3)
+    assert [error["row"] for error in result["errors"]] == [3, 4, 5]
+    assert result["errors"][0]["errors"][0]["type"] == "missing"
+    assert result["errors"][1]["errors"][0]["type"] == "json_invalid"
+
+    tasks = client.get("/tasks/", headers=headers).json()["tasks"]
+    assert [(task["title"], task["status"]) for task in tasks] == [("One", "New"), ("Two", "Completed"), ("Four", "New")]
+    assert tasks[0]["description"] == "Tab\there, newline\nthere, back\\slash"
+    assert tasks[1]["description"] is None
+
+    response = client.get("/tasks/import/first-import", headers=headers)
+    assert response.status_code == 200
+    assert response.json() == {"import_id": "first-import", "status": "completed", "rows_read": 6,
+                               "rows_committed": 6, "imported": 3, "failed": 3}
+
+    # The same id can't be used twice
+    response = client.post("/tasks/import", content=lines[0], headers=headers)
+    assert response.status_code == 409
+
+
+def test_failed_import_keeps_committed_chunks(create_user):
+    """
+    Test case for an import failing halfway, keeping the chunks committed before the failure.
+    """
+    headers = {"Authorization": f"Bearer {create_user}", "X-Import-Id": "broken-import"}
+    body = "\n".join(json.dumps({"title": title}) for title in ("One", "Two", "Three", "Four"))
+    copy_tasks = crud.copy_tasks
+
+    def copy_first_chunk_only(session, user_id, tasks):
+        if tasks[0].title != "One":
+            raise RuntimeError("Connection lost")
+        return copy_tasks(session, user_id, tasks)
+
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(settings, "import_chunk_size", 2)
+        monkeypatch.setattr(crud, "copy_tasks", copy_first_chunk_only)
+        with pytest.raises(RuntimeError):
+            client.post("/tasks/import", content=body, headers=headers)
+
+    progress = client.get("/tasks/import/broken-import", headers=headers).json()
+    assert (progress["status"], progress["rows_read"], progress["rows_committed"], progress["imported"]) == (
+        "failed", 2, 2, 2
+    )
+    assert [task["title"] for task in client.get("/tasks/", headers=headers).json()["tasks"]] == ["One", "Two"]
+
+
+def test_import_parses_off_the_event_loop(create_user, monkeypatch):
+    """
+    Test case for the records of an import being split and validated in the threadpool, not on the event loop.
+    """
+    calls = []
+
+    def off_loop(function):
+        def call(*args):
+            try:
+                asyncio.get_running_loop()
+                calls.append("event loop")
+            except RuntimeError:
+                calls.append("threadpool")
+            return function(*args)
+        return call
+
+    monkeypatch.setattr(transfer, "validate_chunk", off_loop(transfer.validate_chunk))
+    monkeypatch.setattr(transfer.RecordSplitter, "feed", off_loop(transfer.RecordSplitter.feed))
+    body = "title,status\nOne,New\nTwo,Completed\n"
+    response = client.post("/tasks/import", params={"format": "csv"}, content=body,
+                           headers={"Authorization": f"Bearer {create_user}"})
+
+    assert response.status_code == 201
+    assert response.json()["imported"] == 2
+    assert calls and set(calls) == {"threadpool"}
+
+
+def test_import_csv_round_trip(create_user, create_task):
+    """
+    Test case for importing the CSV export of a user, including quoted values spanning lines.
+    """
+    headers = {"Authorization": f"Bearer {create_user}"}
+    client.post("/tasks/", json={"title": "Quoted, \"title\"", "description": "Line one\nline two"}, headers=headers)
+    exported = client.get("/tasks/export", params={"format": "csv"}, headers=headers).content
+
+    def body():
+        for start in range(0, len(exported), 5):
+            yield exported[start:start + 5]
+
+    response = client.post("/tasks/import", params={"format": "csv"}, content=body(), headers=headers)
+    assert response.status_code == 201
+    assert (response.json()["imported"], response.json()["failed"]) == (2, 0)
+
+    tasks = client.get("/tasks/", headers=headers).json()["tasks"]
+    assert [(task["title"], task["description"]) for task in tasks] == [
+        ("Test Task", "This is a test task."),
+        ("Quoted, \"title\"", "Line one\nline two"),
+    ] * 2
+    assert len({task["id"] for task in tasks}) == 4
+
+
+def test_import_publishes_events(create_user, create_task):
+    """
+    Test case for announcing imported tasks to the delta sync feed and event subscribers.
+    """
+    headers = {"Authorization": f"Bearer {create_user}"}
+
+    async def scenario():
+        subscription = broker.subscribe(create_task["user_id"])
+        try:
+            await asyncio.to_thread(client.post, "/tasks/import", content=b'{"title": "Imported"}\n', headers=headers)
+            return await asyncio.wait_for(subscription.get(), 5)
+        finally:
+            broker.unsubscribe(subscription)
+
+    event = asyncio.run(scenario())
+    task_id = client.get("/tasks/", headers=headers).json()["tasks"][1]["id"]
+    assert event == {"type": "created", "task_ids": [task_id]}
+
+    changes = client.get("/tasks/changes", headers=headers).json()
+    assert [task["id"] for task in changes["changed"]] == [create_task["id"], task_id]
+
+
+def test_import_async(create_user):
+    """
+    Test case for importing through the async engine.
+    """
+    headers = {"Authorization": f"Bearer {create_user}"}
+    app.dependency_overrides[get_db] = override_get_async_db
+    try:
+        response = client.post("/tasks/import", params={"format": "csv"},
+                               content=b"title,status\nAsync one,In progress\nAsync two,\n", headers=headers)
+    finally:
+        app.dependency_overrides[get_db] = override_get_db
+
+    assert response.status_code == 201
+    tasks = client.get("/tasks/", headers=headers).json()["tasks"]
+    assert [(task["title"], task["status"]) for task in tasks] == [("Async one", "In progress"), ("Async two", "New")]
+
+
+def test_import_progress_of_other_user(create_user):
+    """
+    Test case for hiding the progress of an import from other users.
+    """
+    client.post("/tasks/import", content=b'{"title": "Mine"}\n',
+                headers={"Authorization": f"Bearer {create_user}", "X-Import-Id": "private"})
+
+    client.post("/auth/signup", json={"username": "other", "first_name": "Other", "password": "testpassword"})
+    token = client.post("/auth/token", data={"username": "other", "password": "testpassword"}).json()["access_token"]
+
+    response = client.get("/tasks/import/private", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 404
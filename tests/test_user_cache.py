@@ -0,0 +1,57 @@
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.main import app
+from app.models import User
+from auth.cache import user_cache, user_cache_hits, user_cache_misses
+from tests.conftest import TestingSessionLocal, create_user, create_task
+
+client = TestClient(app)
+
+
+def test_cached_user_skips_lookup(create_user, create_task, count_queries):
+    """
+    Test case checking that a request with a cached user only runs the task query.
+    """
+    headers = {"Authorization": f"Bearer {create_user}"}
+    client.get(f"/tasks/{create_task['id']}", headers=headers)
+    hits = user_cache_hits.value
+    count_queries.clear()
+
+    response = client.get(f"/tasks/{create_task['id']}", headers=headers)
+
+    assert response.status_code == 200
+    assert len(count_queries) == 1
+    assert user_cache_hits.value == hits + 1
+
+
+def test_trusted_user_id_skips_lookup(create_user, create_task, count_queries, monkeypatch):
+    """
+    Test case checking that the user id claim is used without any lookup when trusted.
+    """
+    monkeypatch.setattr(settings, "trust_token_user_id", True)
+    user_cache.clear()
+    misses = user_cache_misses.value
+    count_queries.clear()
+
+    response = client.get(f"/tasks/{create_task['id']}", headers={"Authorization": f"Bearer {create_user}"})
+
+    assert response.status_code == 200
+    assert len(count_queries) == 1
+    assert user_cache_misses.value == misses
+
+
+def test_deleted_user_is_invalidated(create_user):
+    """
+    Test case checking that deleting a user drops it from the cache, so its token stops working.
+    """
+    headers = {"Authorization": f"Bearer {create_user}"}
+    assert client.get("/tasks/", headers=headers).status_code == 404
+    assert user_cache.get("testuser") is not None
+
+    with TestingSessionLocal() as session:
+        session.delete(session.query(User).filter(User.username == "testuser").one())
+        session.commit()
+
+    assert user_cache.get("testuser") is None
+    assert client.get("/tasks/", headers=headers).status_code == 401